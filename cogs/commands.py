@@ -3,6 +3,7 @@ import discord
 import json
 
 
+from math import ceil
 from os import getpid, path
 from discord import (
     Option,
@@ -32,7 +33,6 @@ from lava.embeds import ErrorEmbed, SuccessEmbed, InfoEmbed, WarningEmbed, Loadi
 from lava.errors import UserInDifferentChannel
 from lava.utils import (
     ensure_voice,
-    split_list,
     bytes_to_gb,
     get_commit_hash,
     get_upstream_url,
@@ -40,7 +40,7 @@ from lava.utils import (
 )
 from lava.view import View
 from lava.modal import PlaylistModal
-from lava.paginator import Paginator
+from lava.paginator import LazyPaginator
 from lava.classes.player import LavaPlayer
 from lava.playlist import Playlist, Mode
 
@@ -117,7 +117,7 @@ class Commands(Cog):
             if playlist: 
                 choices.append(
                     OptionChoice(
-                        name=playlist.name + f" 歌單擁有者 by ({self.bot.get_user(playlist.owner_id)})", value=playlist.uid
+                        name=playlist.name + f" 歌單擁有者 by ({await self.bot.get_user_name(playlist.owner_id)})", value=playlist.uid
                     )
                 )
         return choices
@@ -177,14 +177,49 @@ class Commands(Cog):
 
         embed.add_field(name="伺服器數量", value=len(self.bot.guilds), inline=True)
 
+        players = self.bot.lavalink.player_manager.stats()
+
         embed.add_field(
             name="播放器數量",
-            value=len(self.bot.lavalink.player_manager.players),
+            value=f"{players['resident']} (閒置 {players['idle']} / 已回收 {players['evicted']})",
             inline=True,
         )
 
         embed.add_field(name="​", value="​", inline=True)
 
+        failures = self.bot.lavalink.failures
+
+        embed.add_field(
+            name="失敗快取",
+            value=f"{len(failures)} 筆 / 已略過 {failures.hits} 次",
+            inline=True,
+        )
+
+        radio_mixes = self.bot.lavalink.radio_mixes
+
+        embed.add_field(
+            name="推薦快取",
+            value=f"{len(radio_mixes)} 筆 / 命中率 {radio_mixes.hit_rate:.0%}",
+            inline=True,
+        )
+
+        events = self.bot.lavalink.events.stats()
+
+        embed.add_field(
+            name="事件佇列",
+            value=f"{events['depth']} 待處理 / 已合併 {events['coalesced']} / 重複 {events['duplicates']} / 已丟棄 {events['dropped']}",
+            inline=True,
+        )
+
+        if self.bot.watchdog is not None:
+            stalls = self.bot.watchdog.stalls
+
+            embed.add_field(
+                name="事件迴圈阻塞",
+                value=" / ".join(f"{subsystem} {count}" for subsystem, count in stalls.items()) or "無",
+                inline=True,
+            )
+
         await ctx.send(embed=embed)
 
     @music.command(name="nowplaying", description="顯示目前正在播放的歌曲")
@@ -213,6 +248,7 @@ class Commands(Cog):
             name="query",
         ),
         index: Option(int, "要將歌曲放置於當前播放序列的位置", name="index", required=False),
+        retry: Option(bool, "忽略最近的失敗紀錄並重新搜尋", name="retry", required=False),
     ):
         await ctx.response.defer()
 
@@ -222,7 +258,10 @@ class Commands(Cog):
 
         player.store("channel", ctx.channel.id)
 
-        results: LoadResult = await player.node.get_tracks(query)
+        if retry:
+            self.bot.lavalink.failures.forget(query)
+
+        results: LoadResult = await self.bot.lavalink.get_tracks(query, node=player.node)
 
         # Check locals
         if not results or not results.tracks:
@@ -242,7 +281,7 @@ class Commands(Cog):
 
         # Find the index song should be (In front of any autoplay songs)
         if not index:
-            index = sum(1 for t in player.queue if t.requester)
+            index = player.queue.user_count
 
         filter_warnings = [
             InfoEmbed(
@@ -272,16 +311,21 @@ class Commands(Cog):
             case LoadType.PLAYLIST:
                 # TODO: Ask user if they want to add the whole playlist or just some tracks
 
-                for iter_index, track in enumerate(results.tracks):
-                    player.add(
-                        requester=ctx.author.id, track=track, index=index + iter_index
+                added = player.add_many(results.tracks, requester=ctx.author.id, index=index)
+
+                if len(added) < len(results.tracks):
+                    filter_warnings.append(
+                        InfoEmbed(
+                            title="提醒",
+                            description=f"播放序列已滿，只加入了前 {len(added)} 首歌曲",
+                        )
                     )
 
                 # noinspection PyTypeChecker
                 await ctx.interaction.edit_original_response(
                     embeds=[
                         SuccessEmbed(
-                            title=f"'已加入播放序列' {len(results.tracks)} / {results.playlist_info.name}",
+                            title=f"'已加入播放序列' {len(added)} / {results.playlist_info.name}",
                             description=(
                                 "\n".join(
                                     [
@@ -338,7 +382,7 @@ class Commands(Cog):
                 player.queue.insert(0, player.queue.pop(target - 1))
 
             else:
-                player.queue = player.queue[target - 1 :]
+                del player.queue[:target - 1]
 
         await player.skip()
 
@@ -518,26 +562,53 @@ class Commands(Cog):
                 embed=InfoEmbed("播放序列", "播放序列中沒有歌曲")
             )
 
-        pages: list[InfoEmbed] = []
-
-        for iteration, songs_in_page in enumerate(split_list(player.queue, 10)):
-            pages.append(
-                InfoEmbed(
-                    title="播放序列",
-                    description="\n".join(
-                        [
-                            f"**[{index + 1 + (iteration * 10)}]** {track.title}"
-                            f" {'🔥' if not track.requester else ''}"
-                            for index, track in enumerate(songs_in_page)
-                        ]
-                    ),
-                )
+        def render_page(page: int) -> InfoEmbed:
+            return InfoEmbed(
+                title="播放序列",
+                description="\n".join(
+                    [
+                        f"**[{index + 1 + (page * 10)}]** {track.title}"
+                        f" {'🔥' if not track.requester else ''}"
+                        for index, track in enumerate(player.queue[page * 10:(page + 1) * 10])
+                    ]
+                ) or "播放序列中沒有歌曲",
             )
 
-        await ctx.interaction.edit_original_response(
-            embed=pages[0], view=Paginator(pages, ctx.author.id, None)
+        paginator = LazyPaginator(
+            render_page, lambda: ceil(len(player.queue) / 10), ctx.author.id, version=lambda: player.queue.version
         )
 
+        await ctx.interaction.edit_original_response(embed=paginator.render(0), view=paginator)
+
+    @music.command(name="history", description="顯示最近播放過的歌曲")
+    async def history(self, ctx: ApplicationContext):
+        await ctx.response.defer()
+
+        await ensure_voice(self.bot, ctx=ctx, should_connect=False)
+
+        player: LavaPlayer = self.bot.lavalink.player_manager.get(ctx.guild.id)
+
+        if not player.history:
+            return await ctx.interaction.edit_original_response(
+                embed=InfoEmbed("播放紀錄", "還沒有播放過任何歌曲")
+            )
+
+        def render_page(page: int) -> InfoEmbed:
+            return InfoEmbed(
+                title="播放紀錄",
+                description="\n".join(
+                    [
+                        f"**[{index + 1 + (page * 10)}]** {track.title}"
+                        f" {'🔥' if not track.requester else ''}"
+                        for index, track in enumerate(player.history.recent((page + 1) * 10)[page * 10:])
+                    ]
+                ) or "還沒有播放過任何歌曲",
+            )
+
+        paginator = LazyPaginator(render_page, lambda: ceil(len(player.history) / 10), ctx.author.id)
+
+        await ctx.interaction.edit_original_response(embed=paginator.render(0), view=paginator)
+
     @music.command(name="repeat", description="更改重複播放模式")
     async def repeat(
         self,
@@ -565,6 +636,22 @@ class Commands(Cog):
 
         await player.update_display(await ctx.interaction.original_response(), delay=5)
 
+    @music.command(name="fairqueue", description="切換公平播放模式，輪流播放每個人點的歌曲")
+    async def fairqueue(self, ctx: ApplicationContext):
+        await ctx.response.defer()
+
+        await ensure_voice(self.bot, ctx=ctx, should_connect=False)
+
+        player: LavaPlayer = self.bot.lavalink.player_manager.get(ctx.guild.id)
+
+        player.set_fair_queue(not player.fair_queue)
+
+        await ctx.interaction.edit_original_response(
+            embed=SuccessEmbed(f"公平播放模式：{'開啟' if player.fair_queue else '關閉'}")
+        )
+
+        await player.update_display(await ctx.interaction.original_response(), delay=5)
+
     @music.command(name="shuffle", description="切換隨機播放模式")
     async def shuffle(self, ctx: ApplicationContext):
         await ctx.response.defer()
@@ -1057,19 +1144,24 @@ class Commands(Cog):
 
             player.store("channel", ctx.channel.id)
 
-            index = sum(1 for t in player.queue if t.requester)
+            index = player.queue.user_count
 
             results = LoadResult.from_dict(data[playlist_info.name])
 
-            for iter_index, track in enumerate(results.tracks):
-                player.add(
-                    requester=ctx.author.id, track=track, index=index + iter_index
+            added = player.add_many(results.tracks, requester=ctx.author.id, index=index)
+
+            if len(added) < len(results.tracks):
+                filter_warnings.append(
+                    InfoEmbed(
+                        title="提醒",
+                        description=f"播放序列已滿，只加入了前 {len(added)} 首歌曲",
+                    )
                 )
 
             await ctx.interaction.edit_original_response(
                 embeds=[
                     SuccessEmbed(
-                        title=f"已加入播放序列 {len(results.tracks)}首 / {results.playlist_info.name}",
+                        title=f"已加入播放序列 {len(added)}首 / {results.playlist_info.name}",
                         description=(
                             "\n".join(
                                 [
@@ -1130,25 +1222,20 @@ class Commands(Cog):
 
                     results = LoadResult.from_dict(data[playlist_info.name])
 
-                    pages: list[InfoEmbed] = []
+                    def render_page(page: int) -> InfoEmbed:
+                        return InfoEmbed(
+                            title=f"{playlist_info.name} - 歌單資訊",
+                            description="\n".join(
+                                [
+                                    f"**[{index + 1 + (page * 10)}]** [{track.title}]({track.uri}) ({LavaPlayer._format_time((track.duration))}) by {track.author}"
+                                    for index, track in enumerate(results.tracks[page * 10:(page + 1) * 10])
+                                ]
+                            ),
+                        ).set_footer(text=f"ID: {playlist}")
+
+                    paginator = LazyPaginator(render_page, lambda: ceil(len(results.tracks) / 10), ctx.author.id)
 
-                    for iteration, songs_in_page in enumerate(
-                        split_list(results.tracks, 10)
-                    ):
-                        pages.append(
-                            InfoEmbed(
-                                title=f"{playlist_info.name} - 歌單資訊",
-                                description="\n".join(
-                                    [
-                                        f"**[{index + 1 + (iteration * 10)}]** [{track.title}]({track.uri}) ({LavaPlayer._format_time((track.duration))}) by {track.author}"
-                                        for index, track in enumerate(songs_in_page)
-                                    ]
-                                ),
-                            ).set_footer(text=f"ID: {playlist}")
-                        )
-                    await ctx.interaction.edit_original_response(
-                        embed=pages[0], view=Paginator(pages, ctx.author.id, None)
-                    )
+                    await ctx.interaction.edit_original_response(embed=paginator.render(0), view=paginator)
                 except TypeError:
                     pass
             else:
@@ -1163,25 +1250,22 @@ class Commands(Cog):
 
                 results = LoadResult.from_dict(data[playlist_info.name])
 
-                pages: list[InfoEmbed] = []
+                owner_name = await self.bot.get_user_name(int(playlist_info.owner_id))
 
-                for iteration, songs_in_page in enumerate(
-                    split_list(results.tracks, 10)
-                ):
-                    pages.append(
-                        InfoEmbed(
-                            title=f"{playlist_info.name} - 歌單資訊 by {self.bot.get_user(int(playlist_info.owner_id)).name}",
-                            description="\n".join(
-                                [
-                                    f"**[{index + 1 + (iteration * 10)}]** {track.title}"
-                                    for index, track in enumerate(songs_in_page)
-                                ]
-                            ),
-                        ).set_footer(text=f"ID: {playlist}")
-                    )
-                await ctx.interaction.edit_original_response(
-                    embed=pages[0], view=Paginator(pages, ctx.author.id, None)
-                )
+                def render_page(page: int) -> InfoEmbed:
+                    return InfoEmbed(
+                        title=f"{playlist_info.name} - 歌單資訊 by {owner_name}",
+                        description="\n".join(
+                            [
+                                f"**[{index + 1 + (page * 10)}]** {track.title}"
+                                for index, track in enumerate(results.tracks[page * 10:(page + 1) * 10])
+                            ]
+                        ),
+                    ).set_footer(text=f"ID: {playlist}")
+
+                paginator = LazyPaginator(render_page, lambda: ceil(len(results.tracks) / 10), ctx.author.id)
+
+                await ctx.interaction.edit_original_response(embed=paginator.render(0), view=paginator)
 
 
 def setup(bot):
@@ -8,7 +8,8 @@ from lavalink import TrackLoadFailedEvent, TrackStartEvent, PlayerUpdateEvent, T
 
 from lava.bot import Bot
 from lava.embeds import ErrorEmbed
-from lava.errors import MissingVoicePermissions, BotNotInVoice, UserNotInVoice, UserInDifferentChannel
+from lava.log import SAMPLE_RARELY
+from lava.errors import MissingVoicePermissions, BotNotInVoice, UserNotInVoice, UserInDifferentChannel, QueueFull
 from lava.utils import ensure_voice
 from lava.classes.player import LavaPlayer
 
@@ -23,31 +24,39 @@ class Events(Cog):
 
     @Cog.listener(name="on_ready")
     async def on_ready(self):
-        self.bot.lavalink.add_event_hook(self.on_player_update, event=PlayerUpdateEvent)
-        self.bot.lavalink.add_event_hook(self.on_track_start, event=TrackStartEvent)
-        self.bot.lavalink.add_event_hook(self.on_track_end, event=TrackEndEvent)
-        self.bot.lavalink.add_event_hook(self.on_queue_end, event=QueueEndEvent)
-        self.bot.lavalink.add_event_hook(self.on_track_load_failed, event=TrackLoadFailedEvent)
+        events = self.bot.lavalink.events
+
+        events.add_handler(self.on_player_update, event=PlayerUpdateEvent)
+        events.add_handler(self.on_track_start, event=TrackStartEvent)
+        events.add_handler(self.on_track_end, event=TrackEndEvent)
+        events.add_handler(self.on_queue_end, event=QueueEndEvent)
+        events.add_handler(self.on_track_load_failed, event=TrackLoadFailedEvent)
 
     async def on_player_update(self, event: PlayerUpdateEvent):
         player: LavaPlayer = event.player
 
-        self.bot.logger.info("Received player update event for guild %s", player.guild)
-
-        _ = self.bot.loop.create_task(player.check_autoplay())
+        self.bot.logger.debug("Received player update event for guild %d", player.guild_id, extra=SAMPLE_RARELY)
 
         try:
             await player.update_display()
         except ValueError:
             pass
 
+    @Cog.listener(name="on_queue_changed")
+    async def on_queue_changed(self, player: LavaPlayer):
+        player.request_autoplay()
+
     async def on_track_start(self, event: TrackStartEvent):
         player: LavaPlayer = event.player
 
-        self.bot.logger.info("Received track start event for guild %s", player.guild)
+        self.bot.logger.debug("Received track start event for guild %d", player.guild_id)
+
+        player.history.append(event.track)
 
         player.reset_lyrics()
-        _ = player.lyrics  # Fetch the lyrics
+        await player.fetch_lyrics()
+
+        player.request_autoplay()
 
         try:
             await player.update_display()
@@ -57,7 +66,7 @@ class Events(Cog):
     async def on_track_end(self, event: TrackEndEvent):
         player: LavaPlayer = event.player
 
-        self.bot.logger.info("Received track end event for guild %s", player.guild)
+        self.bot.logger.debug("Received track end event for guild %d", player.guild_id)
 
         try:
             await player.update_display(new_message=await player.message.channel.send("..."))
@@ -69,7 +78,7 @@ class Events(Cog):
     async def on_queue_end(self, event: QueueEndEvent):
         player: LavaPlayer = event.player
 
-        self.bot.logger.info("Received queue end event for guild %s", player.guild)
+        self.bot.logger.debug("Received queue end event for guild %d", player.guild_id)
 
         await player.guild.voice_client.disconnect(force=False)
 
@@ -81,7 +90,7 @@ class Events(Cog):
     async def on_track_load_failed(self, event: TrackLoadFailedEvent):
         player: LavaPlayer = event.player
 
-        self.bot.logger.info("Received track load failed event for guild %s", player.guild)
+        self.bot.logger.info("Received track load failed event for guild %d", player.guild_id)
 
         message = await player.message.channel.send(
             embed=ErrorEmbed(
@@ -119,6 +128,12 @@ class Events(Cog):
                 f"你必須與我在同一個語音頻道 <#{error.original.voice.id}>"
             )
 
+        elif isinstance(error.original, QueueFull):
+            embed = ErrorEmbed(
+                '指令錯誤',
+                f"播放序列已滿，最多只能有 {error.original.max_length} 首歌曲"
+            )
+
         else:
             raise error.original
 
@@ -136,6 +151,9 @@ class Events(Cog):
         ):
             player: LavaPlayer = self.bot.lavalink.player_manager.get(member.guild.id)
 
+            if player is None:  # Evicted, it was destroyed right after leaving
+                return
+
             await player.stop()
             player.queue.clear()
 
@@ -0,0 +1,139 @@
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Iterable, Optional, Set
+
+from lavalink import AudioTrack
+
+from lava.decoder import decode_track, TrackDecodeError
+
+if TYPE_CHECKING:
+    from lava.classes.player import LavaPlayer
+
+QUEUE_LOW_WATERMARK = 5  # Refill the queue with recommendations once it has fewer tracks than this
+POOL_LOW_WATERMARK = 5  # Fetch a new radio mix once the pool has fewer tracks than this
+POOL_MAX_SIZE = 100
+HISTORY_SEED_COUNT = 5  # How many recently played tracks to try as radio mix seeds
+SEED_MEMORY_SIZE = 50  # How many radio mix seeds to remember, older seeds may be used again
+
+
+class RecommendationPool:
+    """
+    The recommended tracks fetched for a player that haven't been queued yet.
+
+    A YouTube radio mix returns far more tracks than a single autoplay refill needs,
+    the rest of the mix is kept here so the next refills don't need another Lavalink request.
+    """
+
+    def __init__(self, max_size: int = POOL_MAX_SIZE, seed_memory_size: int = SEED_MEMORY_SIZE):
+        self.max_size = max_size
+
+        self._tracks: Deque[AudioTrack] = deque()
+        self._identifiers: Set[str] = set()
+
+        # Identifiers of the latest tracks that radio mixes were already fetched for
+        self.seeds: Deque[str] = deque(maxlen=seed_memory_size)
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def extend(self, tracks: Iterable[AudioTrack]):
+        """
+        Add tracks to the pool, tracks already in the pool are ignored.
+
+        :param tracks: The tracks to add.
+        """
+        for track in tracks:
+            if len(self._tracks) >= self.max_size:
+                break
+
+            if track.identifier in self._identifiers:
+                continue
+
+            self._tracks.append(track)
+            self._identifiers.add(track.identifier)
+
+    def take(self, count: int, excluded: Set[str]) -> list[AudioTrack]:
+        """
+        Take tracks from the front of the pool.
+
+        :param count: The max amount of tracks to take.
+        :param excluded: Identifiers of tracks that must not be taken, they are dropped from the pool.
+            Identifiers of the taken tracks are added to this set.
+        :return: The taken tracks.
+        """
+        taken: list[AudioTrack] = []
+
+        while self._tracks and len(taken) < count:
+            track = self._tracks.popleft()
+            self._identifiers.discard(track.identifier)
+
+            if track.identifier in excluded:
+                continue
+
+            excluded.add(track.identifier)
+            taken.append(track)
+
+        return taken
+
+    def clear(self):
+        self._tracks.clear()
+        self._identifiers.clear()
+        self.seeds.clear()
+
+
+async def resolve_seed(player: "LavaPlayer", track: AudioTrack) -> Optional[AudioTrack]:
+    """
+    Get the original track behind the given track, usually from YouTube.
+
+    :param player: The player instance.
+    :param track: The track to resolve.
+    :return: The original track, None if the track isn't loaded yet.
+    """
+    if not track.track:
+        return None
+
+    try:
+        return decode_track(track.track)
+    except TrackDecodeError:
+        return await player.bot.lavalink.decode_track(track.track, node=player.node)
+
+
+async def get_recommended_tracks(player: "LavaPlayer", track: AudioTrack, max_results: int) -> list[AudioTrack]:
+    """
+    Get recommended tracks for the player.
+
+    Tracks are taken from the player's recommendation pool first, a new radio mix is only fetched
+    when the pool runs low. Radio mixes are shared between guilds, so tracks that are queued, playing
+    or in the play history are filtered out afterwards and never recommended.
+
+    The current track is tried as the seed first, then the recently played tracks.
+
+    :param player: The player instance.
+    :param track: The seed track to get recommended tracks from.
+    :param max_results: The max amount of tracks to get.
+    """
+    pool = player.recommendations
+
+    excluded = {queued.identifier for queued in player.queue} | player.history.identifiers()
+
+    if player.current:
+        excluded.add(player.current.identifier)
+
+    results = pool.take(max_results, excluded)
+
+    if len(results) >= max_results and len(pool) >= POOL_LOW_WATERMARK:
+        return results
+
+    candidates = [track, *player.history.recent(HISTORY_SEED_COUNT), *reversed(results), *reversed(player.queue)]
+
+    for candidate in candidates:
+        seed = await resolve_seed(player, candidate)
+
+        if not seed or seed.source_name != "youtube" or seed.identifier in pool.seeds:
+            continue
+
+        pool.seeds.append(seed.identifier)
+        pool.extend(await player.bot.lavalink.get_radio_mix(seed, node=player.node))
+
+        break
+
+    return results + pool.take(max_results - len(results), excluded)
@@ -1,25 +1,170 @@
 import json
 from logging import Logger
+from os import getenv
 from typing import Optional
 
-from discord.ext.commands import Bot as OriginalBot
+from discord import HTTPException
+from discord.ext.commands import Bot as OriginalBot, AutoShardedBot
+from lavalink import NodeReadyEvent, RequestError
 
 from lava.classes.lavalink_client import LavalinkClient
+from lava.cache import TTLCache
+from lava.classes.node_selector import NodeLimits
+from lava.intents import intents_from_env, member_cache_from_env
+from lava.metrics import MetricsServer, register_client_metrics
 from lava.source import SourceManager
+from lava.store import StateStore
+from lava.watchdog import LoopWatchdog, STALL_THRESHOLD
 
 
 class Bot(OriginalBot):
-    def __init__(self, logger: Logger, **kwargs):
+    def __init__(self, logger: Logger, worker: Optional[int] = None, **kwargs):
+        kwargs.setdefault('intents', intents_from_env())
+        kwargs.setdefault('member_cache_flags', member_cache_from_env(kwargs['intents']))
+        kwargs.setdefault('chunk_guilds_at_startup', False)
+
         super().__init__(**kwargs)
 
         self.logger = logger
+        self.worker = worker  # The id of this process when running as one of the launcher's workers
 
         self._lavalink: Optional[LavalinkClient] = None
 
+        self.state = StateStore(getenv("STATE_DB", "state.db"))
+        self.resume_timeout: int = int(getenv("LAVALINK_RESUME_TIMEOUT", 60))
+
+        self._user_names: TTLCache = TTLCache(maxsize=1024, ttl=3600)
+
+        self.metrics_server: Optional[MetricsServer] = None
+        self.watchdog: Optional[LoopWatchdog] = None
+
     async def on_ready(self):
         self.logger.info("The bot is ready! Logged in as %s" % self.user)
 
-        self.__setup_lavalink_client()
+        if self._lavalink is None:  # on_ready fires again after the gateway reconnects
+            self.__setup_lavalink_client()
+
+        self.start_watchdog()
+
+        await self.start_metrics()
+
+    def start_watchdog(self):
+        """
+        Watch the event loop for callbacks blocking it longer than LOOP_STALL_THRESHOLD seconds,
+        0 turns the watchdog off. Does nothing if it's already watching.
+        """
+        threshold = float(getenv("LOOP_STALL_THRESHOLD", STALL_THRESHOLD))
+
+        if threshold <= 0 or self.watchdog is not None:
+            return
+
+        self.watchdog = LoopWatchdog(self.loop, threshold=threshold)
+        self.watchdog.start()
+
+    async def start_metrics(self):
+        """
+        Serve the metrics on the local port set with METRICS_PORT, every worker uses the next port.
+        Does nothing if METRICS_PORT isn't set or the metrics are already served.
+        """
+        port = int(getenv("METRICS_PORT", 0))
+
+        if not port or self.metrics_server is not None:
+            return
+
+        self.metrics_server = MetricsServer(host=getenv("METRICS_HOST", "127.0.0.1"), port=port + (self.worker or 0))
+
+        await self.metrics_server.start()
+
+        self.logger.info("Serving metrics on %s:%d", self.metrics_server.host, self.metrics_server.port)
+
+    async def close(self):
+        """
+        Save the players before closing, and stay in the voice channels,
+        so the players can be resumed on the Lavalink nodes after a restart.
+        """
+        if self._lavalink is not None:
+            await self._lavalink.events.close()
+            await self._lavalink.player_manager.close()
+
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+
+        if self.watchdog is not None:
+            self.watchdog.stop()
+
+        if self._lavalink is not None and self.resume_timeout > 0:
+            saved = self._lavalink.player_manager.save_snapshots()
+
+            self.logger.info("Saved %d players for resuming", saved)
+
+            for voice_client in list(self.voice_clients):
+                voice_client.cleanup()  # Forget the voice client without leaving the channel
+
+        await super().close()
+
+        if self._lavalink is not None:
+            await self._lavalink.close()
+
+        self.state.close()
+
+    def session_key(self, node_name: str) -> str:
+        """
+        Every worker process has its own Lavalink session on each node.
+
+        :param node_name: The name of the node.
+        :return: The key the session id of the node is stored with.
+        """
+        return node_name if self.worker is None else f"{node_name}#{self.worker}"
+
+    async def on_lavalink_node_ready(self, event: NodeReadyEvent):
+        node = getattr(event.node, '_node', event.node)  # The event is dispatched with the node's transport
+
+        self.state.set_session(self.session_key(node.name), event.session_id)
+
+        if self.resume_timeout > 0:
+            try:
+                await node.update_session(resuming=True, timeout=self.resume_timeout)
+            except RequestError:
+                self.logger.warning("Failed to enable resuming on lavalink node %s", node.name)
+
+        await self.lavalink.player_manager.restore_snapshots(node, event.resumed)
+
+    async def get_user_name(self, user_id: int) -> str:
+        """
+        Get the name of a user, users are mostly not cached so the names are fetched and cached here.
+
+        :param user_id: The id of the user.
+        :return: The name of the user, the id if the user can't be fetched.
+        """
+        name = self._user_names.get(user_id)
+
+        if name is not None:
+            return name
+
+        user = self.get_user(user_id)
+
+        if user is None:
+            try:
+                user = await self.fetch_user(user_id)
+            except HTTPException:
+                return str(user_id)
+
+        self._user_names.set(user_id, user.name)
+
+        return user.name
+
+    def owns_guild(self, guild_id: int) -> bool:
+        """
+        Whether the guild is on one of the shards of this process.
+
+        :param guild_id: The guild id.
+        """
+        shard_ids = getattr(self, 'shard_ids', None)
+
+        if shard_ids is None or not self.shard_count:
+            return True
+
+        return (guild_id >> 22) % self.shard_count in shard_ids
 
     @property
     def lavalink(self) -> LavalinkClient:
@@ -45,11 +190,35 @@ class Bot(OriginalBot):
         with open("configs/lavalink.json", "r") as f:
             config = json.load(f)
 
+        node_selector = self.lavalink.player_manager.node_selector
+
         for node in config['nodes']:
             self.logger.debug("Adding lavalink node %s", node['host'])
 
-            self.lavalink.add_node(**node)
+            node.setdefault('name', node['host'])
+            node['session_id'] = self.state.get_session(self.session_key(node['name']))
+
+            limits = NodeLimits(max_players=node.pop('max_players', None), max_load=node.pop('max_load', None))
+
+            added_node = self.lavalink.add_node(**node)
+
+            if hasattr(node_selector, 'limits'):
+                node_selector.limits[added_node.name] = limits
 
         self.logger.info("Done loading lavalink nodes!")
 
         self.lavalink.register_source(SourceManager())
+
+        register_client_metrics(self._lavalink)
+
+        self.lavalink.add_event_hook(self.on_lavalink_node_ready, event=NodeReadyEvent)
+
+        self.lavalink.player_manager.start_reaper()
+        self.lavalink.player_manager.start_rebalancer()
+        self.lavalink.player_manager.start_snapshotter()
+
+
+class ShardedBot(Bot, AutoShardedBot):
+    """
+    The Bot running a part of the shards, pass shard_ids and shard_count. Used by the launcher's workers.
+    """
@@ -0,0 +1,272 @@
+import asyncio
+import json
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from logging import getLogger
+from time import monotonic, time
+from typing import Any, Hashable, Optional, Tuple
+
+MISSING = object()
+
+
+class TTLCache:
+    """
+    A bounded LRU cache whose entries expire after a time-to-live.
+
+    Parameters:
+    ----------
+    maxsize: int
+        The maximum amount of entries, the least recently used entry is evicted when it's full.
+    ttl: float
+        The default time-to-live of entries in seconds.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, MISSING, count=False) is not MISSING
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        """
+        Get a value from the cache.
+
+        :param key: The key to look up.
+        :param default: The value to return if the key is missing or expired.
+        :param count: Whether this lookup should be counted in the hit/miss statistics.
+        :return: The cached value, or default.
+        """
+        entry = self._data.get(key)
+
+        if entry is None or entry[0] < monotonic():
+            if entry is not None:
+                del self._data[key]
+
+            if count:
+                self.misses += 1
+
+            return default
+
+        self._data.move_to_end(key)
+
+        if count:
+            self.hits += 1
+
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Put a value into the cache.
+
+        :param key: The key to store the value with.
+        :param value: The value to store.
+        :param ttl: The time-to-live of this entry in seconds, defaults to the cache's ttl.
+        """
+        self._data[key] = (monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Remove a value from the cache.
+
+        :param key: The key to remove.
+        :param default: The value to return if the key doesn't exist.
+        :return: The removed value, or default.
+        """
+        entry = self._data.pop(key, None)
+
+        if entry is None or entry[0] < monotonic():
+            return default
+
+        return entry[1]
+
+    def clear(self):
+        self._data.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+
+        return self.hits / lookups if lookups else 0.0
+
+
+class FailureCache(TTLCache):
+    """
+    Remembers queries that recently failed to resolve, along with the reason, so the same dead link
+    doesn't cost another round of extraction and Lavalink requests.
+    """
+    SCOPES = ('lavalink', 'local', 'ytdl')
+
+    def get_reason(self, scope: str, query: str) -> Optional[str]:
+        """
+        Get the reason a query failed in the given scope.
+
+        :param scope: Where the query failed, one of SCOPES.
+        :param query: The query.
+        :return: The failure reason, None if the query didn't fail recently.
+        """
+        return self.get((scope, query))
+
+    def add(self, scope: str, query: str, reason: str):
+        """
+        Record a failed query.
+
+        :param scope: Where the query failed, one of SCOPES.
+        :param query: The query.
+        :param reason: Why the query failed.
+        """
+        self.set((scope, query), reason)
+
+    def forget(self, query: str):
+        """
+        Forget all failures of the query, used when the user explicitly retries.
+
+        :param query: The query.
+        """
+        for scope in self.SCOPES:
+            self.pop((scope, query))
+
+
+class SharedCache:
+    """
+    A bounded cache whose entries expire after a time-to-live, stored in a sqlite database,
+    so every process using the same file shares it. Keys and values must be JSON serializable.
+
+    The database is only touched by a thread of its own, so the event loop never waits on the disk.
+    Lookups are awaited, writes are queued in order and not waited for.
+
+    Expired entries and the entries past maxsize (the ones expiring first) are pruned every prune_every writes.
+
+    Parameters:
+    ----------
+    path: str
+        The path of the sqlite database file.
+    maxsize: int
+        The maximum amount of entries.
+    ttl: float
+        The default time-to-live of entries in seconds.
+    prune_every: int
+        How many writes to do between prunes.
+    """
+
+    def __init__(self, path: str, maxsize: int, ttl: float, prune_every: int = 100):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.prune_every = prune_every
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lava-shared-cache')
+        self._executor.submit(self._open).result()
+
+        self._writes: int = 0
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+    async def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a value from the cache.
+
+        :param key: The key to look up.
+        :param default: The value to return if the key is missing or expired.
+        :return: The cached value, or default.
+        """
+        row = await asyncio.get_running_loop().run_in_executor(self._executor, self._select, self._key(key))
+
+        if row is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+
+        return json.loads(row[0])
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Queue a value to be put into the cache, this doesn't wait for the write.
+
+        :param key: The key to store the value with.
+        :param value: The value to store.
+        :param ttl: The time-to-live of this entry in seconds, defaults to the cache's ttl.
+        """
+        self._writes += 1
+
+        future = self._executor.submit(
+            self._insert, self._key(key), json.dumps(value, separators=(',', ':')),
+            time() + (self.ttl if ttl is None else ttl), self._writes % self.prune_every == 0
+        )
+        future.add_done_callback(self._log_failure)
+
+    def clear(self):
+        self._executor.submit(self._connection.execute, 'DELETE FROM cache').add_done_callback(self._log_failure)
+
+    def close(self):
+        """
+        Write the queued values and close the database.
+        """
+        self._executor.submit(self._connection.close)
+        self._executor.shutdown(wait=True)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+
+        return self.hits / lookups if lookups else 0.0
+
+    def _open(self):
+        self._connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)'
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)')
+
+    def _select(self, key: str) -> Optional[Tuple[str]]:
+        return self._connection.execute(
+            'SELECT value FROM cache WHERE key = ? AND expires >= ?', (key, time())
+        ).fetchone()
+
+    def _insert(self, key: str, value: str, expires: float, prune: bool):
+        self._connection.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)', (key, value, expires)
+        )
+
+        if prune:
+            self._prune()
+
+    def _prune(self):
+        """
+        Delete the expired entries, then the entries expiring first until there are at most maxsize entries.
+        """
+        with self._connection:
+            self._connection.execute('BEGIN')
+            self._connection.execute('DELETE FROM cache WHERE expires < ?', (time(),))
+            self._connection.execute(
+                'DELETE FROM cache WHERE key IN '
+                '(SELECT key FROM cache ORDER BY expires LIMIT MAX(0, (SELECT COUNT(*) FROM cache) - ?))',
+                (self.maxsize,)
+            )
+
+    @staticmethod
+    def _log_failure(future: Future):
+        if future.exception() is not None:
+            getLogger('lava.cache').error("Shared cache write failed", exc_info=future.exception())
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return json.dumps(key, separators=(',', ':'))
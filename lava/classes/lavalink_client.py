@@ -1,17 +1,243 @@
-from typing import TYPE_CHECKING
+import asyncio
+from os import getenv
+from typing import TYPE_CHECKING, Optional, Dict, Hashable, Callable, Awaitable, List
 
-from lavalink import Client
+from lavalink import Client, LoadResult, LoadType, Node, AudioTrack
+from lavalink.server import LoadResultError
 
+from lava.cache import FailureCache, TTLCache, SharedCache
+from lava.classes.node_manager import LavaNodeManager
 from lava.classes.player import LavaPlayer
 from lava.classes.player_manager import LavaPlayerManager
+from lava.metrics import LAVALINK_LOAD_LATENCY
+from lava.pipeline import EventPipeline, MAILBOX_SIZE
+from lava.snapshot import serialize_result, deserialize_result
+from lava.source import SourceManager
+from lava.utils import clone_result
 
 if TYPE_CHECKING:
     from lava.bot import Bot
 
+SEARCH_RESULT_TTL = 600  # Search results change over time, keep them for 10 minutes
+URL_RESULT_TTL = 3600  # A track or playlist url resolves to the same thing for much longer
+RADIO_MIX_TTL = 1800  # Radio mixes are regenerated by YouTube every now and then
+
+
+def resolution_ttl(query: str) -> int:
+    """
+    Get how long the load result of a query should be cached.
+
+    :param query: The query that was resolved.
+    :return: The time-to-live in seconds.
+    """
+    if query.startswith(('http://', 'https://')):
+        return URL_RESULT_TTL
+
+    return SEARCH_RESULT_TTL
+
 
 class LavalinkClient(Client):
     def __init__(self, bot: "Bot", *args, **kwargs):
         super().__init__(player=LavaPlayer, *args, **kwargs)
 
         self.bot: Bot = bot
+        self.node_manager: LavaNodeManager = LavaNodeManager(
+            self, self.node_manager.regions, self.node_manager._connect_back  # skipcq: PYL-W0212
+        )
         self.player_manager: LavaPlayerManager = LavaPlayerManager(bot=bot, client=self)
+
+        self.failures: FailureCache = FailureCache(
+            maxsize=int(getenv("FAILURE_CACHE_SIZE", 2048)), ttl=int(getenv("FAILURE_CACHE_TTL", 300))
+        )
+        self.results: TTLCache = TTLCache(maxsize=int(getenv("RESULT_CACHE_SIZE", 512)), ttl=SEARCH_RESULT_TTL)
+        self.radio_mixes: TTLCache = TTLCache(
+            maxsize=int(getenv("RADIO_MIX_CACHE_SIZE", 256)), ttl=int(getenv("RADIO_MIX_CACHE_TTL", RADIO_MIX_TTL))
+        )
+
+        # Shared by every process using the same file, behind the per-process caches above.
+        # Only used by the launcher's workers, or when SHARED_CACHE_DB is set.
+        self.shared: Optional[SharedCache] = None
+
+        if bot.worker is not None or getenv("SHARED_CACHE_DB"):
+            self.shared = SharedCache(
+                getenv("SHARED_CACHE_DB", "cache.db"), maxsize=int(getenv("SHARED_CACHE_SIZE", 20000)),
+                ttl=URL_RESULT_TTL
+            )
+
+        self._pending_results: Dict[Hashable, asyncio.Task] = {}
+
+        self.events: EventPipeline = EventPipeline(self, mailbox_size=int(getenv("EVENT_MAILBOX_SIZE", MAILBOX_SIZE)))
+
+    async def close(self):
+        """
+        Same as the original Client.close(), but the event pipeline, the background tasks of the player manager
+        and the shared cache are closed too.
+        """
+        await self.events.close()
+        await self.player_manager.close()
+        await super().close()
+
+        if self.shared is not None:
+            self.shared.close()
+
+    async def get_tracks(self,
+                         query: str,
+                         node: Optional[Node] = None,
+                         check_local: bool = False,
+                         cache: bool = True) -> LoadResult:
+        """
+        Same as the original Client.get_tracks(), but successful results are cached, concurrent identical
+        loads share a single request, and queries that failed recently are not retried.
+
+        :param query: The query to search for.
+        :param node: The node to use for track lookup, a random node if not specified.
+        :param check_local: Whether to search the query on the registered sources first.
+        :param cache: Whether to use the result cache, disable this for one-shot urls such as signed media urls.
+        :return: The load result, empty if the query failed recently.
+        """
+        if not cache or check_local and not self.is_local_cacheable(query):
+            return await self._load_tracks(query, node, check_local)
+
+        return await self._resolve(
+            ('tracks', query, check_local), query, lambda: self._load_tracks(query, node, check_local)
+        )
+
+    async def get_local_tracks(self, query: str) -> LoadResult:
+        """
+        Same as the original Client.get_local_tracks(), but goes through the result cache too,
+        unless the source loading it returns signed media urls, which expire before the cache entry would.
+        Errors raised by the sources are turned into an error load result instead of propagating.
+
+        :param query: The query to search for.
+        :return: The load result.
+        """
+        if not self.is_local_cacheable(query):
+            return await self._load_local_tracks(query)
+
+        return await self._resolve(('local', query), query, lambda: self._load_local_tracks(query))
+
+    def is_local_cacheable(self, query: str) -> bool:
+        """
+        Check whether the registered sources allow caching the load result of a query.
+
+        :param query: The query.
+        :return: Whether the result can be cached.
+        """
+        return all(source.is_cacheable(query) for source in self.sources if isinstance(source, SourceManager))
+
+    async def get_radio_mix(self, seed: AudioTrack, node: Optional[Node] = None) -> List[AudioTrack]:
+        """
+        Get the YouTube radio mix of a seed track.
+
+        Mixes are cached by seed identifier and shared between all guilds, so guilds playing the same
+        track only cost a single Lavalink request. Guild specific filtering is up to the caller.
+
+        :param seed: The YouTube track to get the mix of.
+        :param node: The node to use for track lookup, a random node if not specified.
+        :return: Copies of the tracks in the mix, without the seed itself.
+        """
+        query = f"https://music.youtube.com/watch?v={seed.identifier}8&list=RD{seed.identifier}"
+
+        result = await self._resolve(
+            ('radio', seed.identifier), query, lambda: self._load_tracks(query, node, False), cache=self.radio_mixes
+        )
+
+        return [track for track in result.tracks if track.identifier != seed.identifier]
+
+    async def _resolve(self,
+                       key: Hashable,
+                       query: str,
+                       loader: Callable[[], Awaitable[LoadResult]],
+                       cache: Optional[TTLCache] = None) -> LoadResult:
+        """
+        Resolve a query through the result cache, then the shared cache.
+
+        :param key: The cache key of the query.
+        :param query: The query, used to determine the cache time-to-live.
+        :param loader: Called to load the result on a cache miss.
+        :param cache: The cache to use, defaults to the result cache. Entries use the cache's own time-to-live
+            when this is given.
+        :return: A copy of the load result that is safe to modify.
+        """
+        cache = self.results if cache is None else cache
+        result = cache.get(key)
+
+        if result is not None:
+            return clone_result(result)
+
+        data = await self.shared.get(key) if self.shared is not None else None
+
+        if data is not None:
+            result = deserialize_result(data)
+            cache.set(key, result, ttl=resolution_ttl(query) if cache is self.results else None)
+
+            return clone_result(result)
+
+        task = self._pending_results.get(key)
+
+        if task is None:
+            task = self._pending_results[key] = asyncio.ensure_future(loader())
+            task.add_done_callback(lambda done: self._store_result(cache, key, query, done))
+
+        result = await asyncio.shield(task)  # Callers being cancelled must not cancel the shared load
+
+        return clone_result(result) if result else result
+
+    def _store_result(self, cache: TTLCache, key: Hashable, query: str, task: asyncio.Task):
+        self._pending_results.pop(key, None)
+
+        if task.cancelled() or task.exception():
+            return
+
+        result = task.result()
+
+        if result and result.tracks:
+            ttl = resolution_ttl(query) if cache is self.results else cache.ttl
+
+            cache.set(key, result, ttl=ttl)
+
+            if self.shared is not None:
+                self.shared.set(key, serialize_result(result), ttl=ttl)
+
+    async def _load_local_tracks(self, query: str) -> LoadResult:
+        reason = self.failures.get_reason('local', query)
+
+        if reason is not None:
+            self.bot.logger.debug("Skipping local query %s, it failed recently: %s", query, reason)
+            return LoadResult.empty()
+
+        try:
+            return await super().get_local_tracks(query)
+        except Exception as error:  # skipcq: PYL-W0703
+            self.bot.logger.error("Failed to load query %s from the local sources", query, exc_info=error)
+
+            if self.failures.get_reason('local', query) is None:  # The source manager records it with the source
+                self.failures.add('local', query, repr(error))
+
+            return LoadResult(LoadType.ERROR, [], error=LoadResultError(
+                {'message': str(error), 'severity': 'common', 'cause': repr(error)}
+            ))
+
+    async def _load_tracks(self, query: str, node: Optional[Node], check_local: bool) -> LoadResult:
+        if check_local:
+            result = await self.get_local_tracks(query)
+
+            if result.tracks:
+                return result
+
+        reason = self.failures.get_reason('lavalink', query)
+
+        if reason is not None:
+            self.bot.logger.debug("Skipping query %s, it failed recently: %s", query, reason)
+            return LoadResult.empty()
+
+        with LAVALINK_LOAD_LATENCY.time():
+            result = await super().get_tracks(query, node=node)
+
+        if result.load_type == LoadType.ERROR:
+            self.failures.add('lavalink', query, result.error.message if result.error else 'Unknown error')
+
+        elif not result.tracks:
+            self.failures.add('lavalink', query, 'No matches')
+
+        return result
@@ -0,0 +1,12 @@
+from lavalink import NodeManager, Node
+
+
+class LavaNodeManager(NodeManager):
+    """
+    The custom implemented NodeManager for Lava.
+
+    Failover is left to the LavaPlayerManager, so players are moved to the node its node selector picks.
+    """
+
+    async def _handle_node_disconnect(self, node: Node):
+        await self.client.player_manager.failover(node)
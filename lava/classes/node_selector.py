@@ -0,0 +1,181 @@
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from lavalink import Node, NodeManager
+
+if TYPE_CHECKING:
+    from lava.classes.player import LavaPlayer
+
+REGION_PENALTY = 100  # Extra load a node outside of the requested region counts as
+HOT_MARGIN = 50  # How much more loaded than the least loaded node a node must be to count as hot
+
+
+class NodeLimits:
+    """
+    The headroom limits of a node, nodes over a limit don't get new players unless every node is over its limits.
+
+    Parameters:
+    ----------
+    max_players: Optional[int]
+        The maximum amount of playing players.
+    max_load: Optional[float]
+        The maximum system CPU load, between 0 and 1.
+    """
+
+    def __init__(self, max_players: Optional[int] = None, max_load: Optional[float] = None):
+        self.max_players = max_players
+        self.max_load = max_load
+
+
+class NodeSelector:
+    """
+    Chooses the node a new player is created on, and which nodes players should be moved off.
+
+    This one is the original behaviour, the node with the lowest Lavalink penalty,
+    subclass it to plug in another strategy.
+    """
+
+    def select(self,
+               manager: NodeManager,
+               region: Optional[str] = None,
+               exclude: Optional[List[Node]] = None) -> Optional[Node]:
+        """
+        Choose a node for a new player.
+
+        :param manager: The node manager holding the nodes.
+        :param region: The region to prefer.
+        :param exclude: Nodes that must not be chosen.
+        :return: The chosen node, None if no node is available.
+        """
+        return manager.find_ideal_node(region, exclude)
+
+    def is_hot(self, manager: NodeManager, node: Node) -> bool:
+        """
+        Whether players should be moved off the node.
+
+        :param manager: The node manager holding the nodes.
+        :param node: The node to check.
+        """
+        return False
+
+    def candidate_nodes(self, manager: NodeManager) -> List[Node]:
+        """
+        :return: The nodes players can be placed on.
+        """
+        return manager.nodes
+
+    def rebalance_targets(self, manager: NodeManager, max_moves: int) -> Dict["LavaPlayer", Node]:
+        """
+        Plan moving idle players off hot nodes, players that are playing are left alone so nobody hears a gap.
+
+        :param manager: The node manager holding the nodes.
+        :param max_moves: The maximum amount of players to move.
+        :return: The players to move and the node to move them to.
+        """
+        moves: Dict["LavaPlayer", Node] = {}
+
+        for node in self.candidate_nodes(manager):
+            if not self.is_hot(manager, node):
+                continue
+
+            for player in node.players:
+                if len(moves) >= max_moves:
+                    return moves
+
+                if player.is_playing:
+                    continue
+
+                target = self.select(manager, node.region, exclude=[node])
+
+                if target is None or self.is_hot(manager, target):
+                    break
+
+                moves[player] = target
+
+        return moves
+
+
+class LoadAwareNodeSelector(NodeSelector):
+    """
+    Chooses the least loaded connected node with headroom, preferring the requested region.
+
+    Node stats are only sent by Lavalink every minute, so the playing players in the stats penalty are
+    replaced with the live count of our own playing players on the node.
+
+    Parameters:
+    ----------
+    limits: Optional[Dict[str, NodeLimits]]
+        The headroom limits of the nodes, by node name.
+    region_penalty: float
+        Extra load a node outside of the requested region counts as.
+    hot_margin: float
+        How much more loaded than the least loaded node a node must be to count as hot.
+    """
+
+    def __init__(self,
+                 limits: Optional[Dict[str, NodeLimits]] = None,
+                 region_penalty: float = REGION_PENALTY,
+                 hot_margin: float = HOT_MARGIN):
+        self.limits: Dict[str, NodeLimits] = limits or {}
+        self.region_penalty = region_penalty
+        self.hot_margin = hot_margin
+
+    def candidate_nodes(self, manager: NodeManager) -> List[Node]:
+        return [node for node in manager.nodes if node._transport.ws_connected]  # skipcq: PYL-W0212
+
+    @staticmethod
+    def playing_players(node: Node) -> int:
+        return sum(1 for player in node.players if player.is_playing)
+
+    def load(self, node: Node) -> float:
+        """
+        Get the load of a node, the lower the better.
+
+        :param node: The node.
+        :return: The load, same scale as the Lavalink penalty.
+        """
+        stats = node.stats
+        penalty = 0 if stats.is_fake else stats.penalty.total - stats.penalty.player_penalty
+
+        return penalty + self.playing_players(node)
+
+    def has_headroom(self, node: Node) -> bool:
+        limits = self.limits.get(node.name)
+
+        if limits is None:
+            return True
+
+        if limits.max_players is not None and self.playing_players(node) >= limits.max_players:
+            return False
+
+        if limits.max_load is not None and not node.stats.is_fake and node.stats.system_load >= limits.max_load:
+            return False
+
+        return True
+
+    def select(self,
+               manager: NodeManager,
+               region: Optional[str] = None,
+               exclude: Optional[List[Node]] = None) -> Optional[Node]:
+        exclude = exclude or []
+        nodes = [node for node in self.candidate_nodes(manager) if node not in exclude]
+
+        if not nodes:  # Nothing is connected yet, let Lavalink decide
+            return super().select(manager, region, exclude)
+
+        nodes = [node for node in nodes if self.has_headroom(node)] or nodes
+
+        return min(
+            nodes,
+            key=lambda node: self.load(node) + (self.region_penalty if region and node.region != region else 0)
+        )
+
+    def is_hot(self, manager: NodeManager, node: Node) -> bool:
+        others = [other for other in self.candidate_nodes(manager) if other is not node]
+
+        if not others:
+            return False
+
+        if not self.has_headroom(node):
+            return True
+
+        return self.load(node) - min(self.load(other) for other in others) > self.hot_margin
@@ -1,37 +1,48 @@
 import asyncio
-from time import time
-from typing import TYPE_CHECKING, Optional, Union, List
+from os import getenv
+from time import time, monotonic
+from typing import TYPE_CHECKING, Optional, Union, Iterable, List, Dict, Any
 
 import pylrc
 import syncedlyrics
 from discord import Message, ButtonStyle, Embed, Colour, Guild, Interaction
 from discord.ui import Button
 from lavalink import DefaultPlayer, Node, parse_time, TrackEndEvent, RequestError, PlayerErrorEvent, TrackStuckEvent, \
-    QueueEndEvent, TrackLoadFailedEvent, AudioTrack
+    AudioTrack, DeferredAudioTrack, NodeChangedEvent, ClientError
 
 from pylrc.classes import Lyrics, LyricLine
 from lavalink.common import MISSING
 
+from lava.autoplay import RecommendationPool, get_recommended_tracks, QUEUE_LOW_WATERMARK
 from lava.embeds import ErrorEmbed
-from lava.utils import get_recommended_tracks, get_image_size, find_lyrics_within_range
+from lava.errors import QueueFull
+from lava.history import PlayHistory, HISTORY_SIZE
+from lava.log import SAMPLE_OFTEN
+from lava.metrics import DISPLAY_EDITS, LYRICS_LATENCY
+from lava.queue import TrackQueue, FairQueue
+from lava.snapshot import SNAPSHOT_VERSION, serialize_track, deserialize_track, serialize_filters, \
+    deserialize_filters
+from lava.utils import get_image_size, find_lyrics_within_range
 from lava.view import View
 
 if TYPE_CHECKING:
     from lava.bot import Bot
 
+LYRICS_TTL = 86400  # How long fetched lyrics, or the lack of them, are shared between processes
+
 
 class LavaPlayer(DefaultPlayer):
     def __init__(self, bot: "Bot", guild_id: int, node: Node):
         super().__init__(guild_id, node)
 
-        self.history = []
+        self.history: PlayHistory = PlayHistory(int(getenv("PLAY_HISTORY_SIZE", HISTORY_SIZE)))
         self.bot: Bot = bot
         self.message: Optional[Message] = None
 
         self._guild: Optional[Guild] = None
 
         self.autoplay: bool = False
-        self.is_adding_song: bool = False
+        self.recommendations: RecommendationPool = RecommendationPool()
         self.show_lyrics: bool = True
 
         self._last_update: int = 0
@@ -41,29 +52,60 @@ class LavaPlayer(DefaultPlayer):
         self.__display_image_as_wide: Optional[bool] = None
         self.__last_image_url: str = ""
 
-        self.queue: List[AudioTrack] = []
+        self._autoplay_task: Optional[asyncio.Task] = None
+
+        self.last_active: float = monotonic()
+        self.plays: int = 0  # Bumped on every play(), tells a track played again apart from a redelivered event
+
+        self.queue: Union[TrackQueue, FairQueue] = TrackQueue()
+        self.fair_queue: bool = False
+        self.max_queue_length: int = int(getenv("MAX_QUEUE_LENGTH", 5000))
         self._lyrics: Union[Lyrics[LyricLine], None] = None
 
     @property
     def lyrics(self) -> Union[Lyrics[LyricLine], None]:
-        if self._lyrics == MISSING:
-            return MISSING
+        if self._lyrics is None:
+            try:
+                self._parse_lyrics(self._search_lyrics())
+            except Exception:
+                return MISSING
 
-        if self._lyrics is not None:
-            return self._lyrics
+        return self._lyrics
 
-        try:
-            lrc = syncedlyrics.search(f"{self.current.title} {self.current.author}")
-        except Exception:
-            return MISSING
+    async def fetch_lyrics(self):
+        """
+        Fetch the lyrics of the current track, through the shared cache when there is one.
+        """
+        shared = self.client.shared
 
-        if not lrc:
-            self._lyrics = MISSING
-            return self._lyrics
+        if shared is None or self._lyrics is not None:
+            _ = self.lyrics
+            return
 
-        self._lyrics = pylrc.parse(lrc)
+        track = self.current
+        key = ('lyrics', track.identifier)
 
-        return self._lyrics
+        lrc = await shared.get(key)
+
+        if self.current is not track:  # Skipped while looking it up
+            return
+
+        if lrc is None:
+            try:
+                lrc = self._search_lyrics()
+            except Exception:
+                return
+
+            shared.set(key, lrc or '', ttl=LYRICS_TTL)
+
+        self._parse_lyrics(lrc)
+
+    def _search_lyrics(self) -> Optional[str]:
+        with LYRICS_LATENCY.time():
+            return syncedlyrics.search(f"{self.current.title} {self.current.author}")
+
+    def _parse_lyrics(self, lrc: Optional[str]):
+        self._lyrics = pylrc.parse(lrc) if lrc else MISSING
 
     @property
     def guild(self) -> Optional[Guild]:
@@ -72,44 +114,51 @@ class LavaPlayer(DefaultPlayer):
 
         return self._guild
 
+    def request_autoplay(self):
+        """
+        Refill the queue with recommended tracks in the background if autoplay is enabled
+        and the queue has dropped below the low watermark.
+
+        At most one refill runs at a time per player, requests made while a refill is running are ignored.
+        """
+        if not self.autoplay or not self.current or len(self.queue) >= QUEUE_LOW_WATERMARK:
+            return
+
+        if self._autoplay_task and not self._autoplay_task.done():
+            return
+
+        self._autoplay_task = self.bot.loop.create_task(self.check_autoplay())
+
     async def check_autoplay(self) -> bool:
         """
         Check the autoplay status and add recommended tracks if enabled.
 
+        Use request_autoplay() instead of calling this directly, so refills don't overlap.
+
         :return: True if tracks were added, False otherwise.
         """
-        if not self.autoplay or self.is_adding_song or len(self.queue) >= 30:
+        if not self.autoplay or not self.current or len(self.queue) >= QUEUE_LOW_WATERMARK:
             return False
 
-        self.is_adding_song = True
-
-        self.bot.logger.info(
-            "Queue is empty, adding recommended track for guild %s...", self.guild
-        )
+        self.bot.logger.debug("Queue is running low, adding recommended track for guild %d...", self.guild_id)
 
-        recommendations = await get_recommended_tracks(self, self.current, 5 - len(self.queue))
+        recommendations = await get_recommended_tracks(self, self.current, QUEUE_LOW_WATERMARK - len(self.queue))
 
         if not recommendations:
-            self.is_adding_song = False
             self.autoplay = False
 
             if self.message:
                 message = await self.message.channel.send(
-                    embed=ErrorEmbed(
-                        self.bot.get_text(
-                            'error.autoplay_failed', self.locale, '我找不到任何推薦的歌曲，所以我停止了自動播放'
-                        ),
-                    )
+                    embed=ErrorEmbed('我找不到任何推薦的歌曲，所以我停止了自動播放')
                 )
 
                 await self.update_display(message, delay=5)
 
             return False
 
-        for recommendation in recommendations:
-            self.add(requester=0, track=recommendation)
+        self.add_many(recommendations, requester=0)
 
-        self.is_adding_song = False
+        return True
 
     async def toggle_autoplay(self):
         """
@@ -117,13 +166,70 @@ class LavaPlayer(DefaultPlayer):
         """
         if not self.autoplay:
             self.autoplay = True
+            self.request_autoplay()
             return
 
         self.autoplay = False
+        self.recommendations.clear()
+
+        if self._autoplay_task and not self._autoplay_task.done():
+            self._autoplay_task.cancel()
+
+        self.queue.filter(lambda track: track.requester)  # Remove songs added by autoplay
+
+    def add(self, track: Union[AudioTrack, Dict], requester: int = 0, index: Optional[int] = None):
+        """
+        Same as the original DefaultPlayer.add(), but respects the max queue length.
 
-        for item in self.queue:  # Remove songs added by autoplay
-            if item.requester == 0:
-                self.queue.remove(item)
+        :raise QueueFull: If the queue is full.
+        """
+        if len(self.queue) >= self.max_queue_length:
+            raise QueueFull(self.max_queue_length)
+
+        super().add(track, requester=requester, index=index)
+
+    def add_many(self,
+                 tracks: Iterable[Union[AudioTrack, Dict]],
+                 requester: int = 0,
+                 index: Optional[int] = None) -> List[AudioTrack]:
+        """
+        Add a batch of tracks to the queue in a single splice, keeping their order.
+
+        Tracks that don't fit in the queue anymore are dropped, the on_queue_changed event is dispatched
+        once for the whole batch.
+
+        :param tracks: The tracks to add.
+        :param requester: The ID of the user who requested the tracks, 0 for autoplay.
+        :param index: The index to insert the tracks at, appended to the end if not specified.
+        :return: The tracks that were added.
+        :raise QueueFull: If the queue is already full.
+        """
+        space = self.max_queue_length - len(self.queue)
+
+        if space <= 0:
+            raise QueueFull(self.max_queue_length)
+
+        added: List[AudioTrack] = []
+
+        for track in tracks:
+            if len(added) >= space:
+                break
+
+            track = AudioTrack(track, requester) if isinstance(track, dict) else track
+
+            if requester != 0:
+                track.requester = requester
+
+            added.append(track)
+
+        if index is None:
+            self.queue.extend(added)
+        else:
+            self.queue.insert_many(index, added)
+
+        self.bot.dispatch("queue_changed", self)
+
+        return added
 
     async def update_display(self,
                              new_message: Optional[Message] = None,
@@ -140,23 +246,19 @@ class LavaPlayer(DefaultPlayer):
         :param locale: The locale to use for the display
         """
 
-        self.bot.logger.info(
-            "Updating display for player in guild %s in a %s seconds delay", self.bot.get_guild(self.guild_id), delay
+        self.bot.logger.debug(
+            "Updating display for player in guild %d in a %s seconds delay", self.guild_id, delay, extra=SAMPLE_OFTEN
         )
 
         await asyncio.sleep(delay)
 
         if not self.message and not new_message:
-            self.bot.logger.warning(
-                "No message to update display for player in guild %s", self.bot.get_guild(self.guild_id)
-            )
+            self.bot.logger.warning("No message to update display for player in guild %d", self.guild_id)
             return
 
         if new_message:
             try:
-                self.bot.logger.debug(
-                    "Deleting old existing display message for player in guild %s", self.bot.get_guild(self.guild_id)
-                )
+                self.bot.logger.debug("Deleting old existing display message for player in guild %d", self.guild_id)
 
                 _ = self.bot.loop.create_task(self.message.delete())
             except (AttributeError, UnboundLocalError):
@@ -253,8 +355,10 @@ class LavaPlayer(DefaultPlayer):
         else:
             await self.message.edit(embeds=embeds, view=view)
 
+        DISPLAY_EDITS.inc()
+
         self.bot.logger.debug(
-            "Updating player in guild %s display message to %s", self.bot.get_guild(self.guild_id), self.message.id
+            "Updating player in guild %d display message to %d", self.guild_id, self.message.id, extra=SAMPLE_OFTEN
         )
 
     async def __generate_lyrics_embed(self) -> Embed:
@@ -436,6 +540,170 @@ class LavaPlayer(DefaultPlayer):
 
         return self.__display_image_as_wide
 
+    @property
+    def idle_time(self) -> float:
+        """
+        How long the player has been idle in seconds, 0 if it's playing.
+        """
+        if self.is_playing:
+            return 0
+
+        return monotonic() - self.last_active
+
+    async def node_unavailable(self):
+        """
+        Freeze the position where the node went away, so the track resumes from there on the new node
+        instead of from the last player update, or from a position that kept running while the node was down.
+        """
+        self._last_position = self.position
+        self._last_update = int(time() * 1000)
+        self._internal_pause = True
+
+    async def change_node(self, node: Node):
+        """
+        Same as the original DefaultPlayer.change_node(), but the player is only destroyed on the old node
+        if it's still reachable, so moving off a dead node doesn't fail.
+
+        The current track, position, pause state, volume, filters and voice state are replayed on the new node,
+        the queue stays on the player.
+
+        :param node: The node to move the player to.
+        """
+        old_node = self.node
+
+        if old_node._transport.ws_connected:  # skipcq: PYL-W0212
+            try:
+                await old_node.destroy_player(self._internal_id)
+            except (ClientError, RequestError):
+                self.bot.logger.warning("Failed to destroy player for guild %s on node %s", self.guild_id, old_node.name)
+
+        position = self.position
+
+        self.node = node
+
+        if self._voice_state:
+            await self._dispatch_voice_update()
+
+        if self.current:
+            playable_track = self.current.track
+
+            if isinstance(self.current, DeferredAudioTrack) and playable_track is None:
+                playable_track = await self.current.load(self.client)
+
+            await self.node.update_player(
+                self._internal_id, encoded_track=playable_track, position=position, paused=self.paused, volume=self.volume
+            )
+
+            self._last_position = position
+            self._last_update = int(time() * 1000)
+
+        self._internal_pause = False
+
+        if self.filters:
+            await self._apply_filters()
+
+        await self.client._dispatch_event(NodeChangedEvent(self, old_node, node))  # skipcq: PYL-W0212
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Take a snapshot of the player state that can be stored and restored with restore(), even by another process.
+
+        :return: The JSON serializable snapshot.
+        """
+        return {
+            'version': SNAPSHOT_VERSION,
+            'node': self.node.name if self.node else None,
+            'voice_channel': self.channel_id,
+            'text_channel': self.fetch('channel'),
+            'message': self.message.id if self.message else None,
+            'current': serialize_track(self.current) if self.current else None,
+            'position': self.position,
+            'paused': self.paused,
+            'volume': self.volume,
+            'loop': self.loop,
+            'shuffle': self.shuffle,
+            'autoplay': self.autoplay,
+            'fair_queue': self.fair_queue,
+            'show_lyrics': self.show_lyrics,
+            'filters': serialize_filters(self.filters),
+            'queue': [serialize_track(track) for track in self.queue]
+        }
+
+    def state_key(self) -> tuple:
+        """
+        A cheap fingerprint of the state kept in snapshots, apart from the position.
+        The snapshot only has to be written again when this changes.
+        """
+        return (
+            id(self.queue), self.queue.version, id(self.current), self.paused, self.volume, self.loop, self.shuffle,
+            self.autoplay, self.show_lyrics, repr(serialize_filters(self.filters)), self.channel_id,
+            self.fetch('channel'), self.message.id if self.message else None
+        )
+
+    def restore_state(self, snapshot: Dict[str, Any], requeue_current: bool = False):
+        """
+        Restore the settings and the queue from a snapshot taken with snapshot(), without touching the node.
+
+        :param snapshot: The snapshot.
+        :param requeue_current: Whether to put the current track of the snapshot back at the front of the queue,
+            so it's played first once the player starts again.
+        """
+        self.store('channel', snapshot['text_channel'])
+
+        self.autoplay = snapshot['autoplay']
+        self.show_lyrics = snapshot['show_lyrics']
+        self.set_fair_queue(snapshot['fair_queue'])
+        self.set_loop(snapshot['loop'])
+        self.set_shuffle(snapshot['shuffle'])
+
+        self.queue.clear()
+        self.queue.extend(track for track in map(deserialize_track, snapshot['queue']) if track)
+
+        guild = self.guild
+        channel = guild.get_channel(snapshot['text_channel']) if guild and snapshot['text_channel'] else None
+
+        if channel and snapshot['message']:
+            self.message = channel.get_partial_message(snapshot['message'])
+
+        current = deserialize_track(snapshot['current']) if requeue_current and snapshot['current'] else None
+
+        if current:
+            self.queue.insert(0, current)
+
+    def restore(self, snapshot: Dict[str, Any]):
+        """
+        Restore the player from a snapshot taken with snapshot(), on a node that still has the player
+        because its Lavalink session was resumed, so only the local state is rebuilt.
+        Players that weren't resumed are restored lazily with restore_state() instead.
+
+        :param snapshot: The snapshot.
+        """
+        self.restore_state(snapshot)
+
+        for _filter in deserialize_filters(snapshot['filters']):
+            self.filters[type(_filter).__name__.lower()] = _filter
+
+        self.current = deserialize_track(snapshot['current']) if snapshot['current'] else None
+        self.volume = snapshot['volume']
+        self.paused = snapshot['paused']
+        self._last_position = int(snapshot['position'])
+        self._last_update = int(time() * 1000)
+
+    def cleanup(self):
+        """
+        Free the state of the player, called when the player is destroyed.
+        """
+        if self._autoplay_task and not self._autoplay_task.done():
+            self._autoplay_task.cancel()
+
+        self.queue.clear()
+        self.history.clear()
+        self.recommendations.clear()
+
+        self.message = None
+        self._guild = None
+        self._lyrics = None
+
     async def _update_state(self, state: dict):
         """
         Updates the position of the player.
@@ -449,18 +717,21 @@ class LavaPlayer(DefaultPlayer):
         self._last_position = state.get('position', 0)
         self.position_timestamp = state.get('time', 0)
 
-        _ = self.bot.loop.create_task(self.check_autoplay())
-        _ = self.bot.loop.create_task(self.update_display())
+        if self.is_playing:
+            self.last_active = monotonic()
+
+    async def play(self, *args, **kwargs):
+        """
+        Same as the original DefaultPlayer.play(), but every play is counted in plays.
+        """
+        self.plays += 1
+
+        await super().play(*args, **kwargs)
 
     async def _handle_event(self, event):
+        # Only starting the next track is done here, the messages are updated by the handlers of the event pipeline
         if isinstance(event, TrackStuckEvent) or isinstance(event, TrackEndEvent) and event.reason.may_start_next():
             await self._handle_track_event()
-        elif isinstance(event, TrackEndEvent):
-            await self._handle_track_end_event()
-        elif isinstance(event, QueueEndEvent):
-            await self._handle_queue_end_event()
-        elif isinstance(event, TrackLoadFailedEvent):
-            await self._handle_track_load_failed_event(event)
 
     async def _handle_track_event(self):
         try:
@@ -471,37 +742,25 @@ class LavaPlayer(DefaultPlayer):
                 '[DefaultPlayer:%d] Encountered a request error whilst starting a new track.', self.guild_id
             )
 
-    async def _handle_track_end_event(self):
-        self.bot.logger.info("Received track end event for guild %s", self.bot.get_guild(self.guild_id))
-        try:
-            await self.update_display()
-        except ValueError:
-            pass
-
-    async def _handle_queue_end_event(self):
-        self.bot.logger.info("Received queue end event for guild %s", self.bot.get_guild(self.guild_id))
-        try:
-            await self.update_display()
-        except ValueError:
-            pass
-
-    async def _handle_track_load_failed_event(self, event):
-        self.bot.logger.info("Received track load failed event for guild %s", self.bot.get_guild(self.guild_id))
-        message = await self.message.channel.send(
-            embed=ErrorEmbed(
-                title=f"無法播放歌曲: {event.track['title']}",
-                reason=f"{event.original or 'Unknown'}"
-            )
-        )
-        await self.skip()
-        await self.update_display(message, delay=5)
-
     def reset_lyrics(self):
         """
         Reset the lyrics cache.
         """
         self._lyrics = None
 
+    def set_fair_queue(self, enabled: bool):
+        """
+        Switch between the normal queue and the fair queue, which takes turns between requesters.
+        The queued tracks are kept, in their current play order when switching back to the normal queue.
+
+        :param enabled: Whether to use the fair queue.
+        """
+        if enabled == self.fair_queue:
+            return
+
+        self.fair_queue = enabled
+        self.queue = FairQueue(self.queue) if enabled else TrackQueue(self.queue)
+
     async def toggle_lyrics(self):
         """
         Toggle lyrics display for the player.
@@ -1,12 +1,25 @@
-from typing import TYPE_CHECKING, Optional, Dict
+import asyncio
+from os import getenv
+from time import monotonic
+from typing import TYPE_CHECKING, Optional, Dict, List, Set
 
-from lavalink import PlayerManager, Node, ClientError, Client
+from discord import HTTPException, ClientException
+from lavalink import PlayerManager, Node, ClientError, Client, RequestError
 
+from lava.classes.node_selector import NodeSelector, LoadAwareNodeSelector
 from lava.classes.player import LavaPlayer
+from lava.classes.voice_client import LavalinkVoiceClient
+from lava.snapshot import SNAPSHOT_VERSION
 
 if TYPE_CHECKING:
     from lava.bot import Bot
 
+REAP_INTERVAL = 60  # How often idle players are looked for, in seconds
+REBALANCE_INTERVAL = 120  # How often idle players are moved off hot nodes, in seconds
+MAX_REBALANCE_MOVES = 20  # How many players can be moved per rebalance
+SNAPSHOT_MAX_AGE = 7 * 24 * 60 * 60  # How long a saved player is kept for restoring, in seconds
+FAILOVER_TARGET = 2.0  # How long moving every player off a dead node should take at most, in seconds
+
 
 class LavaPlayerManager(PlayerManager):
     """The custom implemented PlayerManager for Lava"""
@@ -23,6 +36,35 @@ class LavaPlayerManager(PlayerManager):
         self.bot: "Bot" = bot
         self.players: Dict[int, LavaPlayer] = {}
 
+        self.idle_ttl: int = int(getenv("PLAYER_IDLE_TTL", 900))
+        self.max_players: int = int(getenv("MAX_PLAYERS", 1000))
+
+        self.evicted: int = 0
+
+        self._reaper: Optional[asyncio.Task] = None
+        self._limiter: Optional[asyncio.Task] = None  # Reaps when new() goes over max_players
+        self._new_players: Set[int] = set()  # Created since the limiter started, they are never evicted by it
+
+        self.node_selector: NodeSelector = LoadAwareNodeSelector()
+        self.migrated: int = 0
+
+        self._rebalancer: Optional[asyncio.Task] = None
+
+        self.failed_over: int = 0
+        self.last_failover_duration: Optional[float] = None
+        self.failover_target: float = float(getenv("FAILOVER_TARGET", FAILOVER_TARGET))
+
+        self.snapshot_interval: float = float(getenv("SNAPSHOT_INTERVAL", 5))
+        self.bot.state.prune_players(float(getenv("SNAPSHOT_MAX_AGE", SNAPSHOT_MAX_AGE)))
+
+        self._pending_restores: Set[int] = {  # Restored on first use, see new()
+            guild_id for guild_id in self.bot.state.player_ids() if self.bot.owns_guild(guild_id)
+        }
+        self._snapshot_keys: Dict[int, tuple] = {}
+        self._snapshotter: Optional[asyncio.Task] = None
+
+        self._closed: bool = False
+
     def new(self,
             guild_id: int,
             *,
@@ -41,7 +83,7 @@ class LavaPlayerManager(PlayerManager):
         :param endpoint: The endpoint to prioritize when choosing a node to connect to.
             This is useful when the region of the guild is not known.
         :param node: The node to use to create the player.
-            If not specified, this method will find the best node to use based on the given `region` or `endpoint`.
+            If not specified, the node selector chooses one based on the given `region` or `endpoint`.
         :return: The LavaPlayer instance that was created or already existed.
         :raise ClientError: If no available nodes are found.
         """
@@ -51,13 +93,22 @@ class LavaPlayerManager(PlayerManager):
         if endpoint:  # Prioritise endpoint over region parameter
             region = self.client.node_manager.get_region(endpoint)
 
-        best_node = node or self.client.node_manager.find_ideal_node(region)
+        best_node = node or self.node_selector.select(self.client.node_manager, region)
 
         if not best_node:
             raise ClientError('No available nodes!')
 
         self.players[guild_id] = player = LavaPlayer(self.bot, guild_id, best_node)
 
+        if guild_id in self._pending_restores:
+            self._restore_lazily(player)
+
+        if len(self.players) > self.max_players:
+            self._new_players.add(guild_id)
+
+            if self._limiter is None or self._limiter.done():
+                self._limiter = self.bot.loop.create_task(self._reap_over_limit())
+
         self.bot.logger.debug('Created player with GuildId %d on node \'%s\'', guild_id, best_node.name)
 
         return player
@@ -70,3 +121,372 @@ class LavaPlayerManager(PlayerManager):
         :return: The found LavaPlayer instance if found
         """
         return self.players.get(guild_id)
+
+    @property
+    def idle_players(self) -> List[LavaPlayer]:
+        """
+        The players that are not playing anything, the longest idle first.
+        """
+        return sorted(
+            (player for player in self.players.values() if not player.is_playing),
+            key=lambda player: player.idle_time,
+            reverse=True
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """
+        :return: The amount of resident, idle and evicted players.
+        """
+        return {
+            'resident': len(self.players),
+            'idle': sum(1 for player in self.players.values() if not player.is_playing),
+            'evicted': self.evicted
+        }
+
+    async def close(self):
+        """
+        Stop the reaper, the rebalancer and the snapshotter. Players are no longer failed over,
+        the nodes disconnecting after this are being closed.
+        """
+        self._closed = True
+
+        tasks = [
+            task for task in (self._reaper, self._limiter, self._rebalancer, self._snapshotter) if task is not None
+        ]
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def start_reaper(self):
+        """
+        Start evicting idle players in the background, does nothing if it's already running.
+        """
+        if self._reaper and not self._reaper.done():
+            return
+
+        self._reaper = self.bot.loop.create_task(self._reap_periodically())
+
+    async def _reap_periodically(self):
+        while True:
+            await asyncio.sleep(REAP_INTERVAL)
+
+            try:
+                await self.reap()
+            except Exception:  # Keep reaping even if a single run failed
+                self.bot.logger.exception('Failed to reap idle players')
+
+    def start_rebalancer(self):
+        """
+        Start moving idle players off hot nodes in the background, does nothing if it's already running.
+        """
+        if self._rebalancer and not self._rebalancer.done():
+            return
+
+        self._rebalancer = self.bot.loop.create_task(self._rebalance_periodically())
+
+    async def _rebalance_periodically(self):
+        while True:
+            await asyncio.sleep(REBALANCE_INTERVAL)
+
+            try:
+                await self.rebalance()
+            except Exception:  # Keep rebalancing even if a single run failed
+                self.bot.logger.exception('Failed to rebalance players')
+
+    async def rebalance(self, max_moves: int = MAX_REBALANCE_MOVES) -> int:
+        """
+        Move players that are not playing anything off the nodes the node selector considers hot.
+
+        :param max_moves: The maximum amount of players to move.
+        :return: The amount of moved players.
+        """
+        moves = self.node_selector.rebalance_targets(self.client.node_manager, max_moves)
+
+        for player, target in moves.items():
+            if player.is_playing:  # Started playing in the meantime
+                continue
+
+            source = player.node
+
+            try:
+                await player.change_node(target)
+            except (ClientError, RequestError):
+                self.bot.logger.warning(
+                    'Failed to move player with GuildId %d from node \'%s\' to node \'%s\'',
+                    player.guild_id, source.name, target.name, exc_info=True
+                )
+                continue
+
+            self.migrated += 1
+
+            self.bot.logger.debug(
+                'Moved player with GuildId %d from node \'%s\' to node \'%s\'', player.guild_id, source.name, target.name
+            )
+
+        return len(moves)
+
+    async def failover(self, node: Node):
+        """
+        Move every player off a node that disconnected, to the node the node selector picks.
+
+        Positions are frozen when the node goes away, and the current track, position, pause state, volume,
+        filters and voice state are replayed on the new node. If no other node is available, the players
+        wait until a node becomes ready again.
+
+        :param node: The node that disconnected.
+        """
+        players = node.players
+
+        if not players or self._closed:
+            return
+
+        started = monotonic()
+
+        for player in players:
+            try:
+                await player.node_unavailable()
+            except Exception:  # One broken player must not keep the others on the dead node
+                self.bot.logger.exception('Failed to freeze player with GuildId %d', player.guild_id)
+
+        target = self.node_selector.select(self.client.node_manager, node.region, exclude=[node])
+
+        if not target:
+            self.client.node_manager._player_queue.extend(players)  # skipcq: PYL-W0212
+            self.bot.logger.warning(
+                'Node \'%s\' disconnected and no other node is available, %d players are waiting for a node',
+                node.name, len(players)
+            )
+            return
+
+        results = await asyncio.gather(
+            *(self._migrate(player, node, target) for player in players), return_exceptions=True
+        )
+
+        for player, result in zip(players, results):
+            if isinstance(result, BaseException):  # One broken player must not abort the others
+                self.bot.logger.error(
+                    'Failed to move player with GuildId %d from node \'%s\' to node \'%s\'',
+                    player.guild_id, node.name, target.name, exc_info=result
+                )
+
+        moved = sum(1 for result in results if result is True)
+
+        self.failed_over += moved
+        self.last_failover_duration = monotonic() - started
+
+        self.bot.logger.info(
+            'Moved %d/%d players from node \'%s\' to node \'%s\' in %.2fs',
+            moved, len(players), node.name, target.name, self.last_failover_duration
+        )
+
+        if self.last_failover_duration > self.failover_target:
+            self.bot.logger.warning(
+                'Failover of node \'%s\' took %.2fs, longer than the %.2fs target',
+                node.name, self.last_failover_duration, self.failover_target
+            )
+
+    async def _migrate(self, player: LavaPlayer, source: Node, target: Node) -> bool:
+        try:
+            await player.change_node(target)
+        except (ClientError, RequestError):
+            self.bot.logger.error(
+                'Failed to move player with GuildId %d from node \'%s\' to node \'%s\'',
+                player.guild_id, source.name, target.name
+            )
+            return False
+
+        if self.client.node_manager._connect_back:  # skipcq: PYL-W0212
+            player._original_node = source  # skipcq: PYL-W0212
+
+        return True
+
+    async def destroy(self, guild_id: int):
+        self.bot.state.delete_player(guild_id)
+        self._snapshot_keys.pop(guild_id, None)
+
+        await super().destroy(guild_id)
+
+    def _restore_lazily(self, player: LavaPlayer):
+        self._pending_restores.discard(player.guild_id)
+
+        snapshot = self.bot.state.load_player(player.guild_id)
+
+        if snapshot is None or snapshot.get('version') != SNAPSHOT_VERSION:
+            return
+
+        player.restore_state(snapshot, requeue_current=True)
+
+        self.bot.logger.debug(
+            'Restored %d queued tracks of player with GuildId %d', len(player.queue), player.guild_id
+        )
+
+    def start_snapshotter(self):
+        """
+        Start saving the changed players to the state store in the background, does nothing if it's already running.
+        """
+        if self._snapshotter and not self._snapshotter.done():
+            return
+
+        self._snapshotter = self.bot.loop.create_task(self._snapshot_periodically())
+
+    async def _snapshot_periodically(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+
+            try:
+                await self.flush_snapshots()
+            except Exception:  # Keep snapshotting even if one round fails
+                self.bot.logger.exception('Failed to save player snapshots')
+
+    async def flush_snapshots(self) -> int:
+        """
+        Save the players whose state changed since they were last saved, in a single transaction
+        written off the event loop. Players with nothing to play are removed from the store instead.
+
+        :return: The amount of saved players.
+        :raise sqlite3.Error: If the transaction failed, the players are saved again on the next flush then.
+        """
+        changed = []
+        deleted = []
+        keys = {}
+
+        for guild_id, player in self.players.items():
+            key = player.state_key()
+
+            if self._snapshot_keys.get(guild_id) == key:
+                continue
+
+            keys[guild_id] = key
+
+            if player.current is None and not player.queue:
+                deleted.append(guild_id)
+                continue
+
+            changed.append((guild_id, player.snapshot()))
+
+        await self.bot.state.write_players(changed, deleted)
+
+        # Only once written, players destroyed in the meantime are left out
+        self._snapshot_keys.update({guild_id: key for guild_id, key in keys.items() if guild_id in self.players})
+
+        return len(changed)
+
+    def save_snapshots(self) -> int:
+        """
+        Save the snapshots of the connected players to the state store, so they can be restored after a restart.
+
+        :return: The amount of saved players.
+        """
+        snapshots = [(player.guild_id, player.snapshot()) for player in self.players.values() if player.is_connected]
+
+        self.bot.state.save_players(snapshots)
+
+        return len(snapshots)
+
+    async def restore_snapshots(self, node: Node, resumed: bool) -> int:
+        """
+        Restore the saved players the node is still playing for, after its session was resumed.
+
+        Every other saved player is left for a lazy restore when the guild first uses it,
+        so starting up doesn't rebuild every guild at once.
+
+        :param node: The node that became ready.
+        :param resumed: Whether the Lavalink session of the node was resumed, so it still has the players.
+        :return: The amount of restored players.
+        """
+        if not resumed:
+            return 0
+
+        try:
+            guild_ids = {int(data['guildId']) for data in await node.get_players()}
+        except (ClientError, RequestError):
+            self.bot.logger.warning('Failed to get the players of resumed node \'%s\'', node.name)
+            return 0
+
+        restored = 0
+
+        for guild_id in guild_ids & self._pending_restores:
+            snapshot = self.bot.state.load_player(guild_id)
+
+            if snapshot is None or snapshot.get('version') != SNAPSHOT_VERSION:
+                continue
+
+            guild = self.bot.get_guild(guild_id)
+            channel = guild.get_channel(snapshot['voice_channel']) if guild and snapshot['voice_channel'] else None
+
+            if channel is None:
+                continue
+
+            self._pending_restores.discard(guild_id)
+            self.new(guild_id, node=node)
+
+            try:
+                await channel.connect(cls=LavalinkVoiceClient)
+                self.players[guild_id].restore(snapshot)
+            except (ClientException, HTTPException, ClientError, RequestError, asyncio.TimeoutError):
+                self.bot.logger.exception('Failed to restore player with GuildId %d', guild_id)
+                continue
+
+            restored += 1
+
+        if restored:
+            self.bot.logger.info('Restored %d players on resumed node \'%s\'', restored, node.name)
+
+        return restored
+
+    async def _reap_over_limit(self):
+        try:
+            await self.reap(exclude=self._new_players)
+        finally:
+            self._new_players.clear()
+
+    async def reap(self, exclude: Optional[Set[int]] = None) -> int:
+        """
+        Evict players that have been idle longer than the idle TTL, then the longest idle players
+        until there are at most max_players players. Playing players are never evicted.
+
+        :param exclude: The guild ids of the players not to evict, such as the ones that were just created
+            and are about to be used.
+        :return: The amount of evicted players.
+        """
+        idle_players = [player for player in self.idle_players if not exclude or player.guild_id not in exclude]
+        over_limit = len(self.players) - self.max_players
+
+        evicted = 0
+
+        for player in idle_players:
+            if player.idle_time < self.idle_ttl and evicted >= over_limit:
+                break
+
+            await self.evict(player)
+            evicted += 1
+
+        if evicted:
+            self.bot.logger.info('Evicted %d idle players, %d players left', evicted, len(self.players))
+
+        return evicted
+
+    async def evict(self, player: LavaPlayer):
+        """
+        Disconnect the player from voice, destroy it on its node and free its state.
+
+        :param player: The player to evict.
+        """
+        guild = self.bot.get_guild(player.guild_id)
+
+        if guild and guild.voice_client:
+            try:
+                await guild.voice_client.disconnect(force=True)
+            except HTTPException:
+                pass
+
+        try:
+            await self.destroy(player.guild_id)
+        except (ClientError, RequestError):  # The player is already removed from the cache, only the node couldn't be reached
+            self.bot.logger.warning('Failed to destroy player with GuildId %d on its node', player.guild_id)
+
+        self.evicted += 1
+
+        self.bot.logger.debug('Evicted player with GuildId %d after %.0fs idle', player.guild_id, player.idle_time)
@@ -0,0 +1,99 @@
+import struct
+from base64 import b64decode
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+from lavalink import AudioTrack
+from lavalink.dataio import DataReader
+from lavalink.utils import decode_track as decode_with_library
+
+DECODE_CACHE_SIZE = 1024
+
+
+class TrackDecodeError(ValueError):
+    pass
+
+
+def _read_java_string(reader: DataReader) -> str:
+    """
+    Read a string written by java's DataOutputStream.writeUTF(), which encodes NUL as two bytes and characters
+    outside the BMP, such as emojis, as surrogate pairs. Lavalink.py's read_utfm() rejects the surrogate pairs.
+
+    :param reader: The reader, positioned at the string.
+    :return: The string.
+    """
+    text = reader.read_utf().replace(b'\xc0\x80', b'\x00').decode('utf-8', 'surrogatepass')
+
+    return text.encode('utf-16-le', 'surrogatepass').decode('utf-16-le')
+
+
+def _decode_java_strings(encoded: str) -> Tuple[Dict[str, Any], int]:
+    """
+    Decode a track the way Lavalink.py's decode_track() does, reading the strings with _read_java_string().
+
+    :param encoded: The base64 encoded track.
+    :return: The track info and the position.
+    """
+    reader = DataReader(encoded)
+
+    header = reader.read_int()
+    version = struct.unpack('B', reader.read_byte())[0] if header & 0x40000000 else 1
+
+    info = {
+        'title': _read_java_string(reader),
+        'author': _read_java_string(reader),
+        'length': reader.read_long(),
+        'identifier': _read_java_string(reader),
+        'isStream': reader.read_boolean()
+    }
+    info['uri'] = _read_java_string(reader) if version >= 2 and reader.read_boolean() else None
+    info['isSeekable'] = not info['isStream']
+
+    if version >= 3:
+        info['artworkUrl'] = _read_java_string(reader) if reader.read_boolean() else None
+        info['isrc'] = _read_java_string(reader) if reader.read_boolean() else None
+
+    info['sourceName'] = _read_java_string(reader)
+
+    # Source specific fields may follow, but the position is always the last field of the message
+    message_size = header & 0x3FFFFFFF
+    position = struct.unpack('>q', b64decode(encoded)[message_size - 4:message_size + 4])[0]
+
+    return info, position
+
+
+@lru_cache(maxsize=DECODE_CACHE_SIZE)
+def decode_track_info(encoded: str) -> Tuple[Tuple[Tuple[str, Any], ...], int]:
+    """
+    Decode a base64 encoded Lavalink track with Lavalink.py, without asking a node. Results are memoized
+    since an encoded track always decodes to the same track.
+
+    :param encoded: The base64 encoded track.
+    :return: The (key, value) pairs of the track info, and the position.
+    :raise TrackDecodeError: If the track couldn't be decoded.
+    """
+    try:
+        try:
+            track = decode_with_library(encoded)
+            info, position = track.raw['info'], track.extra.get('position', 0)
+        except UnicodeDecodeError:
+            info, position = _decode_java_strings(encoded)
+    except (struct.error, ValueError, IndexError) as error:  # binascii.Error and UnicodeError are ValueErrors
+        raise TrackDecodeError('Malformed track data') from error
+
+    return tuple(info.items()), position
+
+
+def decode_track(encoded: str) -> AudioTrack:
+    """
+    Decode a base64 encoded Lavalink track into an AudioTrack.
+
+    This is the in-process equivalent of Client.decode_track(), see decode_track_info().
+
+    :param encoded: The base64 encoded track.
+    :return: The decoded track, a new one on every call.
+    :raise TrackDecodeError: If the track couldn't be decoded.
+    """
+    items, position = decode_track_info(encoded)
+
+    return AudioTrack({'encoded': encoded, 'info': {**dict(items), 'position': position}}, 0)
@@ -25,3 +25,10 @@ class UserInDifferentChannel(Exception):
 
 class LoadError(Exception):
     pass
+
+
+class QueueFull(Exception):
+    def __init__(self, max_length: int, *args):
+        self.max_length = max_length
+
+        super().__init__(*args)
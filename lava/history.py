@@ -0,0 +1,74 @@
+from collections import Counter, deque
+from typing import Deque, Iterator, List
+
+from lavalink import AudioTrack
+
+HISTORY_SIZE = 50
+
+
+class PlayHistory:
+    """
+    A bounded ring buffer of the tracks a player has played, oldest first.
+
+    Appending is O(1), the oldest track is dropped once the buffer is full.
+    The identifiers of the tracks are counted alongside, so membership checks are O(1) too.
+
+    Parameters:
+    ----------
+    max_size: int
+        The maximum amount of tracks to remember.
+    """
+
+    def __init__(self, max_size: int = HISTORY_SIZE):
+        self._tracks: Deque[AudioTrack] = deque(maxlen=max_size)
+        self._counts: Counter = Counter()
+
+    @property
+    def max_size(self) -> int:
+        return self._tracks.maxlen
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def __iter__(self) -> Iterator[AudioTrack]:
+        return iter(self._tracks)
+
+    def __contains__(self, identifier: str) -> bool:
+        return identifier in self._counts
+
+    def append(self, track: AudioTrack):
+        """
+        Record a played track.
+
+        :param track: The track that started playing.
+        """
+        if len(self._tracks) == self._tracks.maxlen:
+            self._forget(self._tracks[0])
+
+        self._tracks.append(track)
+        self._counts[track.identifier] += 1
+
+    def recent(self, count: int) -> List[AudioTrack]:
+        """
+        Get the most recently played tracks, newest first.
+
+        :param count: The max amount of tracks to get.
+        :return: The tracks.
+        """
+        return [self._tracks[-index] for index in range(1, min(count, len(self._tracks)) + 1)]
+
+    def identifiers(self) -> set[str]:
+        """
+        :return: The identifiers of all tracks in the history.
+        """
+        return set(self._counts)
+
+    def clear(self):
+        self._tracks.clear()
+        self._counts.clear()
+
+    def _forget(self, track: AudioTrack):
+        self._counts[track.identifier] -= 1
+
+        if self._counts[track.identifier] <= 0:
+            del self._counts[track.identifier]
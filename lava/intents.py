@@ -0,0 +1,49 @@
+from os import getenv
+
+from discord import Intents, MemberCacheFlags
+
+# The gateway intents of each profile. Lava only needs the guilds and the voice states,
+# slash commands and components arrive as interactions, which don't need an intent.
+INTENT_PROFILES = {
+    'minimal': Intents(guilds=True, voice_states=True),
+    'all': Intents.all()  # The old behaviour, for cogs that need more
+}
+
+# Which members are kept in the member cache, the members in voice channels are enough to tell who is listening
+MEMBER_CACHE_POLICIES = {
+    'voice': MemberCacheFlags(voice=True, joined=False, interaction=False),
+    'all': MemberCacheFlags.all()
+}
+
+
+def intents_from_env() -> Intents:
+    """
+    Get the gateway intents of the profile set with INTENTS_PROFILE, "minimal" by default.
+
+    :return: The intents.
+    :raise ValueError: If the profile doesn't exist.
+    """
+    profile = getenv("INTENTS_PROFILE", "minimal")
+
+    if profile not in INTENT_PROFILES:
+        raise ValueError(f"Unknown intents profile {profile}, must be one of {', '.join(INTENT_PROFILES)}")
+
+    return INTENT_PROFILES[profile]
+
+
+def member_cache_from_env(intents: Intents) -> MemberCacheFlags:
+    """
+    Get the member cache flags of the policy set with MEMBER_CACHE, "voice" by default.
+
+    :param intents: The gateway intents, flags that need an intent that isn't enabled are turned off.
+    :return: The member cache flags.
+    :raise ValueError: If the policy doesn't exist.
+    """
+    policy = getenv("MEMBER_CACHE", "voice")
+
+    if policy not in MEMBER_CACHE_POLICIES:
+        raise ValueError(f"Unknown member cache policy {policy}, must be one of {', '.join(MEMBER_CACHE_POLICIES)}")
+
+    flags = MEMBER_CACHE_POLICIES[policy]
+
+    return MemberCacheFlags._from_value(flags.value & MemberCacheFlags.from_intents(intents).value)  # skipcq: PYL-W0212
@@ -0,0 +1,188 @@
+import multiprocessing
+import signal
+from logging import getLogger
+from multiprocessing.context import SpawnProcess
+from time import monotonic, sleep
+from typing import Callable, List, Optional
+
+import requests
+
+RESTART_DELAY = 5  # How long to wait before restarting a crashed worker, doubled on every crash in a row
+MAX_RESTART_DELAY = 300
+STABLE_UPTIME = 600  # A worker that ran this long is healthy again, its restart delay is reset
+STOP_TIMEOUT = 30  # How long workers get to close before they are killed
+
+logger = getLogger('lava.launcher')
+
+
+def recommended_shard_count(token: str) -> int:
+    """
+    Get the amount of shards Discord recommends for the bot.
+
+    :param token: The bot token.
+    :return: The recommended shard count.
+    """
+    response = requests.get(
+        'https://discord.com/api/v10/gateway/bot', headers={'Authorization': f'Bot {token}'}, timeout=10
+    )
+    response.raise_for_status()
+
+    return response.json()['shards']
+
+
+def split_shards(shard_count: int, workers: int) -> List[List[int]]:
+    """
+    Split the shards into contiguous groups, one for each worker.
+
+    :param shard_count: The total amount of shards.
+    :param workers: The amount of workers, capped at the shard count.
+    :return: The shard ids of every worker.
+    """
+    workers = max(1, min(workers, shard_count))
+    size, extra = divmod(shard_count, workers)
+
+    groups = []
+    start = 0
+
+    for worker in range(workers):
+        end = start + size + (1 if worker < extra else 0)
+        groups.append(list(range(start, end)))
+        start = end
+
+    return groups
+
+
+class Worker:
+    """
+    A worker process running a Bot for some of the shards.
+
+    Parameters:
+    ----------
+    worker_id: int
+        The id of the worker.
+    shard_ids: List[int]
+        The shards the worker connects.
+    """
+
+    def __init__(self, worker_id: int, shard_ids: List[int]):
+        self.worker_id = worker_id
+        self.shard_ids = shard_ids
+
+        self.process: Optional[SpawnProcess] = None
+        self.started: float = 0
+        self.restarts: int = 0
+        self.restart_delay: float = RESTART_DELAY
+        self.restart_at: Optional[float] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+class Supervisor:
+    """
+    Runs the bot as several worker processes, each connecting its own part of the shards with its own
+    Bot and LavalinkClient, and restarts the workers that crash.
+
+    Parameters:
+    ----------
+    target: Callable[[int, List[int], int], None]
+        The function running a worker, called with the worker id, its shard ids and the shard count
+        in a new process. It must be importable, workers are spawned.
+    shard_count: int
+        The total amount of shards.
+    workers: int
+        The amount of worker processes.
+    """
+
+    def __init__(self, target: Callable[[int, List[int], int], None], shard_count: int, workers: int):
+        self.target = target
+        self.shard_count = shard_count
+
+        self.workers: List[Worker] = [
+            Worker(worker_id, shard_ids) for worker_id, shard_ids in enumerate(split_shards(shard_count, workers))
+        ]
+
+        self._context = multiprocessing.get_context('spawn')
+        self._stopping = False
+
+    def run(self):
+        """
+        Start the workers and supervise them until the supervisor is interrupted or terminated.
+        """
+        signal.signal(signal.SIGINT, self._request_stop)
+        signal.signal(signal.SIGTERM, self._request_stop)
+
+        logger.info("Starting %d workers for %d shards", len(self.workers), self.shard_count)
+
+        for worker in self.workers:
+            self._start(worker)
+
+        try:
+            while not self._stopping:
+                self._check_workers()
+                sleep(1)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """
+        Ask every worker to close, and kill the ones that don't in time.
+        """
+        self._stopping = True
+
+        for worker in self.workers:
+            if worker.alive:
+                worker.process.terminate()
+
+        deadline = monotonic() + STOP_TIMEOUT
+
+        for worker in self.workers:
+            if worker.process is None:
+                continue
+
+            worker.process.join(max(0.0, deadline - monotonic()))
+
+            if worker.process.is_alive():
+                logger.warning("Worker %d didn't stop in time, killing it", worker.worker_id)
+                worker.process.kill()
+                worker.process.join()
+
+    def _request_stop(self, *_):
+        self._stopping = True
+
+    def _start(self, worker: Worker):
+        worker.process = self._context.Process(
+            target=self.target, args=(worker.worker_id, worker.shard_ids, self.shard_count),
+            name=f"lava-worker-{worker.worker_id}"
+        )
+        worker.process.start()
+
+        worker.started = monotonic()
+        worker.restart_at = None
+
+        logger.info("Started worker %d (pid %d) for shards %s", worker.worker_id, worker.process.pid, worker.shard_ids)
+
+    def _check_workers(self):
+        now = monotonic()
+
+        for worker in self.workers:
+            if worker.alive:
+                continue
+
+            if worker.restart_at is None:
+                if now - worker.started >= STABLE_UPTIME:
+                    worker.restart_delay = RESTART_DELAY
+
+                worker.restart_at = now + worker.restart_delay
+
+                logger.error(
+                    "Worker %d exited with code %s, restarting it in %.0fs",
+                    worker.worker_id, worker.process.exitcode, worker.restart_delay
+                )
+
+                worker.restart_delay = min(worker.restart_delay * 2, MAX_RESTART_DELAY)
+
+            elif now >= worker.restart_at:
+                worker.restarts += 1
+                self._start(worker)
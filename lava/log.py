@@ -0,0 +1,123 @@
+import atexit
+import logging
+from logging import Filter, Formatter, LogRecord
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from os import getenv
+from queue import SimpleQueue
+from time import monotonic
+from typing import Dict, List, Tuple
+
+RATE_LIMIT = 20  # How many records of the same message are let through per second, on average
+RATE_BURST = 50  # How many records of the same message can be let through at once
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# Pass as extra to hot path log calls, only one in this many of their records is kept
+SAMPLE_RARELY = {'sample': 100}
+SAMPLE_OFTEN = {'sample': 10}
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    A QueueHandler that leaves formatting to the listener thread.
+
+    The original one formats the message on the logging thread, which is the event loop here,
+    the records only cross threads in this process so they are passed on as they are.
+    """
+
+    def prepare(self, record: LogRecord) -> LogRecord:
+        return record
+
+
+class HotPathFilter(Filter):
+    """
+    Samples and rate limits the records of each message, the message template is the message type.
+
+    Records logged with extra={'sample': n} are sampled, only one in n of them is kept. Every message is
+    then limited with a token bucket, the first record let through after some were dropped tells how many.
+
+    Parameters:
+    ----------
+    rate: float
+        How many records of the same message are let through per second, on average.
+    burst: int
+        How many records of the same message can be let through at once.
+    """
+
+    def __init__(self, rate: float = RATE_LIMIT, burst: int = RATE_BURST):
+        super().__init__()
+
+        self.rate = rate
+        self.burst = burst
+
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self._buckets: Dict[Tuple[str, str], List[float]] = {}  # Tokens, last refill
+        self._suppressed: Dict[Tuple[str, str], int] = {}
+
+    def filter(self, record: LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:  # Errors are never dropped
+            return True
+
+        key = (record.name, str(record.msg))
+
+        sample = getattr(record, 'sample', 1)
+
+        if sample > 1:
+            count = self._counts[key] = self._counts.get(key, 0) + 1
+
+            if count % sample != 1:
+                return False
+
+        now = monotonic()
+        bucket = self._buckets.setdefault(key, [self.burst, now])
+
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+
+        if bucket[0] < 1:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return False
+
+        bucket[0] -= 1
+
+        suppressed = self._suppressed.pop(key, 0)
+
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar records dropped)"
+
+        return True
+
+
+def start_logging(formatter: Formatter, filename: str) -> QueueListener:
+    """
+    Log through a queue, the records are written to the console and a size rotated file by a background thread,
+    so logging never blocks the event loop on I/O.
+
+    :param formatter: The formatter of the console and the file.
+    :param filename: The log file, rotated every LOG_MAX_BYTES (10 MiB by default).
+    :return: The started listener, it's stopped at exit so the queued records are written.
+    """
+    stream_handler = logging.StreamHandler()
+    stream_handler.setLevel(logging.INFO)
+    stream_handler.setFormatter(formatter)
+
+    file_handler = RotatingFileHandler(
+        filename=filename, encoding="utf-8", maxBytes=int(getenv("LOG_MAX_BYTES", LOG_MAX_BYTES)),
+        backupCount=int(getenv("LOG_BACKUP_COUNT", LOG_BACKUP_COUNT))
+    )
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(formatter)
+
+    queue = SimpleQueue()
+
+    queue_handler = LazyQueueHandler(queue)
+    queue_handler.addFilter(HotPathFilter(float(getenv("LOG_RATE_LIMIT", RATE_LIMIT))))
+
+    listener = QueueListener(queue, stream_handler, file_handler, respect_handler_level=True)
+    listener.start()
+
+    atexit.register(listener.stop)
+
+    logging.basicConfig(handlers=[queue_handler], level=getenv("LOG_LEVEL", "INFO"))
+
+    return listener
@@ -0,0 +1,166 @@
+import re
+from difflib import SequenceMatcher
+from typing import Iterable, Optional, Tuple
+
+from lavalink import AudioTrack
+
+MATCH_THRESHOLD = 0.55  # Candidates scoring below this are considered a mismatch
+GOOD_ENOUGH_SCORE = 0.85  # Stop trying other query variants once a candidate scores this high
+DURATION_TOLERANCE = 20_000  # Milliseconds of difference at which the duration score drops to 0
+
+# Versions that are usually not what the user wants unless the Spotify title asks for them
+UNWANTED_KEYWORDS = (
+    'live', 'cover', 'remix', 'karaoke', 'instrumental', 'acoustic', 'sped up', 'slowed', 'nightcore',
+    'reverb', '8d', 'tutorial', 'reaction', 'full album'
+)
+
+_BRACKETS_RX = re.compile(r'[\(\[【「].*?[\)\]】」]')
+_NOISE_RX = re.compile(
+    r'\b(official|music|video|lyrics?|lyric video|audio|mv|hd|hq|4k|visualizer|topic|feat\.?|ft\.?)\b', re.I
+)
+_NON_WORD_RX = re.compile(r'[^\w\s]+')
+_SPACES_RX = re.compile(r'\s+')
+_UNWANTED_RXS = tuple(re.compile(rf'\b{re.escape(keyword)}\b') for keyword in UNWANTED_KEYWORDS)
+
+
+def normalize(text: str) -> str:
+    """
+    Normalize a title or an artist name for fuzzy comparison.
+
+    :param text: The text to normalize.
+    :return: Lowercase text without brackets, punctuation and common YouTube noise words.
+    """
+    text = _BRACKETS_RX.sub(' ', text.lower())
+    text = _NOISE_RX.sub(' ', text)
+    text = _NON_WORD_RX.sub(' ', text)
+
+    return _SPACES_RX.sub(' ', text).strip()
+
+
+def title_similarity(expected: str, candidate: str) -> float:
+    """
+    Fuzzy similarity between the expected title and a candidate title.
+
+    YouTube titles usually contain the artist name too, so this also considers how many
+    words of the expected title can be found in the candidate title.
+
+    :param expected: The title from Spotify.
+    :param candidate: The title of the YouTube result.
+    :return: A score between 0 and 1.
+    """
+    expected, candidate = normalize(expected), normalize(candidate)
+
+    if not expected or not candidate:
+        return 0.0
+
+    ratio = SequenceMatcher(None, expected, candidate).ratio()
+
+    expected_words = expected.split()
+    candidate_words = set(candidate.split())
+    containment = sum(1 for word in expected_words if word in candidate_words) / len(expected_words)
+
+    return max(ratio, containment * 0.95)
+
+
+def artist_similarity(expected_artists: str, candidate: AudioTrack) -> float:
+    """
+    How many of the expected artists can be found in the candidate's author or title.
+
+    :param expected_artists: Comma separated artist names from Spotify.
+    :param candidate: The YouTube result.
+    :return: A score between 0 and 1.
+    """
+    artists = [normalize(artist) for artist in expected_artists.split(',')]
+    artists = [artist for artist in artists if artist]
+
+    if not artists:
+        return 0.0
+
+    haystack = f"{normalize(candidate.author)} {normalize(candidate.title)}"
+
+    return sum(1 for artist in artists if artist in haystack) / len(artists)
+
+
+def duration_similarity(expected_ms: int, candidate_ms: int) -> float:
+    """
+    Score how close the candidate duration is to the expected one.
+
+    :param expected_ms: The duration from Spotify in milliseconds.
+    :param candidate_ms: The duration of the YouTube result in milliseconds.
+    :return: 1 for an (almost) exact match, decaying linearly to 0 at DURATION_TOLERANCE.
+    """
+    if not expected_ms or not candidate_ms:
+        return 0.0
+
+    difference = abs(expected_ms - candidate_ms)
+
+    if difference <= 2000:
+        return 1.0
+
+    return max(0.0, 1 - difference / DURATION_TOLERANCE)
+
+
+def unwanted_penalty(expected_title: str, candidate_title: str) -> float:
+    """
+    Penalty for versions (live, cover, remix...) that the Spotify track does not ask for,
+    and for missing the version it does ask for.
+
+    :param expected_title: The title from Spotify.
+    :param candidate_title: The title of the YouTube result.
+    :return: The penalty to subtract from the score.
+    """
+    expected_title, candidate_title = expected_title.lower(), candidate_title.lower()
+
+    penalty = 0.0
+
+    for keyword_rx in _UNWANTED_RXS:
+        if bool(keyword_rx.search(candidate_title)) != bool(keyword_rx.search(expected_title)):
+            penalty += 0.3
+
+    return min(penalty, 0.6)
+
+
+def score_candidate(title: str, author: str, duration_ms: int, candidate: AudioTrack) -> float:
+    """
+    Score a YouTube result against the Spotify metadata.
+
+    :param title: The title from Spotify.
+    :param author: Comma separated artist names from Spotify.
+    :param duration_ms: The duration from Spotify in milliseconds.
+    :param candidate: The YouTube result to score.
+    :return: The score, higher is better. Streams always score 0.
+    """
+    if candidate.stream:
+        return 0.0
+
+    score = 0.45 * title_similarity(title, candidate.title) \
+        + 0.2 * artist_similarity(author, candidate) \
+        + 0.35 * duration_similarity(duration_ms, candidate.duration)
+
+    return score - unwanted_penalty(title, candidate.title)
+
+
+def best_match(title: str,
+               author: str,
+               duration_ms: int,
+               candidates: Iterable[AudioTrack],
+               bonus: float = 0.0) -> Optional[Tuple[float, AudioTrack]]:
+    """
+    Find the best scoring candidate.
+
+    :param title: The title from Spotify.
+    :param author: Comma separated artist names from Spotify.
+    :param duration_ms: The duration from Spotify in milliseconds.
+    :param candidates: The YouTube results to choose from.
+    :param bonus: A bonus added to every candidate's score, used to prefer some search sources.
+    :return: A tuple of the score and the best candidate, None if there are no candidates.
+    """
+    best: Optional[Tuple[float, AudioTrack]] = None
+
+    for candidate in candidates:
+        score = score_candidate(title, author, duration_ms, candidate) + bonus
+
+        if best is None or score > best[0]:
+            best = (score, candidate)
+
+    return best
@@ -0,0 +1,392 @@
+import asyncio
+import logging
+from bisect import bisect_left
+from logging import Filter, LogRecord
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+if TYPE_CHECKING:
+    from lava.classes.lavalink_client import LavalinkClient
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Samples = Iterable[Tuple[Tuple[str, ...], float]]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+
+    if extra:
+        pairs.append(extra)
+
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class CounterChild:
+    """A counter bound to its label values, incrementing it doesn't allocate anything"""
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value: float = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class GaugeChild:
+    """A gauge bound to its label values"""
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value: float = 0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+
+class HistogramChild:
+    """A histogram bound to its label values, observing a value only bumps a bucket count, the sum and the count"""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)  # The last one is +Inf
+        self.sum: float = 0.0
+        self.count: int = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> "Timer":
+        """
+        :return: A context manager observing how long its block took, in seconds.
+        """
+        return Timer(self)
+
+
+class Timer:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram: HistogramChild):
+        self.histogram = histogram
+        self.started: float = 0.0
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self.histogram.observe(perf_counter() - self.started)
+
+
+class Metric:
+    """
+    A metric with its children, one per combination of label values.
+
+    Children are created once with labels() and should be kept by the caller, the hot paths then
+    only touch the child.
+
+    Parameters:
+    ----------
+    name: str
+        The name of the metric.
+    documentation: str
+        The help text of the metric.
+    labels: Sequence[str]
+        The label names.
+    """
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        """
+        Get the child of the label values, created on first use.
+
+        :param values: The label values, in the order of the label names.
+        :return: The child.
+        """
+        if len(values) != len(self.label_names):
+            raise ValueError(f"{self.name} takes the labels {', '.join(self.label_names)}")
+
+        child = self._children.get(values)
+
+        if child is None:
+            child = self._children[values] = self._new_child()
+
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+        for values, child in self._children.items():
+            lines.append(f"{self.name}{_format_labels(self.label_names, values)} {child.value}")
+
+        return lines
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def _new_child(self) -> GaugeChild:
+        return GaugeChild()
+
+
+class Histogram(Metric):
+    """
+    Parameters:
+    ----------
+    buckets: Sequence[float]
+        The upper bounds of the buckets.
+    """
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+        for values, child in self._children.items():
+            cumulative = 0
+
+            for bound, count in zip((*self.buckets, '+Inf'), child.counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+
+            labels = _format_labels(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {child.sum}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+
+        return lines
+
+
+class CallbackMetric(Metric):
+    """
+    A metric whose samples are collected when it's rendered, for values that are already kept elsewhere,
+    such as the player counts and the cache statistics.
+
+    Parameters:
+    ----------
+    collect: Callable[[], Samples]
+        Returns the label values and the value of every sample.
+    kind: str
+        The metric type, gauge or counter.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str], collect: Callable[[], Samples],
+                 kind: str = 'gauge'):
+        super().__init__(name, documentation, labels)
+
+        self.collect = collect
+        self.type = kind
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+        for values, value in self.collect():
+            lines.append(f"{self.name}{_format_labels(self.label_names, values)} {value}")
+
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Add a metric, or get the one already registered with the same name.
+
+        :param metric: The metric.
+        :return: The registered metric.
+        """
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def callback(self, name: str, documentation: str, labels: Sequence[str], collect: Callable[[], Samples],
+                 kind: str = 'gauge') -> CallbackMetric:
+        metric = CallbackMetric(name, documentation, labels, collect, kind)
+        self.metrics[name] = metric  # Replaced, the collector may belong to a new client
+
+        return metric
+
+    def render(self) -> str:
+        """
+        :return: Every metric in the Prometheus text format.
+        """
+        lines = []
+
+        for metric in self.metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception:  # A broken collector must not take the other metrics down
+                logging.getLogger('lava.metrics').exception("Failed to render metric %s", metric.name)
+
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# Pre-bound children for the hot paths
+DISPLAY_EDITS = REGISTRY.counter('lava_display_edits_total', 'Player display messages sent or edited').labels()
+RATE_LIMIT_HITS = REGISTRY.counter('lava_discord_rate_limits_total', 'Discord rate limits hit').labels()
+LOAD_LATENCY = REGISTRY.histogram('lava_load_seconds', 'Time to load tracks, by source', ['source'])
+LAVALINK_LOAD_LATENCY = LOAD_LATENCY.labels('lavalink')
+LYRICS_LATENCY = REGISTRY.histogram('lava_lyrics_fetch_seconds', 'Time to fetch lyrics').labels()
+LOOP_LAG = REGISTRY.histogram(
+    'lava_event_loop_lag_seconds', 'How late the event loop ran a callback',
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+).labels()
+
+
+class RateLimitCounter(Filter):
+    """Counts the rate limits discord.py logs, added to the discord.http logger"""
+
+    def filter(self, record: LogRecord) -> bool:
+        if str(record.msg).startswith("We are being rate limited"):
+            RATE_LIMIT_HITS.inc()
+
+        return True
+
+
+logging.getLogger('discord.http').addFilter(RateLimitCounter())
+
+
+class MetricsServer:
+    """
+    Serves the metrics of a registry over HTTP at /metrics.
+
+    Parameters:
+    ----------
+    registry: Registry
+        The registry to serve.
+    host: str
+        The host to listen on, local only by default.
+    port: int
+        The port to listen on.
+    """
+
+    def __init__(self, registry: Registry = REGISTRY, host: str = '127.0.0.1', port: int = 9100):
+        self.registry = registry
+        self.host = host
+        self.port = port
+
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, _: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render(), content_type='text/plain', charset='utf-8')
+
+
+def register_client_metrics(client: "LavalinkClient", registry: Registry = REGISTRY):
+    """
+    Register the metrics collected from a Lavalink client when they are rendered.
+
+    :param client: The client.
+    :param registry: The registry to register the metrics in.
+    """
+    def players() -> Samples:
+        for node in client.node_manager.nodes:
+            playing = sum(1 for player in node.players if player.is_playing)
+
+            yield (node.name, 'active'), len(node.players)
+            yield (node.name, 'playing'), playing
+            yield (node.name, 'idle'), len(node.players) - playing
+
+    def queued_tracks() -> Samples:
+        for node in client.node_manager.nodes:
+            yield (node.name,), sum(len(player.queue) for player in node.players)
+
+    def longest_queue() -> Samples:
+        for node in client.node_manager.nodes:
+            yield (node.name,), max((len(player.queue) for player in node.players), default=0)
+
+    def caches() -> Dict[str, object]:
+        caches = {'results': client.results, 'radio_mixes': client.radio_mixes, 'failures': client.failures}
+
+        if client.shared is not None:
+            caches['shared'] = client.shared
+
+        return caches
+
+    registry.callback('lava_players', 'Players by node and state', ['node', 'state'], players)
+    registry.callback('lava_queued_tracks', 'Tracks queued on the players of a node', ['node'], queued_tracks)
+    registry.callback('lava_queue_length_max', 'Longest queue on a node', ['node'], longest_queue)
+    registry.callback(
+        'lava_cache_hits_total', 'Cache hits', ['cache'],
+        lambda: (((name,), cache.hits) for name, cache in caches().items()), kind='counter'
+    )
+    registry.callback(
+        'lava_cache_misses_total', 'Cache misses', ['cache'],
+        lambda: (((name,), cache.misses) for name, cache in caches().items()), kind='counter'
+    )
+    registry.callback(
+        'lava_cache_hit_ratio', 'Cache hit ratio', ['cache'],
+        lambda: (((name,), cache.hit_rate) for name, cache in caches().items())
+    )
+    registry.callback(
+        'lava_event_pipeline', 'Event pipeline statistics', ['stat'],
+        lambda: (((stat,), value) for stat, value in client.events.stats().items())
+    )
+    registry.callback(
+        'lava_players_evicted_total', 'Idle players evicted', [],
+        lambda: [((), client.player_manager.evicted)], kind='counter'
+    )
+    registry.callback(
+        'lava_asyncio_tasks', 'Tasks on the event loop', [], lambda: [((), len(asyncio.all_tasks(client.bot.loop)))]
+    )
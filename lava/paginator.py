@@ -1,5 +1,8 @@
-from discord.ui import View, button, Button
-from discord import ButtonStyle, Interaction
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from discord.ui import View, button, Button, Modal, InputText
+from discord import ButtonStyle, Interaction, Embed, HTTPException
 
 class Paginator(View):
     """
@@ -68,4 +71,160 @@ class Paginator(View):
         if self.CurrentEmbed == len(self.embeds) - 1:
             button.disabled = True
 
-        await interaction.response.edit_message(embed=self.embeds[self.CurrentEmbed], view=self)
\ No newline at end of file
+        await interaction.response.edit_message(embed=self.embeds[self.CurrentEmbed], view=self)
+
+
+class JumpToPageModal(Modal):
+    def __init__(self, paginator: "LazyPaginator", *args, **kwargs):
+        super().__init__(title="跳至頁面", *args, **kwargs)
+
+        self.paginator = paginator
+
+        self.add_item(
+            InputText(
+                label=f"頁碼 (1 ~ {paginator.page_count})",
+                placeholder="請輸入要跳至的頁碼",
+                max_length=6,
+            )
+        )
+
+    async def callback(self, interaction: Interaction):
+        try:
+            page = int(self.children[0].value) - 1
+        except ValueError:
+            return await interaction.response.send_message("請輸入有效的頁碼!", ephemeral=True)
+
+        if not 0 <= page < self.paginator.page_count:
+            return await interaction.response.send_message("頁碼超出範圍!", ephemeral=True)
+
+        await self.paginator.show_page(interaction, page)
+
+
+class LazyPaginator(View):
+    """
+    Paginator that renders pages on demand instead of holding every page in memory.
+
+    Only the last few rendered pages are kept, pages are rendered again from the page provider
+    once they fall out of the cache, or once the paginated content changed. Clicking the page counter
+    opens a modal to jump to any page.
+
+    Parameters:
+    ----------
+    page_provider: Callable[[int], Embed]
+        Renders the page at the given zero-based index.
+    page_count: Callable[[], int]
+        Returns the current amount of pages, called every time a page is shown so the pages can change over time.
+    author: int
+        The ID of the author who can interact with the buttons. Anyone can interact with the buttons if not specified.
+    timeout: float
+        How long the paginator stays interactive after the last interaction, in seconds.
+    cache_size: int
+        How many rendered pages to keep.
+    version: Callable[[], int]
+        Returns a number that changes whenever the paginated content changes, such as TrackQueue.version.
+        Cached pages rendered at another version are dropped. Pages are cached as is if not specified.
+    """
+    def __init__(self,
+                 page_provider: Callable[[int], Embed],
+                 page_count: Callable[[], int],
+                 author: Optional[int] = None,
+                 timeout: float = 180,
+                 cache_size: int = 3,
+                 version: Optional[Callable[[], int]] = None):
+        super().__init__(timeout=timeout)
+
+        self.page_provider = page_provider
+        self._page_count = page_count
+        self.author = author
+        self.cache_size = cache_size
+        self._version = version
+
+        self.current_page = 0
+
+        self._pages: "OrderedDict[int, Tuple[Optional[int], Embed]]" = OrderedDict()  # Page -> (version, embed)
+
+        self._update_buttons()
+
+    @property
+    def page_count(self) -> int:
+        return max(self._page_count(), 1)
+
+    def render(self, page: int) -> Embed:
+        """
+        Get the embed of a page, from the cache if it was rendered recently and the content didn't change since.
+
+        :param page: The zero-based index of the page.
+        :return: The embed of the page.
+        """
+        version = self._version() if self._version else None
+        cached = self._pages.get(page)
+
+        if cached is not None and cached[0] != version:
+            self._pages.clear()  # The content changed, so every cached page may be stale
+            cached = None
+
+        if cached is None:
+            embed = self.page_provider(page)
+            self._pages[page] = (version, embed)
+
+            while len(self._pages) > self.cache_size:
+                self._pages.popitem(last=False)
+        else:
+            embed = cached[1]
+            self._pages.move_to_end(page)
+
+        return embed
+
+    async def show_page(self, interaction: Interaction, page: int):
+        """
+        Show a page by editing the message the interaction belongs to.
+
+        :param interaction: The interaction to respond to.
+        :param page: The zero-based index of the page, clamped to the existing pages.
+        """
+        self.current_page = min(max(page, 0), self.page_count - 1)
+        self._update_buttons()
+
+        await interaction.response.edit_message(embed=self.render(self.current_page), view=self)
+
+    async def interaction_check(self, interaction: Interaction) -> bool:
+        if self.author is not None and interaction.user.id != self.author:
+            await interaction.response.send_message("你無法點選這個按鈕!", ephemeral=True)
+            return False
+
+        return True
+
+    async def on_timeout(self):
+        self._pages.clear()
+        self.disable_all_items()
+
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except HTTPException:
+                pass
+
+    def _update_buttons(self):
+        page_count = self.page_count
+
+        for item in self.children:
+            match item.custom_id:
+                case "lazy_previous":
+                    item.disabled = self.current_page <= 0
+                case "lazy_count":
+                    item.label = f"{self.current_page + 1} / {page_count}"
+                    item.disabled = page_count <= 1
+                case "lazy_next":
+                    item.disabled = self.current_page >= page_count - 1
+
+    @button(emoji="⬅️", style=ButtonStyle.blurple, custom_id="lazy_previous")
+    async def previous(self, button: Button, interaction: Interaction):
+        await self.show_page(interaction, self.current_page - 1)
+
+    @button(label="/", style=ButtonStyle.green, custom_id="lazy_count")
+    async def count(self, button: Button, interaction: Interaction):
+        await interaction.response.send_modal(JumpToPageModal(self))
+
+    @button(emoji="➡️", style=ButtonStyle.blurple, custom_id="lazy_next")
+    async def next(self, button: Button, interaction: Interaction):
+        await self.show_page(interaction, self.current_page + 1)
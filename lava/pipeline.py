@@ -0,0 +1,232 @@
+import asyncio
+from collections import deque
+from time import monotonic
+from typing import TYPE_CHECKING, Awaitable, Callable, Deque, Dict, Hashable, Optional, Tuple, Type, Union
+
+from lavalink import Event, PlayerUpdateEvent
+
+from lava.cache import TTLCache
+
+if TYPE_CHECKING:
+    from lava.classes.lavalink_client import LavalinkClient
+
+MAILBOX_SIZE = 64  # How many events a guild can have waiting, the oldest are dropped past that
+DEDUPE_WINDOW = 2  # Events of a guild with the same identity within this many seconds are handled once
+
+_UPDATE = object()  # Placeholder in a mailbox for the latest PlayerUpdateEvent of the guild
+
+Handler = Callable[[Event], Awaitable[None]]
+
+
+def event_key(event: Event) -> Optional[Hashable]:
+    """
+    Get the identity of an event, the same event delivered twice has the same identity.
+
+    The play count of the player is part of it, so the same track ending again after being played again,
+    such as a short track on loop, is a new event.
+
+    :param event: The event.
+    :return: The identity, None for events that are never deduplicated.
+    """
+    if isinstance(event, PlayerUpdateEvent):  # Coalesced instead
+        return None
+
+    track = getattr(event, 'track', None)
+
+    return (
+        type(event).__name__,
+        getattr(track, 'track', None) or getattr(track, 'identifier', None),
+        str(getattr(event, 'reason', getattr(event, 'original', ''))),
+        getattr(event.player, 'plays', 0)
+    )
+
+
+class EventPipeline:
+    """
+    The single place Lavalink player events are routed to their handler, through a bounded mailbox per guild.
+
+    Every event type has exactly one owner. Starting the next track on TrackEndEvent and TrackStuckEvent is
+    owned by LavaPlayer._handle_event, which Lavalink calls itself. Everything touching Discord is owned
+    by the handler routed here, so each event updates the messages once.
+
+    Lavalink dispatches events inline while reading the node websocket, so handlers doing Discord I/O
+    would hold up the events of every other guild. Events are only queued here, and a worker task per
+    guild runs the handlers one event at a time, in order. The worker exits once the mailbox is empty.
+
+    A PlayerUpdateEvent that is still waiting is replaced by the next one, the handlers only get the
+    latest state, so a burst of updates costs a single display update. Other events are deduplicated
+    by their identity (see event_key()), so a redelivered event doesn't send messages or skip again.
+
+    Parameters:
+    ----------
+    client: LavalinkClient
+        The client to receive the events from.
+    mailbox_size: int
+        How many events a guild can have waiting, the oldest are dropped past that.
+    """
+
+    def __init__(self, client: "LavalinkClient", mailbox_size: int = MAILBOX_SIZE):
+        self.client = client
+        self.mailbox_size = mailbox_size
+
+        self._handlers: Dict[Type[Event], Handler] = {}
+        self._seen: TTLCache = TTLCache(maxsize=4096, ttl=DEDUPE_WINDOW)
+        self._mailboxes: Dict[int, Deque[Tuple[float, Union[Event, object]]]] = {}
+        self._updates: Dict[int, PlayerUpdateEvent] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+
+        self.enqueued: int = 0
+        self.coalesced: int = 0
+        self.duplicates: int = 0
+        self.dropped: int = 0
+        self.processed: int = 0
+        self.max_depth: int = 0
+        self.max_wait: float = 0.0
+
+    def add_handler(self, handler: Handler, event: Type[Event]):
+        """
+        Make a handler the owner of an event type, it's run for every event of the type.
+        The events must have a player.
+
+        :param handler: The coroutine function to call with the event.
+        :param event: The type of the events.
+        :raise ValueError: If another handler already owns the event type.
+        """
+        owner = self._handlers.get(event)
+
+        if owner is not None:
+            if owner != handler:
+                raise ValueError(f"{event.__name__} is already handled by {owner.__qualname__}")
+
+            return  # on_ready can fire again after a reconnect
+
+        self._handlers[event] = handler
+        self.client.add_event_hook(self.submit, event=event)
+
+    async def submit(self, event: Event):
+        """
+        Queue an event for its guild, this never waits for the handlers.
+
+        :param event: The event, with a player.
+        """
+        player = getattr(event, 'player', None)
+
+        if player is None:
+            return
+
+        guild_id = player.guild_id
+        key = event_key(event)
+
+        if key is not None:
+            if (guild_id, key) in self._seen:
+                self.duplicates += 1
+                return
+
+            self._seen.set((guild_id, key), True)
+
+        mailbox = self._mailboxes.setdefault(guild_id, deque())
+
+        self.enqueued += 1
+
+        if isinstance(event, PlayerUpdateEvent):
+            if guild_id in self._updates:
+                self._updates[guild_id] = event
+                self.coalesced += 1
+                return
+
+            self._updates[guild_id] = event
+            item = _UPDATE
+        else:
+            item = event
+
+        if len(mailbox) >= self.mailbox_size:
+            _, dropped = mailbox.popleft()
+            self._forget(guild_id, dropped)
+
+            self.dropped += 1
+            self.client.bot.logger.warning(
+                "Event mailbox of guild %d is full, dropped %s", guild_id, self._name(dropped)
+            )
+
+        mailbox.append((monotonic(), item))
+        self.max_depth = max(self.max_depth, len(mailbox))
+
+        if guild_id not in self._workers:
+            worker = self._workers[guild_id] = asyncio.ensure_future(self._work(guild_id))
+            worker.add_done_callback(lambda done: self._worker_done(guild_id, done))
+
+    @property
+    def depth(self) -> int:
+        """
+        The amount of events waiting in all mailboxes.
+        """
+        return sum(len(mailbox) for mailbox in self._mailboxes.values())
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """
+        :return: The back-pressure metrics of the pipeline.
+        """
+        return {
+            'workers': len(self._workers),
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+            'enqueued': self.enqueued,
+            'coalesced': self.coalesced,
+            'duplicates': self.duplicates,
+            'dropped': self.dropped,
+            'processed': self.processed,
+            'max_wait': self.max_wait
+        }
+
+    async def close(self):
+        """
+        Cancel the workers and drop the waiting events.
+        """
+        workers = list(self._workers.values())
+
+        for worker in workers:
+            worker.cancel()
+
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        self._mailboxes.clear()
+        self._updates.clear()
+
+    async def _work(self, guild_id: int):
+        mailbox = self._mailboxes[guild_id]
+
+        while mailbox:
+            queued, item = mailbox.popleft()
+            event: Optional[Event] = self._updates.pop(guild_id, None) if item is _UPDATE else item
+
+            if event is None:
+                continue
+
+            self.max_wait = max(self.max_wait, monotonic() - queued)
+
+            handler = self._handlers.get(type(event))
+
+            try:
+                await handler(event)
+            except Exception:  # One failing handler must not stop the guild's events
+                self.client.bot.logger.exception("Event handler %s failed for guild %d", handler.__name__, guild_id)
+
+            self.processed += 1
+
+    def _worker_done(self, guild_id: int, worker: asyncio.Task):
+        if self._workers.get(guild_id) is worker:
+            del self._workers[guild_id]
+
+        if not self._mailboxes.get(guild_id):
+            self._mailboxes.pop(guild_id, None)
+        elif not worker.cancelled():  # Events came in as the worker was finishing
+            self._workers[guild_id] = restarted = asyncio.ensure_future(self._work(guild_id))
+            restarted.add_done_callback(lambda done: self._worker_done(guild_id, done))
+
+    def _forget(self, guild_id: int, item: Union[Event, object]):
+        if item is _UPDATE:
+            self._updates.pop(guild_id, None)
+
+    @staticmethod
+    def _name(item: Union[Event, object]) -> str:
+        return PlayerUpdateEvent.__name__ if item is _UPDATE else type(item).__name__
@@ -0,0 +1,602 @@
+from bisect import bisect_right
+from collections import deque
+from itertools import accumulate, chain
+from typing import Callable, Deque, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from lavalink import AudioTrack
+
+CHUNK_SIZE = 256
+
+
+class TrackQueue:
+    """
+    A list-like queue of tracks, stored as a list of small chunks.
+
+    Inserting or removing a track only shifts the tracks of a single chunk, and the chunk holding an
+    index is found with a binary search over the chunk offsets, so long queues stay cheap to edit
+    anywhere. Popping the head, which happens on every track change, only touches the first chunk.
+
+    The amount of tracks requested by users (requester is not 0) is maintained as tracks come and go,
+    that is where new user tracks are inserted, in front of the autoplay tracks.
+
+    Parameters:
+    ----------
+    tracks: Optional[Iterable[AudioTrack]]
+        The initial tracks of the queue.
+    chunk_size: int
+        The maximum amount of tracks per chunk.
+    """
+
+    def __init__(self, tracks: Optional[Iterable[AudioTrack]] = None, chunk_size: int = CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+        self._chunks: List[List[AudioTrack]] = []
+        self._offsets: Optional[List[int]] = []  # Index of the first track of each chunk, None when outdated
+        self._length: int = 0
+        self._user_count: int = 0
+
+        self.version: int = 0  # Bumped on every change, to tell cheaply whether the queue changed
+
+        if tracks:
+            self.extend(tracks)
+
+    @property
+    def user_count(self) -> int:
+        """
+        The amount of tracks requested by users, which is also the index to insert a new user track at.
+        """
+        return self._user_count
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __bool__(self) -> bool:
+        return self._length > 0
+
+    def __iter__(self) -> Iterator[AudioTrack]:
+        return chain.from_iterable(self._chunks)
+
+    def __reversed__(self) -> Iterator[AudioTrack]:
+        for chunk in reversed(self._chunks):
+            yield from reversed(chunk)
+
+    def __repr__(self) -> str:
+        return f"<TrackQueue length={self._length} user_count={self._user_count}>"
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[AudioTrack, List[AudioTrack]]:
+        if isinstance(index, slice):
+            return self._get_slice(index)
+
+        chunk_index, offset = self._locate(index)
+
+        return self._chunks[chunk_index][offset]
+
+    def __delitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+
+            if step != 1:
+                for position in sorted(range(start, stop, step), reverse=True):
+                    self.pop(position)
+                return
+
+            self._delete_range(start, stop)
+            return
+
+        self.pop(index)
+
+    def append(self, track: AudioTrack):
+        if not self._chunks or len(self._chunks[-1]) >= self.chunk_size:
+            self._chunks.append([])
+            self._offsets = None
+
+        self._chunks[-1].append(track)
+        self._added(track)
+
+    def extend(self, tracks: Iterable[AudioTrack]):
+        for track in tracks:
+            self.append(track)
+
+    def insert(self, index: int, track: AudioTrack):
+        """
+        Insert a track before the index, same as list.insert().
+
+        :param index: The index to insert the track at.
+        :param track: The track to insert.
+        """
+        index = self._clamp(index)
+
+        if index == self._length:
+            self.append(track)
+            return
+
+        chunk_index, offset = self._locate(index)
+        chunk = self._chunks[chunk_index]
+        chunk.insert(offset, track)
+
+        if len(chunk) > self.chunk_size * 2:
+            self._chunks[chunk_index:chunk_index + 1] = [chunk[:self.chunk_size], chunk[self.chunk_size:]]
+
+        self._offsets = None
+        self._added(track)
+
+    def insert_many(self, index: int, tracks: Iterable[AudioTrack]):
+        """
+        Insert tracks before the index, keeping their order.
+
+        :param index: The index to insert the tracks at.
+        :param tracks: The tracks to insert.
+        """
+        tracks = list(tracks)
+
+        if not tracks:
+            return
+
+        index = self._clamp(index)
+
+        if index == self._length:
+            self.extend(tracks)
+            return
+
+        chunk_index, offset = self._locate(index)
+        chunk = self._chunks[chunk_index]
+
+        merged = chunk[:offset] + tracks + chunk[offset:]
+        self._chunks[chunk_index:chunk_index + 1] = [
+            merged[start:start + self.chunk_size] for start in range(0, len(merged), self.chunk_size)
+        ]
+
+        self._offsets = None
+
+        for track in tracks:
+            self._added(track)
+
+    def pop(self, index: int = -1) -> AudioTrack:
+        if not self._length:
+            raise IndexError('pop from empty queue')
+
+        chunk_index, offset = self._locate(index)
+        chunk = self._chunks[chunk_index]
+        track = chunk.pop(offset)
+
+        if not chunk:
+            del self._chunks[chunk_index]
+
+        self._offsets = None
+        self._removed(track)
+
+        return track
+
+    def remove(self, track: AudioTrack):
+        """
+        Remove the first occurrence of a track.
+
+        :param track: The track to remove.
+        :raise ValueError: If the track isn't in the queue.
+        """
+        for chunk_index, chunk in enumerate(self._chunks):
+            for offset, queued in enumerate(chunk):
+                if queued == track:
+                    self.pop(self._offset_of(chunk_index) + offset)
+                    return
+
+        raise ValueError('track not in queue')
+
+    def filter(self, predicate: Callable[[AudioTrack], bool]) -> int:
+        """
+        Keep only the tracks the predicate returns True for, in a single pass.
+
+        :param predicate: Called with every track.
+        :return: The amount of tracks removed.
+        """
+        kept = [track for track in self if predicate(track)]
+        removed = self._length - len(kept)
+
+        if removed:
+            self.clear()
+            self.extend(kept)
+
+        return removed
+
+    def clear(self):
+        self._chunks.clear()
+        self._offsets = []
+        self._length = 0
+        self._user_count = 0
+        self.version += 1
+
+    def _added(self, track: AudioTrack):
+        self._length += 1
+        self.version += 1
+
+        if track.requester:
+            self._user_count += 1
+
+    def _removed(self, track: AudioTrack):
+        self._length -= 1
+        self.version += 1
+
+        if track.requester:
+            self._user_count -= 1
+
+    def _clamp(self, index: int) -> int:
+        if index < 0:
+            index += self._length
+
+        return min(max(index, 0), self._length)
+
+    def _chunk_offsets(self) -> List[int]:
+        if self._offsets is None:
+            self._offsets = [0, *accumulate(len(chunk) for chunk in self._chunks[:-1])]
+
+        return self._offsets
+
+    def _offset_of(self, chunk_index: int) -> int:
+        return self._chunk_offsets()[chunk_index]
+
+    def _locate(self, index: int) -> Tuple[int, int]:
+        if index < 0:
+            index += self._length
+
+        if not 0 <= index < self._length:
+            raise IndexError('queue index out of range')
+
+        if index < len(self._chunks[0]):  # The head is by far the most common lookup
+            return 0, index
+
+        offsets = self._chunk_offsets()
+        chunk_index = bisect_right(offsets, index) - 1
+
+        return chunk_index, index - offsets[chunk_index]
+
+    def _get_slice(self, index: slice) -> List[AudioTrack]:
+        start, stop, step = index.indices(self._length)
+
+        if step != 1:
+            return list(self)[index]
+
+        if start >= stop:
+            return []
+
+        chunk_index, offset = self._locate(start)
+        tracks: List[AudioTrack] = []
+
+        while len(tracks) < stop - start:
+            chunk = self._chunks[chunk_index]
+            tracks.extend(chunk[offset:offset + stop - start - len(tracks)])
+            chunk_index += 1
+            offset = 0
+
+        return tracks
+
+    def _delete_range(self, start: int, stop: int):
+        if start >= stop:
+            return
+
+        first, first_offset = self._locate(start)
+        last, last_offset = self._locate(stop - 1)
+
+        if first == last:
+            removed = self._chunks[first][first_offset:last_offset + 1]
+            del self._chunks[first][first_offset:last_offset + 1]
+        else:
+            removed = list(chain(
+                self._chunks[first][first_offset:], *self._chunks[first + 1:last], self._chunks[last][:last_offset + 1]
+            ))
+            del self._chunks[last][:last_offset + 1]
+            del self._chunks[first][first_offset:]
+            del self._chunks[first + 1:last]
+
+        self._chunks = [chunk for chunk in self._chunks if chunk]
+        self._offsets = None
+
+        for track in removed:
+            self._removed(track)
+
+
+class FairQueue:
+    """
+    A list-like queue of tracks that takes turns between requesters.
+
+    Every requester has their own sub-queue, and the next track is taken from the requester at the front
+    of the rotation, who then moves to the back. So a user adding a huge playlist only gets every n-th
+    track when n users are queueing, and taking the next track is O(1).
+
+    Autoplay tracks (requester is 0) come after every user track. Tracks inserted in front of the
+    user tracks skip the rotation and are played at that position, the tracks ahead of it are moved out of
+    the rotation to keep their order. Tracks inserted at or after user_count, where new tracks are added
+    by default, go to the turns of their requesters instead, so inserting never lets a user jump the rotation
+    unless they asked for a position.
+
+    The play order is only materialized (and cached until the next change) for positional access,
+    such as showing the queue.
+
+    Parameters:
+    ----------
+    tracks: Optional[Iterable[AudioTrack]]
+        The initial tracks of the queue.
+    """
+    _FRONT = 'front'
+    _AUTOPLAY = 'autoplay'
+
+    def __init__(self, tracks: Optional[Iterable[AudioTrack]] = None):
+        self._front: Deque[AudioTrack] = deque()
+        self._queues: Dict[int, Deque[AudioTrack]] = {}
+        self._rotation: Deque[int] = deque()
+        self._autoplay: Deque[AudioTrack] = deque()
+
+        self._length: int = 0
+        self._user_count: int = 0
+
+        self._order: Optional[List[Tuple[AudioTrack, Hashable, int]]] = None
+
+        self.version: int = 0  # Bumped on every change, to tell cheaply whether the queue changed
+
+        if tracks:
+            self.extend(tracks)
+
+    @property
+    def user_count(self) -> int:
+        """
+        The amount of tracks requested by users.
+        """
+        return self._user_count
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __bool__(self) -> bool:
+        return self._length > 0
+
+    def __iter__(self) -> Iterator[AudioTrack]:
+        return (track for track, _, _ in self._play_order())
+
+    def __reversed__(self) -> Iterator[AudioTrack]:
+        return (track for track, _, _ in reversed(self._play_order()))
+
+    def __repr__(self) -> str:
+        return f"<FairQueue length={self._length} requesters={len(self._rotation)}>"
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[AudioTrack, List[AudioTrack]]:
+        if isinstance(index, slice):
+            return [track for track, _, _ in self._play_order()[index]]
+
+        return self._play_order()[index][0]
+
+    def __delitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            self._delete(range(*index.indices(self._length)))
+            return
+
+        self.pop(index)
+
+    def append(self, track: AudioTrack):
+        if not track.requester:
+            self._autoplay.append(track)
+        else:
+            if track.requester not in self._queues:
+                self._queues[track.requester] = deque()
+                self._rotation.append(track.requester)
+
+            self._queues[track.requester].append(track)
+
+        self._added(track)
+
+    def extend(self, tracks: Iterable[AudioTrack]):
+        for track in tracks:
+            self.append(track)
+
+    def insert(self, index: int, track: AudioTrack):
+        """
+        Insert a track before the index, same as list.insert() for indices in front of user_count.
+        At or after user_count, a user track is added to the end of its requester's turn instead,
+        and an autoplay track is inserted among the autoplay tracks.
+
+        :param index: The index to insert the track at.
+        :param track: The track to insert.
+        """
+        self.insert_many(index, [track])
+
+    def insert_many(self, index: int, tracks: Iterable[AudioTrack]):
+        """
+        Insert tracks before the index, keeping their order. Same as insert() for where they end up.
+
+        :param index: The index to insert the tracks at.
+        :param tracks: The tracks to insert.
+        """
+        tracks = list(tracks)
+        index = self._clamp(index)
+
+        # Where the requesters take turns, index 0 of a queue that isn't empty is always the next track
+        if index >= max(self._user_count, len(self._front), 1 if self._length else 0):
+            autoplay_index = max(0, index - (self._length - len(self._autoplay)))
+
+            for track in tracks:
+                if track.requester:
+                    self.append(track)
+                    continue
+
+                self._autoplay.insert(autoplay_index, track)
+                self._added(track)
+
+                autoplay_index += 1
+            return
+
+        if index > len(self._front):
+            self._hoist(index)
+
+        for offset, track in enumerate(tracks):
+            self._front.insert(index + offset, track)
+            self._added(track)
+
+    def pop(self, index: int = -1) -> AudioTrack:
+        if not self._length:
+            raise IndexError('pop from empty queue')
+
+        if index in (0, -self._length):
+            return self._pop_next()
+
+        track, = self._delete([index])
+
+        return track
+
+    def remove(self, track: AudioTrack):
+        for index, (queued, _, _) in enumerate(self._play_order()):
+            if queued == track:
+                self._delete([index])
+                return
+
+        raise ValueError('track not in queue')
+
+    def filter(self, predicate: Callable[[AudioTrack], bool]) -> int:
+        """
+        Keep only the tracks the predicate returns True for.
+
+        :param predicate: Called with every track.
+        :return: The amount of tracks removed.
+        """
+        removed = [index for index, (track, _, _) in enumerate(self._play_order()) if not predicate(track)]
+
+        self._delete(removed)
+
+        return len(removed)
+
+    def clear(self):
+        self._front.clear()
+        self._queues.clear()
+        self._rotation.clear()
+        self._autoplay.clear()
+
+        self._length = 0
+        self._user_count = 0
+        self._order = None
+        self.version += 1
+
+    def _pop_next(self) -> AudioTrack:
+        if self._front:
+            track = self._front.popleft()
+
+        elif self._rotation:
+            requester = self._rotation[0]
+            queue = self._queues[requester]
+            track = queue.popleft()
+
+            if queue:
+                self._rotation.rotate(-1)
+            else:
+                self._rotation.popleft()
+                del self._queues[requester]
+
+        else:
+            track = self._autoplay.popleft()
+
+        self._removed(track)
+
+        return track
+
+    def _container(self, key: Hashable) -> Deque[AudioTrack]:
+        if key == self._FRONT:
+            return self._front
+
+        if key == self._AUTOPLAY:
+            return self._autoplay
+
+        return self._queues[key]
+
+    def _play_order(self) -> List[Tuple[AudioTrack, Hashable, int]]:
+        """
+        :return: (track, sub-queue key, index in the sub-queue) of every track, in the order they will be played.
+        """
+        if self._order is not None:
+            return self._order
+
+        order = [(track, self._FRONT, offset) for offset, track in enumerate(self._front)]
+
+        queues = [(requester, self._queues[requester]) for requester in self._rotation]
+        turn = 0
+
+        while queues:
+            queues = [(requester, queue) for requester, queue in queues if turn < len(queue)]
+
+            order.extend((queue[turn], requester, turn) for requester, queue in queues)
+
+            turn += 1
+
+        order.extend((track, self._AUTOPLAY, offset) for offset, track in enumerate(self._autoplay))
+
+        self._order = order
+
+        return order
+
+    def _clamp(self, index: int) -> int:
+        if index < 0:
+            index += self._length
+
+        return min(max(index, 0), self._length)
+
+    def _hoist(self, count: int):
+        """
+        Move the first tracks of the play order in front of the rotation, keeping the play order.
+
+        :param count: The amount of tracks to move.
+        """
+        head = [track for track, _, _ in self._play_order()[:count]]
+
+        self._delete(range(count))
+
+        self._front.extend(head)
+
+        for track in head:
+            self._added(track)
+
+    def _delete(self, indices: Iterable[int]) -> List[AudioTrack]:
+        """
+        Delete tracks by their index in the play order.
+
+        When the tracks are the head of the queue, as when skipping to a track, the turns they used up
+        are skipped too, so the remaining tracks keep their order.
+
+        :param indices: The indices of the tracks.
+        :return: The deleted tracks.
+        """
+        indices = list(indices)
+        order = self._play_order()
+        entries = [order[index] for index in indices]
+
+        # The requester whose turn comes after the deleted head, if the head ends inside the rotation
+        following: Optional[Hashable] = None
+
+        if indices == list(range(len(indices))) and len(indices) < len(order):
+            _, following, _ = order[len(indices)]
+
+        for _, key, offset in sorted(entries, key=lambda entry: entry[2], reverse=True):
+            del self._container(key)[offset]
+
+        for key in {key for _, key, _ in entries}:
+            if key not in (self._FRONT, self._AUTOPLAY) and not self._queues[key]:
+                del self._queues[key]
+                self._rotation.remove(key)
+
+        if following in self._queues:
+            self._rotation.rotate(-self._rotation.index(following))
+
+        for track, _, _ in entries:
+            self._removed(track)
+
+        return [track for track, _, _ in entries]
+
+    def _added(self, track: AudioTrack):
+        self._length += 1
+        self._order = None
+        self.version += 1
+
+        if track.requester:
+            self._user_count += 1
+
+    def _removed(self, track: AudioTrack):
+        self._length -= 1
+        self._order = None
+        self.version += 1
+
+        if track.requester:
+            self._user_count -= 1
@@ -0,0 +1,149 @@
+from typing import Any, Dict, List, Optional
+
+from lavalink import AudioTrack, DeferredAudioTrack, LoadResult, LoadType, PlaylistInfo, Filter, Volume, Equalizer, Karaoke, Timescale, Tremolo, Vibrato, Rotation, LowPass, \
+    ChannelMix, Distortion
+
+from lava.decoder import decode_track, TrackDecodeError
+from lava.source import SpotifyAudioTrack
+
+SNAPSHOT_VERSION = 1
+
+FILTERS = {
+    cls.__name__.lower(): cls
+    for cls in (Volume, Equalizer, Karaoke, Timescale, Tremolo, Vibrato, Rotation, LowPass, ChannelMix, Distortion)
+}
+
+# The track attributes sources set after loading, and their key in the track info
+OVERRIDABLE_FIELDS = {'title': 'title', 'author': 'author', 'artwork_url': 'artworkUrl', 'uri': 'uri'}
+
+
+def track_overrides(track: AudioTrack) -> Dict[str, Any]:
+    """
+    Get the attributes of a track that differ from its track info, such as the title and author
+    set by the sources after loading.
+
+    :param track: The track.
+    :return: The overridden attributes, by attribute name.
+    """
+    info = track.raw.get('info', track.raw)
+
+    return {
+        attribute: getattr(track, attribute)
+        for attribute, key in OVERRIDABLE_FIELDS.items() if getattr(track, attribute) != info.get(key)
+    }
+
+
+def apply_overrides(track: AudioTrack, overrides: Dict[str, Any]) -> AudioTrack:
+    """
+    Set the attributes returned by track_overrides() back on a track.
+
+    :param track: The track.
+    :param overrides: The overridden attributes.
+    :return: The same track.
+    """
+    for attribute, value in overrides.items():
+        if attribute in OVERRIDABLE_FIELDS:
+            setattr(track, attribute, value)
+
+    return track
+
+
+def serialize_track(track: AudioTrack) -> List[Any]:
+    """
+    Serialize a track compactly, as [encoded track, requester], followed by the attributes set by the sources
+    when there are any, see track_overrides().
+
+    Deferred tracks keep their own info, as [encoded track, requester, None, info], since the encoded track
+    of a loaded one is the matched track of another source, such as the YouTube match of a Spotify track.
+    It is None for deferred tracks that aren't loaded yet.
+
+    :param track: The track to serialize.
+    :return: The serialized track.
+    """
+    if isinstance(track, DeferredAudioTrack):
+        info = dict(track.raw.get('info', track.raw))
+        info.update({OVERRIDABLE_FIELDS[attribute]: value for attribute, value in track_overrides(track).items()})
+
+        return [track.track, track.requester, None, info]
+
+    overrides = track_overrides(track)
+
+    return [track.track, track.requester, overrides] if overrides else [track.track, track.requester]
+
+
+def deserialize_track(data: List[Any]) -> Optional[AudioTrack]:
+    """
+    Rebuild a track serialized with serialize_track().
+
+    :param data: The serialized track.
+    :return: The track, None if it couldn't be decoded.
+    """
+    encoded, requester, *rest = data
+
+    if encoded is None or len(rest) == 2:  # A deferred track, [None, requester, info] in older snapshots
+        if not rest:
+            return None
+
+        track = SpotifyAudioTrack(rest[-1], requester)
+        track.track = encoded
+
+        return track
+
+    try:
+        track = decode_track(encoded)
+    except TrackDecodeError:
+        return None
+
+    track.requester = requester
+
+    return apply_overrides(track, rest[0]) if rest else track
+
+
+def serialize_result(result: LoadResult) -> Dict[str, Any]:
+    """
+    Serialize a load result, so it can be kept in a shared cache.
+
+    :param result: The load result, errors are not supported.
+    :return: The serialized load result.
+    """
+    return {
+        'type': result.load_type.value,
+        'playlist': [result.playlist_info.name, result.playlist_info.selected_track],
+        'tracks': [
+            [track.raw, isinstance(track, SpotifyAudioTrack), track_overrides(track)] for track in result.tracks
+        ]
+    }
+
+
+def deserialize_result(data: Dict[str, Any]) -> LoadResult:
+    """
+    Rebuild a load result serialized with serialize_result().
+
+    :param data: The serialized load result.
+    :return: The load result.
+    """
+    tracks = [
+        apply_overrides(SpotifyAudioTrack(raw, 0) if deferred else AudioTrack(raw), overrides[0] if overrides else {})
+        for raw, deferred, *overrides in data['tracks']
+    ]
+
+    return LoadResult(LoadType(data['type']), tracks, PlaylistInfo(*data['playlist']))
+
+
+def serialize_filters(filters: Dict[str, Filter]) -> Dict[str, Any]:
+    return {name: _filter.values for name, _filter in filters.items() if name in FILTERS}
+
+
+def deserialize_filters(data: Dict[str, Any]) -> List[Filter]:
+    filters = []
+
+    for name, values in data.items():
+        if name not in FILTERS:
+            continue
+
+        _filter = FILTERS[name]()
+        _filter.values = values
+
+        filters.append(_filter)
+
+    return filters
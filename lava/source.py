@@ -1,7 +1,9 @@
 import re
 from logging import getLogger
 from os import getenv
-from typing import Union, Tuple, Optional
+from time import perf_counter
+from typing import Union, Tuple, Optional, Dict
+from urllib.parse import urlsplit
 
 from lavalink import Source, Client, LoadResult, LoadType, PlaylistInfo, DeferredAudioTrack
 from spotipy import Spotify, SpotifyClientCredentials
@@ -9,9 +11,31 @@ from yt_dlp import YoutubeDL
 from yt_dlp.utils import UnsupportedError, DownloadError
 
 from lava.errors import LoadError
+from lava.matcher import best_match, MATCH_THRESHOLD, GOOD_ENOUGH_SCORE
+from lava.metrics import LOAD_LATENCY, HistogramChild
+
+# Search variants tried in order when matching a Spotify track, with the score bonus given to their results
+SPOTIFY_MATCH_QUERIES = (
+    ('ytmsearch:{title} {author}', 0.05),
+    ('ytsearch:{title} {author}', 0.0),
+    ('ytsearch:{title} {author} audio', 0.0),
+)
+SPOTIFY_MATCH_TTL = 86400  # A Spotify track keeps matching the same YouTube track, share the match for a day
+
+SPOTIFY_URL_RX = re.compile(r'^(https://open\.spotify\.com/)(track|album|playlist)/([a-zA-Z0-9]+)(.*)$')
+SPOTIFY_TRACK_URL_RX = re.compile(r'https?:\/\/open\.spotify\.com\/track\/(\w+)')
+SPOTIFY_PLAYLIST_URL_RX = re.compile(r'https?:\/\/open\.spotify\.com\/playlist\/(\w+)')
+SPOTIFY_ALBUM_URL_RX = re.compile(r'https?:\/\/open\.spotify\.com\/album\/(\w+)')
+YOUTUBE_URL_RX = re.compile(
+    r"^(https?://(www\.)?(youtube\.com|music\.youtube\.com)/(watch\?v=|playlist\?list=)([a-zA-Z0-9_-]+))"
+)
+WEBPAGE_URL_RX = re.compile(r'^(?:https?:\/\/)?(?:[^@\n]+@)?(?:www\.)?([^:\/\n]+)')
 
 
 class BaseSource:
+    hosts: Tuple[str, ...] = ()  # Hostnames this source handles, empty to be checked against every query
+    cacheable: bool = True  # Whether load results can be cached, False for results with expiring signed media urls
+
     def __init__(self):
         """
         Inits the source
@@ -43,25 +67,54 @@ class SpotifyAudioTrack(DeferredAudioTrack):
         self.track = None
 
     async def load(self, client):  # skipcq: PYL-W0201
+        cached = await client.shared.get(('spotify', self.identifier)) if client.shared is not None else None
+
+        if cached is not None:
+            self.track = cached
+            return cached
+
         getLogger('lava.sources').info("Loading spotify track %s...", self.title)
 
-        result: LoadResult = await client.get_tracks(
-            f'ytsearch:{self.title} {self.author}'
-        )
+        best = None
+
+        for query, bonus in SPOTIFY_MATCH_QUERIES:
+            result: LoadResult = await client.get_tracks(query.format(title=self.title, author=self.author))
+
+            if result.load_type != LoadType.SEARCH or not result.tracks:
+                continue
+
+            match = best_match(self.title, self.author, self.duration, result.tracks, bonus)
+
+            if match and (best is None or match[0] > best[0]):
+                best = match
 
-        if result.load_type != LoadType.SEARCH or not result.tracks:
+            if best and best[0] >= GOOD_ENOUGH_SCORE:
+                break
+
+        if best is None:
             raise LoadError
 
-        first_track = result.tracks[0]
-        base64 = first_track.track
+        score, matched_track = best
+
+        if score < MATCH_THRESHOLD:
+            getLogger('lava.sources').warning(
+                "No good match for spotify track %s, using %s (score %.2f)", self.title, matched_track.title, score
+            )
+
+        base64 = matched_track.track
         self.track = base64
 
-        getLogger('lava.sources').info("Loaded spotify track %s", self.title)
+        if client.shared is not None:
+            client.shared.set(('spotify', self.identifier), base64, ttl=SPOTIFY_MATCH_TTL)
+
+        getLogger('lava.sources').info("Loaded spotify track %s as %s (score %.2f)", self.title, matched_track.title, score)
 
         return base64
 
 
 class SpotifySource(BaseSource):
+    hosts = ('open.spotify.com',)
+
     def __init__(self):
         super().__init__()
 
@@ -78,9 +131,7 @@ class SpotifySource(BaseSource):
         self.spotify_client = Spotify(auth_manager=credentials)
 
     def check_query(self, query: str) -> bool:
-        spotify_url_rx = r'^(https://open\.spotify\.com/)(track|album|playlist)/([a-zA-Z0-9]+)(.*)$'
-
-        if re.match(spotify_url_rx, query):
+        if SPOTIFY_URL_RX.match(query):
             return True
 
         return False
@@ -217,9 +268,7 @@ class SpotifySource(BaseSource):
         :param url: Spotify track url
         :return: Track id, None if not a track url
         """
-        track_url_rx = re.compile(r'https?:\/\/open\.spotify\.com\/track\/(\w+)')
-
-        match = track_url_rx.match(url)
+        match = SPOTIFY_TRACK_URL_RX.match(url)
 
         if match:
             return match.group(1)
@@ -233,9 +282,7 @@ class SpotifySource(BaseSource):
         :param url: Spotify playlist url
         :return: Playlist id, None if not a playlist url
         """
-        playlist_url_rx = re.compile(r'https?:\/\/open\.spotify\.com\/playlist\/(\w+)')
-
-        match = playlist_url_rx.match(url)
+        match = SPOTIFY_PLAYLIST_URL_RX.match(url)
 
         if match:
             return match.group(1)
@@ -249,9 +296,7 @@ class SpotifySource(BaseSource):
         :param url: Spotify album url
         :return: Album id, None if not a album url
         """
-        album_url_rx = re.compile(r'https?:\/\/open\.spotify\.com\/album\/(\w+)')
-
-        match = album_url_rx.match(url)
+        match = SPOTIFY_ALBUM_URL_RX.match(url)
 
         if match:
             return match.group(1)
@@ -260,6 +305,9 @@ class SpotifySource(BaseSource):
 
 
 class BilibiliSource(BaseSource):
+    hosts = ('www.bilibili.com', 'b23.tv')
+    cacheable = False
+
     def __init__(self):
         super().__init__()
 
@@ -272,9 +320,16 @@ class BilibiliSource(BaseSource):
         return query.startswith('https://www.bilibili.com/video/') or query.startswith('https://b23.tv/')
 
     async def load_item(self, client: Client, query: str) -> Optional[LoadResult]:
-        audio_url, title, author, thumbnail = self.get_audio(query)
+        if client.failures.get_reason('ytdl', query) is not None:
+            return None
 
-        track = (await client.get_tracks(audio_url, check_local=False)).tracks[0]
+        try:
+            audio_url, title, author, thumbnail = self.get_audio(query)
+        except (UnsupportedError, DownloadError) as error:
+            client.failures.add('ytdl', query, str(error))
+            return None
+
+        track = (await client.get_tracks(audio_url, check_local=False, cache=False)).tracks[0]
 
         track.title = title
         track.author = f'{author} / [Bilibili]({query})'
@@ -307,6 +362,8 @@ class BilibiliSource(BaseSource):
 
 
 class YTDLSource(BaseSource):
+    cacheable = False
+
     def __init__(self):
         super().__init__()
 
@@ -317,9 +374,7 @@ class YTDLSource(BaseSource):
         )
 
     def check_query(self, query: str) -> bool:
-        youtube_url_rx = r"^(https?://(www\.)?(youtube\.com|music\.youtube\.com)/(watch\?v=|playlist\?list=)([a-zA-Z0-9_-]+))"
-
-        if re.match(youtube_url_rx, query):
+        if YOUTUBE_URL_RX.match(query):
             return False
 
         if not ((query.startswith("http://")) or (query.startswith("https://"))):
@@ -328,22 +383,26 @@ class YTDLSource(BaseSource):
         return True
 
     async def load_item(self, client: Client, query: str) -> Optional[LoadResult]:
+        if client.failures.get_reason('ytdl', query) is not None:
+            return None
+
         try:
             url_info = self.ytdl.extract_info(query, download=False)
 
             if 'entries' in url_info:
                 url_info = url_info['entries'][0]
 
-        except (UnsupportedError, DownloadError):
+        except (UnsupportedError, DownloadError) as error:
+            client.failures.add('ytdl', query, str(error))
             return None
 
         try:
-            track = (await client.get_tracks(url_info['formats'][-1]['url'])).tracks[0]
+            track = (await client.get_tracks(url_info['formats'][-1]['url'], cache=False)).tracks[0]
 
         except IndexError:
             return None
 
-        match = re.match(r'^(?:https?:\/\/)?(?:[^@\n]+@)?(?:www\.)?([^:\/\n]+)', url_info['webpage_url'])
+        match = WEBPAGE_URL_RX.match(url_info['webpage_url'])
 
         track.title = url_info['title']
         track.author = f"Unknown / [{match.group(1)}]({match.group(0)})"
@@ -355,12 +414,35 @@ class YTDLSource(BaseSource):
         )
 
 
+class SourceTiming:
+    """Accumulated routing and loading cost of a single source"""
+
+    def __init__(self, name: str):
+        self.latency: HistogramChild = LOAD_LATENCY.labels(name)
+
+        self.checks: int = 0
+        self.matches: int = 0
+        self.check_time: float = 0.0
+        self.loads: int = 0
+        self.load_time: float = 0.0
+
+    def __repr__(self) -> str:
+        return f"<SourceTiming checks={self.checks} matches={self.matches} check_time={self.check_time:.6f}s " \
+               f"loads={self.loads} load_time={self.load_time:.3f}s>"
+
+
 class SourceManager(Source):
     def __init__(self):
         super().__init__(name='LavaSourceManager')
 
         self.sources: list[BaseSource] = []
 
+        # Hostname -> sources to check for urls of that host, sources without hosts are appended to every route
+        self.routes: Dict[str, list[BaseSource]] = {}
+        self.fallback_sources: list[BaseSource] = []
+
+        self.timings: Dict[str, SourceTiming] = {}
+
         self.logger = getLogger('lava.sources')
 
         self.initial_sources()
@@ -375,20 +457,101 @@ class SourceManager(Source):
 
         self.sources.sort(key=lambda x: x.priority, reverse=True)
 
+        self.build_routes()
+
+    def build_routes(self):
+        """
+        Build the hostname dispatch table from the hosts declared by each source.
+        """
+        self.fallback_sources = [source for source in self.sources if not source.hosts]
+
+        hosts = {host for source in self.sources for host in source.hosts}
+
+        self.routes = {
+            host: [source for source in self.sources if host in source.hosts or not source.hosts]
+            for host in hosts
+        }
+
+        self.timings = {source.__class__.__name__: SourceTiming(source.__class__.__name__) for source in self.sources}
+
+    def route(self, query: str) -> list[BaseSource]:
+        """
+        Get the sources that may handle the query, in priority order.
+
+        :param query: The query to route
+        :return: The candidate sources
+        """
+        if not query.startswith(('http://', 'https://')):
+            return self.fallback_sources
+
+        try:
+            hostname = urlsplit(query).hostname
+        except ValueError:
+            return self.fallback_sources
+
+        return self.routes.get(hostname, self.fallback_sources)
+
+    def is_cacheable(self, query: str) -> bool:
+        """
+        Check whether the load result of a query can be cached, by the source that would load it.
+
+        :param query: The query
+        :return: False if the query is loaded by a source returning expiring signed media urls
+        """
+        for source in self.route(query):
+            if source.check_query(query):
+                return source.cacheable
+
+        return True
+
     async def load_item(self, client: Client, query: str) -> Optional[LoadResult]:
         self.logger.info("Received query: %s, checking in sources...", query)
 
-        for source in self.sources:
-            self.logger.debug("Checking source for query %s: %s", query, source.__class__.__name__)
+        for source in self.route(query):
+            source_name = source.__class__.__name__
+            timing = self.timings[source_name]
+
+            self.logger.debug("Checking source for query %s: %s", query, source_name)
+
+            started = perf_counter()
+            matched = source.check_query(query)
+
+            timing.checks += 1
+            timing.check_time += perf_counter() - started
 
-            if not source.check_query(query):
-                self.logger.debug("Source %s does not match query %s, skipping...", source.__class__.__name__, query)
+            if not matched:
+                self.logger.debug("Source %s does not match query %s, skipping...", source_name, query)
 
                 continue
 
-            self.logger.info("Source %s matched query %s, loading...", source.__class__.__name__, query)
+            timing.matches += 1
 
-            return await source.load_item(client, query)
+            reason = client.failures.get_reason('local', query)
+
+            if reason is not None:
+                self.logger.info("Source %s matched query %s, but it failed recently: %s", source_name, query, reason)
+                return None
+
+            self.logger.info("Source %s matched query %s, loading...", source_name, query)
+
+            started = perf_counter()
+
+            try:
+                result = await source.load_item(client, query)
+            except Exception as error:
+                client.failures.add('local', query, f"{source_name}: {error!r}")
+                raise
+            finally:
+                elapsed = perf_counter() - started
+
+                timing.loads += 1
+                timing.load_time += elapsed
+                timing.latency.observe(elapsed)
+
+            if not result or not result.tracks:
+                client.failures.add('local', query, f"{source_name}: No results")
+
+            return result
 
         self.logger.info("No sources matched query %s, returning None", query)
-        return None
\ No newline at end of file
+        return None
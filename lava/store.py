@@ -0,0 +1,167 @@
+import asyncio
+import json
+import sqlite3
+from concurrent.futures import Future, ThreadPoolExecutor
+from logging import getLogger
+from time import time
+from typing import Any, Callable, Dict, Optional, Iterable, Tuple, List
+
+
+class StateStore:
+    """
+    A small sqlite backed store for the state that should outlive the bot process,
+    the Lavalink session ids and the player snapshots.
+
+    The database is only touched by a thread of its own, like the shared cache. The periodic snapshot writes
+    are awaited without blocking the event loop, the rare lookups at startup and the writes at shutdown wait
+    for the thread.
+
+    Parameters:
+    ----------
+    path: str
+        The path of the sqlite database file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lava-state-store')
+        self._run(self._open)
+
+    def get_session(self, node: str) -> Optional[str]:
+        """
+        :param node: The name of the node.
+        :return: The last session id of the node, None if there's none.
+        """
+        row = self._run(lambda: self._connection.execute(
+            'SELECT session_id FROM sessions WHERE node = ?', (node,)
+        ).fetchone())
+
+        return row[0] if row else None
+
+    def set_session(self, node: str, session_id: str):
+        self._submit(
+            self._connection.execute, 'INSERT OR REPLACE INTO sessions (node, session_id) VALUES (?, ?)',
+            (node, session_id)
+        )
+
+    def save_player(self, guild_id: int, snapshot: Dict[str, Any]):
+        """
+        Save the snapshot of a player, replacing the previous one.
+
+        :param guild_id: The guild id of the player.
+        :param snapshot: The snapshot from LavaPlayer.snapshot().
+        """
+        self.save_players([(guild_id, snapshot)])
+
+    def save_players(self, snapshots: Iterable[Tuple[int, Dict[str, Any]]]):
+        """
+        Save the snapshots of many players in a single transaction, waiting for the write.
+
+        :param snapshots: The guild ids and snapshots of the players.
+        """
+        self._run(self._write_players, list(snapshots), [])
+
+    async def write_players(self, snapshots: Iterable[Tuple[int, Dict[str, Any]]], deleted: Iterable[int]):
+        """
+        Save the snapshots of many players and delete others in a single transaction, on the store thread.
+
+        :param snapshots: The guild ids and snapshots of the players to save.
+        :param deleted: The guild ids of the players to delete.
+        :raise sqlite3.Error: If the transaction failed, nothing is written then.
+        """
+        await asyncio.wrap_future(self._executor.submit(self._write_players, list(snapshots), list(deleted)))
+
+    def load_player(self, guild_id: int) -> Optional[Dict[str, Any]]:
+        """
+        :param guild_id: The guild id of the player.
+        :return: The saved snapshot of the player, None if there's none.
+        """
+        row = self._run(lambda: self._connection.execute(
+            'SELECT data FROM players WHERE guild_id = ?', (guild_id,)
+        ).fetchone())
+
+        return json.loads(row[0]) if row else None
+
+    def player_ids(self) -> List[int]:
+        """
+        :return: The guild ids of the saved players, without loading the snapshots.
+        """
+        rows = self._run(lambda: self._connection.execute('SELECT guild_id FROM players').fetchall())
+
+        return [row[0] for row in rows]
+
+    def prune_players(self, max_age: float) -> int:
+        """
+        Delete the snapshots that haven't been updated for a while.
+
+        :param max_age: The maximum age of a snapshot, in seconds.
+        :return: The amount of deleted snapshots.
+        """
+        return self._run(lambda: self._connection.execute(
+            'DELETE FROM players WHERE updated < ?', (time() - max_age,)
+        ).rowcount)
+
+    def load_players(self) -> Dict[int, Dict[str, Any]]:
+        """
+        :return: The saved player snapshots, by guild id.
+        """
+        rows = self._run(lambda: self._connection.execute('SELECT guild_id, data FROM players').fetchall())
+
+        return {guild_id: json.loads(data) for guild_id, data in rows}
+
+    def delete_player(self, guild_id: int):
+        """
+        Queue the snapshot of a player to be deleted, this doesn't wait for the write.
+
+        :param guild_id: The guild id of the player.
+        """
+        self._submit(self._connection.execute, 'DELETE FROM players WHERE guild_id = ?', (guild_id,))
+
+    def close(self):
+        """
+        Write the queued changes and close the database.
+        """
+        self._executor.submit(self._connection.close)
+        self._executor.shutdown(wait=True)
+
+    def _open(self):
+        self._connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS sessions (node TEXT PRIMARY KEY, session_id TEXT NOT NULL)'
+        )
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS players (guild_id INTEGER PRIMARY KEY, data TEXT NOT NULL, updated REAL NOT NULL)'
+        )
+
+    def _write_players(self, snapshots: List[Tuple[int, Dict[str, Any]]], deleted: List[int]):
+        now = time()
+        rows = [(guild_id, json.dumps(snapshot, separators=(',', ':')), now) for guild_id, snapshot in snapshots]
+
+        if not rows and not deleted:
+            return
+
+        with self._connection:
+            self._connection.execute('BEGIN')
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO players (guild_id, data, updated) VALUES (?, ?, ?)', rows
+            )
+            self._connection.executemany(
+                'DELETE FROM players WHERE guild_id = ?', [(guild_id,) for guild_id in deleted]
+            )
+
+    def _run(self, function: Callable, *args) -> Any:
+        """
+        Run a function on the store thread and wait for it, after the queued writes.
+        """
+        return self._executor.submit(function, *args).result()
+
+    def _submit(self, function: Callable, *args):
+        self._executor.submit(function, *args).add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(future: Future):
+        if future.exception() is not None:
+            getLogger('lava.store').error("State store write failed", exc_info=future.exception())
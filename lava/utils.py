@@ -1,7 +1,8 @@
 import subprocess
 from bisect import bisect_left
+from copy import copy
 from io import BytesIO
-from typing import Iterable, Optional, TYPE_CHECKING, Tuple
+from typing import Iterable, Optional, Tuple
 
 import aiohttp
 import imageio
@@ -9,15 +10,12 @@ import imageio
 from discord import ApplicationContext, Interaction
 from discord.utils import get
 
-from lavalink import AudioTrack
+from lavalink import AudioTrack, LoadResult
 from pylrc.classes import LyricLine
 
 from lava.classes.voice_client import LavalinkVoiceClient
 from lava.errors import UserNotInVoice, BotNotInVoice, MissingVoicePermissions, UserInDifferentChannel
 
-if TYPE_CHECKING:
-    from lava.classes.player import LavaPlayer
-
 
 def check_remote_diff():
     local_commit = subprocess.check_output(['git', 'rev-parse', 'HEAD']).strip().decode('utf-8')
@@ -83,6 +81,32 @@ def split_list(input_list, chunk_size) -> Iterable[list[AudioTrack]]:
         yield input_list[num_sublists * chunk_size:]
 
 
+def clone_track(track: AudioTrack) -> AudioTrack:
+    """
+    Copy a track so it can be queued without sharing state (requester, loaded track) with other copies.
+
+    :param track: The track to copy.
+    :return: The copied track.
+    """
+    cloned = copy(track)
+    cloned.extra = dict(track.extra)
+
+    return cloned
+
+
+def clone_result(result: LoadResult) -> LoadResult:
+    """
+    Copy a load result and all of its tracks, see clone_track().
+
+    :param result: The load result to copy.
+    :return: The copied load result.
+    """
+    return LoadResult(
+        result.load_type, [clone_track(track) for track in result.tracks], result.playlist_info,
+        result.plugin_info, result.error
+    )
+
+
 async def ensure_voice(bot, should_connect: bool, interaction: Interaction = None,
                        ctx: ApplicationContext = None) -> LavalinkVoiceClient:
     """
@@ -101,9 +125,7 @@ async def ensure_voice(bot, should_connect: bool, interaction: Interaction = Non
             if not should_connect:
                 raise BotNotInVoice('Bot is not in a voice channel.')
 
-            permissions = interaction.user.voice.channel.permissions_for(
-                interaction.user.guild.get_member(interaction.user.id)
-            )
+            permissions = interaction.user.voice.channel.permissions_for(interaction.user)
 
             if not permissions.connect or not permissions.speak:  # Check user limit too?
                 raise MissingVoicePermissions('Connect and Speak permissions is required in order to play music')
@@ -125,9 +147,7 @@ async def ensure_voice(bot, should_connect: bool, interaction: Interaction = Non
             if not should_connect:
                 raise BotNotInVoice('Bot is not in a voice channel.')
 
-            permissions = ctx.user.voice.channel.permissions_for(
-                ctx.user.guild.get_member(ctx.user.id)
-            )
+            permissions = ctx.user.voice.channel.permissions_for(ctx.user)
 
             if not permissions.connect or not permissions.speak:  # Check user limit too?
                 raise MissingVoicePermissions('Connect and Speak permissions is required in order to play music')
@@ -141,46 +161,6 @@ async def ensure_voice(bot, should_connect: bool, interaction: Interaction = Non
             )
 
 
-async def get_recommended_tracks(player: "LavaPlayer", track: AudioTrack, max_results: int) -> list[AudioTrack]:
-    """
-    Get recommended track from the given track.
-
-    :param player: The player instance.
-    :param track: The seed tracks to get recommended tracks from.
-    :param max_results: The max amount of tracks to get.
-    """
-    track = await player.bot.lavalink.decode_track(track.track)  # Gets the original track. Usually from YouTube.
-
-    if track.source_name != "youtube":
-        return []
-
-    results_from_yt = await player.node.get_tracks(
-        f"https://music.youtube.com/watch?v={track.identifier}8&list=RD{track.identifier}"
-    )
-
-    results: list[AudioTrack] = []
-
-    skip_first = True
-
-    for result_track in results_from_yt.tracks:
-        if skip_first:
-            skip_first = False
-            continue
-
-        if result_track.identifier in [t.identifier for t in results]:  # Don't add duplicate songs
-            continue
-
-        if len(results) >= max_results:
-            break
-
-        if result_track.identifier in [t.identifier for t in player.queue]:
-            continue
-
-        results.append(result_track)
-
-    return results
-
-
 async def get_image_size(url: str) -> Optional[Tuple[int, int]]:
     """
     Get the size of the image from the given URL.
@@ -0,0 +1,154 @@
+import asyncio
+import sys
+import threading
+import traceback
+from logging import getLogger
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+
+from lava.metrics import REGISTRY, LOOP_LAG, HistogramChild
+
+HEARTBEAT_INTERVAL = 0.1  # How often the event loop beats, in seconds
+STALL_THRESHOLD = 0.25  # How late a beat must be for the loop to count as stalled, in seconds
+
+# Where blocking code comes from, checked against the file of every frame of the stalled stack, innermost first
+SUBSYSTEMS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ('lyrics', ('syncedlyrics', 'pylrc')),
+    ('sources', ('yt_dlp', 'spotipy', 'lava/source.py', 'lava/matcher.py')),
+    ('playlists', ('lava/playlist.py',)),
+    ('display', ('imageio', 'PIL', 'lava/utils.py', 'lava/embeds.py', 'lava/classes/player.py')),
+    ('storage', ('sqlite3', 'lava/store.py', 'lava/cache.py')),
+)
+
+LOOP_STALLS = REGISTRY.histogram(
+    'lava_event_loop_stall_seconds', 'How long the event loop was blocked, by the subsystem blocking it',
+    ['subsystem'], buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+
+def attribute(stack: traceback.StackSummary) -> str:
+    """
+    Find the subsystem a stack is blocked in.
+
+    :param stack: The stack of the event loop thread, outermost frame first.
+    :return: The subsystem, "other" if no frame belongs to a known one.
+    """
+    for frame in reversed(stack):
+        filename = frame.filename.replace('\\', '/')
+
+        for subsystem, markers in SUBSYSTEMS:
+            if any(marker in filename for marker in markers):
+                return subsystem
+
+    return 'other'
+
+
+class LoopWatchdog:
+    """
+    Watches the event loop from a thread and reports the callbacks blocking it.
+
+    The loop beats every interval, and how late each beat is goes to the loop lag histogram.
+    When no beat came for longer than the threshold, the thread captures the stack of the loop thread
+    while it's still blocked, attributes it to a subsystem, and logs it. The stall duration is recorded
+    in the stall histogram of that subsystem once the loop beats again.
+
+    Parameters:
+    ----------
+    loop: asyncio.AbstractEventLoop
+        The loop to watch.
+    threshold: float
+        How late a beat must be for the loop to count as stalled, in seconds.
+    interval: float
+        How often the loop beats, in seconds.
+    """
+
+    def __init__(self,
+                 loop: asyncio.AbstractEventLoop,
+                 threshold: float = STALL_THRESHOLD,
+                 interval: float = HEARTBEAT_INTERVAL):
+        self.loop = loop
+        self.threshold = threshold
+        self.interval = interval
+
+        self.stalls: Dict[str, int] = {}
+
+        self._stall_children: Dict[str, HistogramChild] = {
+            subsystem: LOOP_STALLS.labels(subsystem) for subsystem, _ in (*SUBSYSTEMS, ('other', ()))
+        }
+
+        self._last_beat: float = monotonic()
+        self._stall: Optional[Tuple[float, str]] = None  # When the stalled beat was due, the blamed subsystem
+
+        self._loop_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._beat_handle: Optional[asyncio.TimerHandle] = None
+
+        self.logger = getLogger('lava.watchdog')
+
+    def start(self):
+        """
+        Start watching, must be called from the loop thread. Does nothing if it's already watching.
+        """
+        if self._thread is not None:
+            return
+
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = monotonic()
+        self._beat_handle = self.loop.call_later(self.interval, self._beat)
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch, name='lava-loop-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+
+        if self._beat_handle is not None:
+            self._beat_handle.cancel()
+
+    def _beat(self):
+        now = monotonic()
+
+        LOOP_LAG.observe(max(0.0, now - self._last_beat - self.interval))
+
+        stall = self._stall
+
+        if stall is not None:
+            self._stall = None
+            self._stall_children[stall[1]].observe(now - stall[0])
+
+        self._last_beat = now
+        self._beat_handle = self.loop.call_later(self.interval, self._beat)
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            due = self._last_beat + self.interval
+            late = monotonic() - due
+
+            if late < self.threshold or self._stall is not None and self._stall[0] == due:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)  # skipcq: PYL-W0212
+
+            if frame is None:
+                continue
+
+            stack = traceback.extract_stack(frame)
+            subsystem = attribute(stack)
+
+            self._stall = (due, subsystem)
+            self.stalls[subsystem] = self.stalls.get(subsystem, 0) + 1
+
+            self.logger.warning(
+                "Event loop blocked for %.2fs by %s:\n%s", late, subsystem, ''.join(self._format(stack))
+            )
+
+    @staticmethod
+    def _format(stack: traceback.StackSummary, limit: int = 15) -> List[str]:
+        return stack.format()[-limit:]
@@ -2,35 +2,68 @@ import asyncio
 import logging
 import json
 import os
+from typing import Optional, List
 
-from discord import Intents
 from colorlog import ColoredFormatter
 from dotenv import load_dotenv
 
-from lava.bot import Bot
+from lava.bot import Bot, ShardedBot
+from lava.launcher import Supervisor, recommended_shard_count
+from lava.log import start_logging
 from os import getenv
 
 def main():
     load_dotenv()
 
+    workers = int(getenv("WORKERS", 1))
+
+    if workers <= 1:
+        run_bot()
+        return
+
     setup_logging()
 
+    shard_count = int(getenv("SHARD_COUNT", 0)) or recommended_shard_count(getenv("TOKEN"))
+
+    Supervisor(run_worker, shard_count=shard_count, workers=workers).run()
+
+def run_bot(worker: Optional[int] = None, shard_ids: Optional[List[int]] = None, shard_count: Optional[int] = None):
+    """
+    Run the bot, for all shards or as one of the launcher's workers
+    :param worker: The id of the worker
+    :param shard_ids: The shards the worker connects
+    :param shard_count: The total amount of shards
+    :return: None
+    """
+    setup_logging(worker)
+
     main_logger = logging.getLogger("discord")
 
     loop = asyncio.new_event_loop()
 
-    bot = Bot(
-        logger=main_logger,
-        command_prefix=getenv("PREFIX", "l!"), intents=Intents.all(), loop=loop,
-    )
+    options = dict(command_prefix=getenv("PREFIX", "l!"), loop=loop)
+
+    if shard_ids is None:
+        bot = Bot(logger=main_logger, **options)
+    else:
+        bot = ShardedBot(logger=main_logger, worker=worker, shard_ids=shard_ids, shard_count=shard_count, **options)
 
     load_extensions(bot=bot)
 
     bot.run(getenv("TOKEN"))
 
-def setup_logging():
+def run_worker(worker: int, shard_ids: List[int], shard_count: int):
+    """
+    The entry of the launcher's worker processes
+    """
+    load_dotenv()
+
+    run_bot(worker, shard_ids, shard_count)
+
+def setup_logging(worker: Optional[int] = None):
     """
     Set up the loggings for the bot
+    :param worker: The id of the worker, every worker logs to its own file
     :return: None
     """
     formatter = ColoredFormatter(
@@ -45,17 +78,9 @@ def setup_logging():
         }
     )
 
-    stream_handler = logging.StreamHandler()
-    stream_handler.setLevel(logging.INFO)
-    stream_handler.setFormatter(formatter)
+    filename = "discord.log" if worker is None else f"discord-{worker}.log"
 
-    file_handler = logging.FileHandler(filename="discord.log", encoding="utf-8", mode="w")
-    file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(formatter)
-
-    logging.basicConfig(
-        handlers=[stream_handler, file_handler], level=logging.INFO
-    )
+    start_logging(formatter, filename)
 
 
 def load_extensions(bot: Bot) -> Bot:
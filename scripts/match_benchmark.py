@@ -0,0 +1,139 @@
+"""
+Accuracy and latency of matching Spotify tracks to YouTube results, on the offline corpus
+in tests/fixtures/spotify_matches.json. SpotifyAudioTrack.load() runs against a client that
+answers the match queries from the corpus, so no Lavalink node is needed.
+
+Usage: python -m scripts.match_benchmark [--rounds N] [--corpus PATH]
+"""
+import argparse
+import asyncio
+import json
+from pathlib import Path
+from statistics import mean, quantiles
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from lavalink import AudioTrack, LoadResult, LoadType, PlaylistInfo
+
+from lava.errors import LoadError
+from lava.source import SpotifyAudioTrack
+
+CORPUS = Path(__file__).resolve().parent.parent / 'tests' / 'fixtures' / 'spotify_matches.json'
+
+
+class CorpusClient:
+    """
+    Answers get_tracks() with the search results of a corpus case, and counts the loads.
+
+    Parameters:
+    ----------
+    results: Dict[str, List[list]]
+        The candidates of each query, as [identifier, title, author, length ms, is stream].
+    """
+
+    def __init__(self, results: Dict[str, List[list]]):
+        self.results = results
+        self.shared = None
+        self.loads: int = 0
+
+    async def get_tracks(self, query: str, *_, **__) -> LoadResult:
+        self.loads += 1
+
+        candidates = [
+            AudioTrack({
+                'encoded': identifier,
+                'info': {
+                    'identifier': identifier, 'title': title, 'author': author, 'length': length,
+                    'isStream': stream, 'isSeekable': not stream, 'uri': f'https://youtube.com/watch?v={identifier}'
+                }
+            }, 0)
+            for identifier, title, author, length, stream in self.results.get(query, [])
+        ]
+
+        if not candidates:
+            return LoadResult(LoadType.EMPTY, [], PlaylistInfo.none())
+
+        return LoadResult(LoadType.SEARCH, candidates, PlaylistInfo.none())
+
+
+def load_corpus(path: Path = CORPUS) -> List[Dict[str, Any]]:
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)['cases']
+
+
+async def run_case(case: Dict[str, Any]) -> Tuple[Optional[str], int, float]:
+    """
+    Match the Spotify track of a case.
+
+    :param case: The corpus case.
+    :return: The matched identifier (None if nothing matched), the amount of loads and the time it took in seconds.
+    """
+    spotify = case['spotify']
+    track = SpotifyAudioTrack({
+        'identifier': spotify['title'], 'title': spotify['title'], 'author': spotify['author'],
+        'length': spotify['length'], 'isStream': False, 'isSeekable': True, 'uri': None
+    }, 0)
+
+    client = CorpusClient(case['results'])
+
+    started = perf_counter()
+
+    try:
+        matched = await track.load(client)
+    except LoadError:
+        matched = None
+
+    return matched, client.loads, perf_counter() - started
+
+
+async def benchmark(cases: List[Dict[str, Any]], rounds: int) -> Dict[str, Any]:
+    """
+    :param cases: The corpus cases.
+    :param rounds: How many times every case is matched for the latency figures.
+    :return: The accuracy, the mismatched cases, the loads per track and the match latency.
+    """
+    misses = []
+    loads = []
+    timings = []
+
+    for case in cases:
+        for _ in range(rounds):
+            matched, case_loads, elapsed = await run_case(case)
+            timings.append(elapsed)
+
+        loads.append(case_loads)
+
+        if matched != case['expected']:
+            misses.append((case['name'], case['expected'], matched))
+
+    return {
+        'accuracy': 1 - len(misses) / len(cases),
+        'misses': misses,
+        'loads': mean(loads),
+        'latency_mean': mean(timings),
+        'latency_p95': quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=50, help='How many times every case is matched')
+    parser.add_argument('--corpus', type=Path, default=CORPUS, help='The corpus file')
+
+    args = parser.parse_args()
+
+    cases = load_corpus(args.corpus)
+    report = asyncio.run(benchmark(cases, args.rounds))
+
+    print(f"cases:          {len(cases)}")
+    print(f"accuracy:       {report['accuracy']:.1%}")
+    print(f"loads / track:  {report['loads']:.2f}")
+    print(f"latency mean:   {report['latency_mean'] * 1000:.3f} ms")
+    print(f"latency p95:    {report['latency_p95'] * 1000:.3f} ms")
+
+    for name, expected, matched in report['misses']:
+        print(f"miss: {name}: expected {expected}, got {matched}")
+
+
+if __name__ == '__main__':
+    main()
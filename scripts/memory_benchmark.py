@@ -0,0 +1,207 @@
+"""
+Memory and parsing time of the gateway intent profiles and member cache policies, on a synthetic guild load.
+The guild payloads and events only contain what Discord sends with the intents of the profile, and are parsed
+by the connection state of py-cord, so no Discord connection is needed.
+
+Usage: python -m scripts.memory_benchmark [--guilds N] [--members N] [--voice N] [--messages N] [--presences N]
+"""
+import argparse
+import asyncio
+import gc
+import os
+import tracemalloc
+from time import perf_counter
+from typing import Any, Dict, List, Tuple
+
+from discord import Intents, MemberCacheFlags
+from discord.state import ConnectionState
+
+from lava.intents import intents_from_env, member_cache_from_env
+
+# (intents profile, member cache policy) pairs, as set with INTENTS_PROFILE and MEMBER_CACHE
+PROFILES = [('all', 'all'), ('all', 'voice'), ('minimal', 'all'), ('minimal', 'voice')]
+
+BOT_ID = 1
+TEXT_CHANNELS = 10  # Text channels of each guild, the messages are spread over them
+VOICE_CHANNELS = 5
+
+
+def user(user_id: int) -> Dict[str, Any]:
+    return {
+        'id': str(user_id), 'username': f'user{user_id}', 'discriminator': '0', 'global_name': f'User {user_id}',
+        'avatar': 'a' * 32, 'bot': False
+    }
+
+
+def member(user_id: int) -> Dict[str, Any]:
+    return {
+        'user': user(user_id), 'nick': None, 'roles': [], 'joined_at': '2024-01-01T00:00:00+00:00',
+        'deaf': False, 'mute': False, 'flags': 0
+    }
+
+
+def presence(guild_id: int, user_id: int) -> Dict[str, Any]:
+    return {
+        'user': {'id': str(user_id)}, 'guild_id': str(guild_id), 'status': 'online',
+        'client_status': {'desktop': 'online'},
+        'activities': [{'name': 'Lava', 'type': 0, 'created_at': 0}]
+    }
+
+
+def guild_create(guild_id: int, intents: Intents, members: int) -> Dict[str, Any]:
+    """
+    Build the GUILD_CREATE payload Discord sends for a guild with the given intents, before anyone joins voice.
+
+    :param guild_id: The id of the guild, the ids of its channels and members are derived from it.
+    :param intents: The gateway intents, presences and the members other than the bot need an intent.
+    :param members: The number of members in the guild.
+    :return: The payload.
+    """
+    first = guild_id * 1_000_000
+    user_ids = range(first, first + members)
+
+    return {
+        'id': str(guild_id), 'name': f'Guild {guild_id}', 'owner_id': str(first), 'member_count': members,
+        'large': members > 250, 'unavailable': False, 'roles': [{
+            'id': str(guild_id), 'name': '@everyone', 'permissions': '0', 'position': 0, 'color': 0,
+            'colors': {'primary_color': 0}, 'hoist': False, 'managed': False, 'mentionable': False
+        }],
+        'emojis': [], 'stickers': [], 'features': [], 'threads': [], 'stage_instances': [],
+        'guild_scheduled_events': [],
+        'channels': [
+            {'id': str(guild_id * 1000 + index), 'type': 0, 'name': f'text-{index}', 'position': index,
+             'permission_overwrites': []}
+            for index in range(TEXT_CHANNELS)
+        ] + [
+            {'id': str(guild_id * 1000 + 100 + index), 'type': 2, 'name': f'voice-{index}', 'position': index,
+             'bitrate': 64000, 'user_limit': 0, 'permission_overwrites': []}
+            for index in range(VOICE_CHANNELS)
+        ],
+        'members': [member(BOT_ID)] + ([member(user_id) for user_id in user_ids] if intents.members else []),
+        'voice_states': [],
+        'presences': [presence(guild_id, user_id) for user_id in user_ids[:members // 2]] if intents.presences else []
+    }
+
+
+def events(guild_id: int, intents: Intents, args: argparse.Namespace) -> List[Tuple[str, dict]]:
+    """
+    Build the events Discord sends to a guild after it is created, for the given intents.
+
+    :return: The (event name, payload) pairs.
+    """
+    first = guild_id * 1_000_000
+    members, messages, presences = args.members, args.messages, args.presences
+    sent = []
+
+    if intents.voice_states:
+        sent += [
+            ('VOICE_STATE_UPDATE', {
+                'guild_id': str(guild_id), 'channel_id': str(guild_id * 1000 + 100 + index % VOICE_CHANNELS),
+                'user_id': str(first + index), 'member': member(first + index), 'session_id': 'a' * 32,
+                'deaf': False, 'mute': False, 'self_deaf': False, 'self_mute': False, 'self_video': False,
+                'suppress': False
+            })
+            for index in range(args.voice)
+        ]
+
+    if intents.guild_messages:
+        sent += [
+            ('MESSAGE_CREATE', {
+                'id': str(first + index), 'channel_id': str(guild_id * 1000 + index % TEXT_CHANNELS),
+                'guild_id': str(guild_id), 'author': user(first + index % members),
+                'member': {key: value for key, value in member(first + index % members).items() if key != 'user'},
+                'content': 'Lorem ipsum dolor sit amet ' * 4, 'timestamp': '2024-01-01T00:00:00+00:00',
+                'edited_timestamp': None, 'tts': False, 'mention_everyone': False, 'mentions': [],
+                'mention_roles': [], 'attachments': [], 'embeds': [], 'pinned': False, 'type': 0
+            })
+            for index in range(messages)
+        ]
+
+    if intents.presences:
+        sent += [('PRESENCE_UPDATE', presence(guild_id, first + index % members)) for index in range(presences)]
+
+    if intents.guild_typing:
+        sent += [
+            ('TYPING_START', {
+                'channel_id': str(guild_id * 1000), 'guild_id': str(guild_id), 'user_id': str(first + index % members),
+                'timestamp': 0, 'member': member(first + index % members)
+            })
+            for index in range(messages)
+        ]
+
+    return sent
+
+
+def run(profile: str, policy: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Parse the synthetic load with a profile and a member cache policy, the same way Bot picks them.
+
+    :return: The results.
+    """
+    os.environ['INTENTS_PROFILE'], os.environ['MEMBER_CACHE'] = profile, policy
+
+    intents = intents_from_env()
+    flags: MemberCacheFlags = member_cache_from_env(intents)
+
+    loop = asyncio.new_event_loop()
+    state = ConnectionState(
+        dispatch=lambda *_: None, handlers={}, hooks={}, http=None, loop=loop,
+        intents=intents, member_cache_flags=flags, chunk_guilds_at_startup=False
+    )
+    state.user = state.create_user(user(BOT_ID))
+
+    payloads = [
+        (guild_create(guild_id, intents, args.members), events(guild_id, intents, args))
+        for guild_id in range(1, args.guilds + 1)
+    ]
+
+    gc.collect()
+    tracemalloc.start()
+    start = perf_counter()
+
+    for guild, sent in payloads:
+        state.parse_guild_create(guild)
+
+        for name, data in sent:
+            state.parsers[name](data)
+
+    elapsed = perf_counter() - start
+
+    gc.collect()
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        'profile': f'{profile}/{policy}', 'events': sum(len(sent) + 1 for _, sent in payloads),
+        'members': sum(len(guild.members) for guild in state.guilds), 'users': len(state._users),  # skipcq: PYL-W0212
+        'messages': len(state._messages or ()), 'memory': memory / 2 ** 20, 'time': elapsed * 1000  # skipcq: PYL-W0212
+    }
+
+    loop.close()
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--guilds', type=int, default=50, help="Number of guilds")
+    parser.add_argument('--members', type=int, default=2000, help="Members of each guild")
+    parser.add_argument('--voice', type=int, default=20, help="Members in voice channels of each guild")
+    parser.add_argument('--messages', type=int, default=200, help="Messages and typing events sent in each guild")
+    parser.add_argument('--presences', type=int, default=500, help="Presence updates sent in each guild")
+    args = parser.parse_args()
+
+    print(f"{args.guilds} guilds of {args.members} members, {args.voice} in voice")
+    print(f"{'profile':<16}{'events':>9}{'members':>10}{'users':>9}{'messages':>10}{'memory':>12}{'time':>11}")
+
+    for profile, policy in PROFILES:
+        result = run(profile, policy, args)
+
+        print(
+            f"{result['profile']:<16}{result['events']:>9}{result['members']:>10}{result['users']:>9}"
+            f"{result['messages']:>10}{result['memory']:>9.1f} MB{result['time']:>8.0f} ms"
+        )
+
+
+if __name__ == '__main__':
+    main()
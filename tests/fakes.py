@@ -0,0 +1,137 @@
+"""
+Stand-ins for the Lavalink nodes and the bot, for exercising the player manager without a Lavalink server.
+"""
+import asyncio
+from logging import getLogger
+from types import SimpleNamespace
+from typing import List, Optional
+
+from lavalink import AudioTrack, RequestError
+
+from lava.classes.player_manager import LavaPlayerManager
+from lava.store import StateStore
+
+
+def request_error(status: int = 500) -> RequestError:
+    """
+    Build the RequestError a node raises when it replies with an HTTP error.
+    The constructor differs between Lavalink.py versions, so the attributes are set directly.
+    """
+    error = RequestError.__new__(RequestError)
+    error.status = status
+    error.message = 'Internal Server Error'
+
+    return error
+
+
+def make_track(identifier: str) -> AudioTrack:
+    return AudioTrack({
+        'encoded': f'encoded-{identifier}',
+        'info': {
+            'identifier': identifier, 'isSeekable': True, 'author': 'Author', 'length': 180000,
+            'isStream': False, 'title': identifier, 'uri': f'https://example.com/{identifier}'
+        }
+    }, 0)
+
+
+class FakeTransport:
+    def __init__(self):
+        self.ws_connected: bool = True
+
+
+class FakeNode:
+    """
+    A node that records the player updates it receives, failing them with the given error when set.
+
+    Parameters:
+    ----------
+    name: str
+        The name of the node.
+    fail_update: Optional[Exception]
+        Raised by update_player().
+    fail_destroy: Optional[Exception]
+        Raised by destroy_player().
+    latency: float
+        How long every request takes, in seconds.
+    """
+
+    def __init__(self, name: str, manager, fail_update: Optional[Exception] = None,
+                 fail_destroy: Optional[Exception] = None, latency: float = 0):
+        self.name = name
+        self.region = None
+        self.manager = manager
+        self.fail_update = fail_update
+        self.fail_destroy = fail_destroy
+        self.latency = latency
+
+        self._transport = FakeTransport()
+
+        self.updates: List[dict] = []
+        self.destroyed: List[str] = []
+
+    @property
+    def players(self):
+        return [player for player in self.manager.client.player_manager.players.values() if player.node is self]
+
+    async def update_player(self, guild_id: str, **kwargs):
+        await asyncio.sleep(self.latency)
+
+        if self.fail_update is not None:
+            raise self.fail_update
+
+        self.updates.append({'guild_id': guild_id, **kwargs})
+
+    async def destroy_player(self, guild_id: str):
+        if self.fail_destroy is not None:
+            raise self.fail_destroy
+
+        self.destroyed.append(guild_id)
+
+
+class FakeSelector:
+    """Always picks the same node, and moves the given players when rebalancing"""
+
+    def __init__(self, target: Optional[FakeNode], moves: Optional[dict] = None):
+        self.target = target
+        self.moves = moves or {}
+
+    def select(self, *_, **__) -> Optional[FakeNode]:
+        return self.target
+
+    def rebalance_targets(self, *_, **__) -> dict:
+        return self.moves
+
+
+class FakeClient:
+    def __init__(self):
+        self.node_manager = SimpleNamespace(_connect_back=False, _player_queue=[])
+        self.player_manager: Optional[LavaPlayerManager] = None
+        self.events: List[object] = []
+
+    async def _dispatch_event(self, event):
+        self.events.append(event)
+
+
+class FakeBot:
+    def __init__(self):
+        self.logger = getLogger('tests')
+        self.state = StateStore(':memory:')
+        self.loop = asyncio.get_event_loop()
+
+    @staticmethod
+    def owns_guild(_: int) -> bool:
+        return True
+
+    @staticmethod
+    def get_guild(_: int):
+        return None
+
+
+def make_manager() -> LavaPlayerManager:
+    """
+    :return: A player manager on a fake client and bot, add nodes with FakeNode(name, manager).
+    """
+    client = FakeClient()
+    manager = client.player_manager = LavaPlayerManager(bot=FakeBot(), client=client)
+
+    return manager
@@ -0,0 +1,18 @@
+import unittest
+
+from lava.autoplay import RecommendationPool
+
+
+class RecommendationPoolTest(unittest.TestCase):
+    def test_seeds_are_bounded(self):
+        pool = RecommendationPool(seed_memory_size=3)
+
+        for identifier in 'abcde':
+            pool.seeds.append(identifier)
+
+        self.assertEqual(list(pool.seeds), ['c', 'd', 'e'])
+        self.assertNotIn('a', pool.seeds)  # Forgotten seeds may fetch a radio mix again
+
+
+if __name__ == '__main__':
+    unittest.main()
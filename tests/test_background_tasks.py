@@ -0,0 +1,44 @@
+import unittest
+
+from tests.fakes import FakeNode, FakeSelector, make_manager
+
+
+class BackgroundTasksTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.manager = make_manager()
+
+    async def test_starting_twice_keeps_one_task(self):
+        self.manager.start_reaper()
+        reaper = self.manager._reaper
+
+        self.manager.start_reaper()
+
+        self.assertIs(self.manager._reaper, reaper)
+
+        await self.manager.close()
+
+    async def test_close_cancels_every_task(self):
+        self.manager.start_reaper()
+        self.manager.start_rebalancer()
+        self.manager.start_snapshotter()
+
+        await self.manager.close()
+
+        for task in (self.manager._reaper, self.manager._rebalancer, self.manager._snapshotter):
+            self.assertTrue(task.cancelled())
+
+    async def test_no_failover_once_closed(self):
+        node = FakeNode('closing', self.manager)
+        target = FakeNode('target', self.manager)
+        self.manager.node_selector = FakeSelector(target)
+
+        player = self.manager.new(1, node=node)
+
+        await self.manager.close()
+        await self.manager.failover(node)
+
+        self.assertIs(player.node, node)
+
+
+if __name__ == '__main__':
+    unittest.main()
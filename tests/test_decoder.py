@@ -0,0 +1,64 @@
+import json
+import unittest
+from pathlib import Path
+
+import lavalink.utils
+
+from lava.decoder import decode_track, decode_track_info, TrackDecodeError
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures' / 'encoded_tracks.json'
+FIELDS = ('title', 'author', 'length', 'identifier', 'isStream', 'uri', 'artworkUrl', 'isrc', 'sourceName', 'position')
+
+
+class DecoderFixturesTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(FIXTURES, encoding='utf-8') as file:
+            cls.fixtures = json.load(file)['tracks']
+
+    def test_fixtures_decode_to_their_fields(self):
+        for fixture in self.fixtures:
+            with self.subTest(fixture['name']):
+                items, position = decode_track_info(fixture['encoded'])
+                info = {**dict(items), 'position': position}
+
+                self.assertEqual({field: info.get(field) for field in FIELDS}, fixture['expected'])
+
+    def test_decoded_track_is_an_audio_track(self):
+        fixture = self.fixtures[0]
+        track = decode_track(fixture['encoded'])
+
+        self.assertEqual(track.track, fixture['encoded'])
+        self.assertEqual(track.title, fixture['expected']['title'])
+        self.assertEqual(track.is_seekable, not fixture['expected']['isStream'])
+
+    def test_truncated_track_is_rejected(self):
+        with self.assertRaises(TrackDecodeError):
+            decode_track_info(self.fixtures[0]['encoded'][:40])
+
+    def test_invalid_base64_is_rejected(self):
+        with self.assertRaises(TrackDecodeError):
+            decode_track_info('not base64!')
+
+
+class ModifiedUtf8Test(unittest.TestCase):
+    """Lavalink.py can't read the surrogate pairs java writes for characters outside the BMP"""
+
+    @classmethod
+    def setUpClass(cls):
+        with open(FIXTURES, encoding='utf-8') as file:
+            cls.fixture = next(track for track in json.load(file)['tracks'] if 'emoji' in track['name'])
+
+    def test_library_rejects_surrogate_pairs(self):
+        with self.assertRaises(UnicodeDecodeError):
+            lavalink.utils.decode_track(self.fixture['encoded'])
+
+    def test_surrogate_pairs_are_decoded(self):
+        track = decode_track(self.fixture['encoded'])
+
+        self.assertEqual(track.title, self.fixture['expected']['title'])
+        self.assertEqual(track.position, self.fixture['expected']['position'])
+
+
+if __name__ == '__main__':
+    unittest.main()
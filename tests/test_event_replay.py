@@ -0,0 +1,108 @@
+"""
+Replays recorded Lavalink event sequences through the event pipeline and the handlers of the Events cog,
+and counts the Discord calls they make. The sequences are in tests/fixtures/event_sequences.json.
+"""
+import asyncio
+import json
+import unittest
+from logging import getLogger
+from pathlib import Path
+from types import SimpleNamespace
+
+from lavalink import TrackStartEvent, TrackEndEvent, QueueEndEvent, PlayerUpdateEvent, TrackLoadFailedEvent
+from lavalink.server import EndReason
+
+from cogs.events import Events
+from lava.pipeline import EventPipeline
+from tests.fakes import make_track
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures' / 'event_sequences.json'
+
+
+class ReplayPlayer:
+    """The parts of LavaPlayer the handlers use, counting the calls that reach Discord"""
+
+    def __init__(self):
+        self.guild_id = 1
+        self.plays = 1
+        self.history = []
+        self.calls = {'edits': 0, 'sends': 0, 'disconnects': 0}
+
+        self.message = SimpleNamespace(channel=SimpleNamespace(send=self._send))
+        self.guild = SimpleNamespace(voice_client=SimpleNamespace(disconnect=self._disconnect))
+
+    async def _send(self, *_, **__):
+        self.calls['sends'] += 1
+        return self.message
+
+    async def _disconnect(self, *_, **__):
+        self.calls['disconnects'] += 1
+
+    async def update_display(self, *_, **__):
+        self.calls['edits'] += 1
+
+    async def fetch_lyrics(self):
+        pass
+
+    async def skip(self):
+        self.plays += 1
+
+    def reset_lyrics(self):
+        pass
+
+    def request_autoplay(self):
+        pass
+
+
+class EventReplayTest(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(FIXTURES, encoding='utf-8') as file:
+            cls.sequences = json.load(file)['sequences']
+
+    async def replay(self, steps) -> dict:
+        logger = getLogger('tests')
+        client = SimpleNamespace(bot=SimpleNamespace(logger=logger), add_event_hook=lambda *_, **__: None)
+        pipeline = EventPipeline(client)
+
+        await Events(SimpleNamespace(logger=logger, lavalink=SimpleNamespace(events=pipeline))).on_ready()
+
+        player = ReplayPlayer()
+
+        for kind, *args in steps:
+            if kind == 'updates':
+                for _ in range(args[0]):
+                    await pipeline.submit(PlayerUpdateEvent(player, {'position': 0, 'time': 0, 'connected': True}))
+
+            elif kind == 'start':
+                await pipeline.submit(TrackStartEvent(player, make_track(args[0])))
+
+            elif kind == 'end':
+                reason = EndReason.from_str(args[1])
+
+                await pipeline.submit(TrackEndEvent(player, make_track(args[0]), reason))
+
+                if reason.may_start_next():  # Handled by LavaPlayer._handle_event after the hooks
+                    player.plays += 1
+
+            elif kind == 'queue_end':
+                await pipeline.submit(QueueEndEvent(player))
+
+            elif kind == 'load_failed':
+                await pipeline.submit(TrackLoadFailedEvent(player, {'title': args[0]}, None))
+
+            while pipeline.depth or pipeline.stats()['workers']:  # Let the handlers run, as time passes between events
+                await asyncio.sleep(0)
+
+        await pipeline.close()
+
+        return player.calls
+
+    async def test_recorded_sequences(self):
+        for sequence in self.sequences:
+            with self.subTest(sequence['name']):
+                self.assertEqual(await self.replay(sequence['steps']), sequence['expected'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from types import SimpleNamespace
+
+from cogs.events import Events
+from tests.fakes import FakeNode, make_manager, make_track, request_error
+
+
+class EvictTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.manager = make_manager()
+
+    def new_playing(self, guild_id: int, node: FakeNode):
+        player = self.manager.new(guild_id, node=node)
+        player.channel_id = guild_id
+        player.current = make_track(str(guild_id))
+
+        return player
+
+    async def test_request_error_on_destroy_still_evicts(self):
+        node = FakeNode('node', self.manager, fail_destroy=request_error(404))
+        player = self.manager.new(1, node=node)
+
+        await self.manager.evict(player)
+
+        self.assertIsNone(self.manager.get(1))
+        self.assertEqual(self.manager.evicted, 1)
+
+    async def test_voice_state_update_after_eviction_is_ignored(self):
+        node = FakeNode('node', self.manager)
+        player = self.manager.new(1, node=node)
+
+        await self.manager.evict(player)
+
+        bot = SimpleNamespace(user=SimpleNamespace(id=42), lavalink=SimpleNamespace(player_manager=self.manager))
+        member = SimpleNamespace(id=42, guild=SimpleNamespace(id=1))
+
+        await Events(bot).on_voice_state_update(
+            member, SimpleNamespace(channel=object()), SimpleNamespace(channel=None)
+        )
+
+        self.assertEqual(node.destroyed, ['1'])
+
+    async def test_going_over_the_limit_keeps_the_new_player(self):
+        self.manager.max_players = 2
+        node = FakeNode('node', self.manager)
+
+        self.new_playing(1, node)
+        self.new_playing(2, node)
+
+        player = self.manager.new(3, node=node)
+
+        await self.manager._limiter
+
+        self.assertIs(self.manager.get(3), player)
+        self.assertEqual(self.manager.evicted, 0)
+
+    async def test_going_over_the_limit_evicts_the_longest_idle(self):
+        self.manager.max_players = 2
+        node = FakeNode('node', self.manager)
+
+        self.manager.new(1, node=node)
+        self.new_playing(2, node)
+        self.manager.new(3, node=node)
+
+        await self.manager._limiter
+
+        self.assertIsNone(self.manager.get(1))
+        self.assertIsNotNone(self.manager.get(3))
+
+    async def test_limiter_is_cancelled_on_close(self):
+        self.manager.max_players = 0
+        self.manager.new(1, node=FakeNode('node', self.manager))
+
+        await self.manager.close()
+
+        self.assertTrue(self.manager._limiter.done())
+
+
+if __name__ == '__main__':
+    unittest.main()
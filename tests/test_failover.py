@@ -0,0 +1,121 @@
+import unittest
+
+from lavalink import Timescale
+
+from tests.fakes import FakeNode, FakeSelector, make_manager, make_track, request_error
+
+
+class FailoverTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.manager = make_manager()
+
+        self.dead = FakeNode('dead', self.manager)
+        self.dead._transport.ws_connected = False
+
+        self.healthy = FakeNode('healthy', self.manager)
+        self.manager.node_selector = FakeSelector(self.healthy)
+
+    def add_player(self, guild_id: int, node: FakeNode):
+        player = self.manager.new(guild_id, node=node)
+        player.current = make_track(str(guild_id))
+
+        return player
+
+    async def test_moves_every_player(self):
+        players = [self.add_player(guild_id, self.dead) for guild_id in range(1, 6)]
+
+        await self.manager.failover(self.dead)
+
+        self.assertTrue(all(player.node is self.healthy for player in players))
+        self.assertEqual(self.manager.failed_over, 5)
+        self.assertEqual({update['guild_id'] for update in self.healthy.updates}, {'1', '2', '3', '4', '5'})
+        self.assertIsNotNone(self.manager.last_failover_duration)
+
+    async def test_state_reaches_the_healthy_node(self):
+        player = self.add_player(1, self.dead)
+        player.channel_id = 10
+        player._last_position = 42000
+        player.paused = True
+        player.volume = 35
+
+        timescale = Timescale()
+        timescale.update(speed=1.25)
+        player.filters['timescale'] = timescale
+
+        await self.manager.failover(self.dead)
+
+        track_update, filters_update = self.healthy.updates
+
+        self.assertEqual(track_update, {
+            'guild_id': '1', 'encoded_track': 'encoded-1', 'position': 42000, 'paused': True, 'volume': 35
+        })
+        self.assertEqual(filters_update, {'guild_id': '1', 'filters': [timescale]})
+        self.assertEqual(player.position, 42000)
+
+    async def test_completes_within_the_target_time(self):
+        self.healthy.latency = 0.05  # Every player makes two requests, 20 seconds when moved one by one
+        players = [self.add_player(guild_id, self.dead) for guild_id in range(1, 201)]
+
+        for player in players:
+            player.filters['timescale'] = Timescale()
+
+        await self.manager.failover(self.dead)
+
+        self.assertEqual(self.manager.failed_over, 200)
+        self.assertEqual(len(self.healthy.updates), 400)
+        self.assertLess(self.manager.last_failover_duration, self.manager.failover_target)
+
+    async def test_request_error_on_one_player_keeps_the_others_moving(self):
+        self.add_player(1, self.dead)
+        self.add_player(2, self.dead)
+
+        broken = self.add_player(3, self.dead)
+
+        async def fail(*_, **__):
+            raise request_error()
+
+        broken._dispatch_voice_update = fail
+        broken._voice_state = {'sessionId': 'session', 'token': 'token', 'endpoint': 'endpoint'}
+
+        await self.manager.failover(self.dead)
+
+        self.assertEqual(self.manager.failed_over, 2)
+        self.assertEqual({update['guild_id'] for update in self.healthy.updates}, {'1', '2'})
+        self.assertIsNotNone(self.manager.last_failover_duration)
+
+    async def test_unexpected_error_doesnt_abort_the_failover(self):
+        self.add_player(1, self.dead)
+
+        broken = self.add_player(2, self.dead)
+
+        async def explode(_):
+            raise RuntimeError('boom')
+
+        broken.change_node = explode
+
+        await self.manager.failover(self.dead)
+
+        self.assertEqual(self.manager.failed_over, 1)
+        self.assertIsNotNone(self.manager.last_failover_duration)
+
+    async def test_players_wait_when_no_node_is_available(self):
+        self.manager.node_selector = FakeSelector(None)
+        player = self.add_player(1, self.dead)
+
+        await self.manager.failover(self.dead)
+
+        self.assertIs(player.node, self.dead)
+        self.assertEqual(self.manager.client.node_manager._player_queue, [player])
+
+    async def test_change_node_survives_request_error_from_old_node(self):
+        reachable = FakeNode('reachable', self.manager, fail_destroy=request_error(404))
+        player = self.add_player(1, reachable)
+
+        await player.change_node(self.healthy)
+
+        self.assertIs(player.node, self.healthy)
+        self.assertEqual(self.healthy.updates[0]['encoded_track'], 'encoded-1')
+
+
+if __name__ == '__main__':
+    unittest.main()
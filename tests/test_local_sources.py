@@ -0,0 +1,64 @@
+"""
+Errors raised by the local sources must come back as an error load result, not propagate to the commands.
+"""
+import unittest
+
+from lavalink import LoadType, Source
+
+from lava.classes.lavalink_client import LavalinkClient
+from tests.fakes import FakeBot
+
+
+class BrokenSource(Source):
+    def __init__(self):
+        super().__init__('broken')
+        self.loads: int = 0
+
+    async def load_item(self, client, query):
+        self.loads += 1
+
+        raise RuntimeError('Spotify is down')
+
+
+class LocalSourceErrorTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        bot = FakeBot()
+        bot.worker = None
+
+        self.client = LavalinkClient(bot, user_id=1)
+        self.source = BrokenSource()
+        self.client.register_source(self.source)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_error_result(self):
+        result = await self.client.get_local_tracks('https://open.spotify.com/track/1')
+
+        self.assertEqual(result.load_type, LoadType.ERROR)
+        self.assertEqual(result.tracks, [])
+        self.assertEqual(result.error.message, 'Spotify is down')
+
+    async def test_failure_recorded(self):
+        await self.client.get_local_tracks('https://open.spotify.com/track/1')
+
+        self.assertEqual(
+            self.client.failures.get_reason('local', 'https://open.spotify.com/track/1'),
+            "RuntimeError('Spotify is down')"
+        )
+
+    async def test_not_retried_straight_away(self):
+        await self.client.get_local_tracks('https://open.spotify.com/track/1')
+        result = await self.client.get_local_tracks('https://open.spotify.com/track/1')
+
+        self.assertEqual(self.source.loads, 1)
+        self.assertEqual(result.tracks, [])
+
+        self.client.failures.forget('https://open.spotify.com/track/1')  # The user explicitly retries
+        await self.client.get_local_tracks('https://open.spotify.com/track/1')
+
+        self.assertEqual(self.source.loads, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
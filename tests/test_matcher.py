@@ -0,0 +1,29 @@
+import unittest
+
+from scripts.match_benchmark import benchmark, load_corpus, run_case
+
+
+class MatchCorpusTest(unittest.IsolatedAsyncioTestCase):
+    async def test_every_case_matches(self):
+        report = await benchmark(load_corpus(), rounds=1)
+
+        self.assertEqual(report['misses'], [])
+
+    async def test_good_match_skips_other_queries(self):
+        case = next(case for case in load_corpus() if case['name'] == 'music video is longer than the track')
+
+        _, loads, _ = await run_case(case)
+
+        self.assertEqual(loads, 1)
+
+    async def test_falls_back_across_query_variants(self):
+        case = next(case for case in load_corpus() if case['name'] == 'every query variant needed')
+
+        matched, loads, _ = await run_case(case)
+
+        self.assertEqual(matched, case['expected'])
+        self.assertEqual(loads, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from math import ceil
+
+from discord import Embed
+
+from lava.paginator import LazyPaginator
+from lava.queue import TrackQueue
+from tests.fakes import make_track
+
+
+class LazyPaginatorCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.queue = TrackQueue([make_track(str(number)) for number in range(25)])
+        self.renders: int = 0
+
+        self.paginator = LazyPaginator(
+            self.render_page, lambda: ceil(len(self.queue) / 10), version=lambda: self.queue.version
+        )
+
+    def render_page(self, page: int) -> Embed:
+        self.renders += 1
+
+        return Embed(description="\n".join(track.title for track in self.queue[page * 10:(page + 1) * 10]))
+
+    async def test_unchanged_pages_are_cached(self):
+        self.paginator.render(0)
+        self.paginator.render(1)
+        self.paginator.render(0)
+
+        self.assertEqual(self.renders, 2)
+
+    async def test_pages_are_rendered_again_after_the_queue_changed(self):
+        before = self.paginator.render(0)
+        self.paginator.render(1)
+
+        self.queue.pop(0)
+
+        self.assertNotEqual(self.paginator.render(0).description, before.description)
+        self.assertEqual(self.paginator.render(1).description, self.render_page(1).description)
+
+    async def test_without_version_pages_are_cached_as_is(self):
+        paginator = LazyPaginator(self.render_page, lambda: ceil(len(self.queue) / 10))
+
+        paginator.render(0)
+        self.queue.pop(0)
+        paginator.render(0)
+
+        self.assertEqual(self.renders, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
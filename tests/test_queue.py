@@ -0,0 +1,284 @@
+import random
+import unittest
+
+from lava.queue import TrackQueue, FairQueue
+
+RUNS = 300
+STEPS = 200
+
+
+class Track:
+    """Only what the queue looks at, compared by identity like queued AudioTracks"""
+    __slots__ = ('requester', 'number')
+
+    def __init__(self, number: int, requester: int):
+        self.number = number
+        self.requester = requester
+
+    def __repr__(self) -> str:
+        return f"<Track {self.number} by {self.requester}>"
+
+
+class TrackQueueFuzzTest(unittest.TestCase):
+    """Random edits applied to a TrackQueue with tiny chunks and to a list must leave both equal"""
+
+    def setUp(self):
+        self.numbers = 0
+
+    def new_track(self, rng: random.Random) -> Track:
+        self.numbers += 1
+        return Track(self.numbers, rng.choice((0, 0, 1, 2)))
+
+    def random_index(self, rng: random.Random, length: int) -> int:
+        return rng.randint(-length - 2, length + 2)
+
+    def check(self, queue: TrackQueue, expected: list, rng: random.Random):
+        self.assertEqual(list(queue), expected)
+        self.assertEqual(list(reversed(queue)), expected[::-1])
+        self.assertEqual(len(queue), len(expected))
+        self.assertEqual(bool(queue), bool(expected))
+        self.assertEqual(queue.user_count, sum(1 for track in expected if track.requester))
+
+        if expected:
+            index = rng.randrange(-len(expected), len(expected))
+            self.assertIs(queue[index], expected[index])
+
+        start, stop = self.random_index(rng, len(expected)), self.random_index(rng, len(expected))
+        step = rng.choice((None, None, 1, 2, -1, 3))
+        self.assertEqual(queue[start:stop:step], expected[start:stop:step])
+
+    def step(self, queue: TrackQueue, expected: list, rng: random.Random):
+        operation = rng.choice((
+            'append', 'append', 'extend', 'insert', 'insert', 'insert_many', 'pop', 'pop', 'pop_head',
+            'remove', 'del_index', 'del_slice', 'del_step', 'filter', 'clear'
+        ))
+        length = len(expected)
+
+        if operation == 'append':
+            track = self.new_track(rng)
+            queue.append(track)
+            expected.append(track)
+
+        elif operation == 'extend':
+            tracks = [self.new_track(rng) for _ in range(rng.randint(0, 12))]
+            queue.extend(tracks)
+            expected.extend(tracks)
+
+        elif operation == 'insert':
+            index, track = self.random_index(rng, length), self.new_track(rng)
+            queue.insert(index, track)
+            expected.insert(index, track)
+
+        elif operation == 'insert_many':
+            index = self.random_index(rng, length)
+            tracks = [self.new_track(rng) for _ in range(rng.randint(0, 20))]
+            queue.insert_many(index, tracks)
+            expected[index:index] = tracks
+
+        elif operation in ('pop', 'pop_head', 'del_index'):
+            index = 0 if operation == 'pop_head' else self.random_index(rng, length)
+
+            if not -length <= index < length:
+                with self.assertRaises(IndexError):
+                    queue.pop(index) if operation != 'del_index' else queue.__delitem__(index)
+                return
+
+            if operation == 'del_index':
+                del queue[index]
+                del expected[index]
+            else:
+                self.assertIs(queue.pop(index), expected.pop(index))
+
+        elif operation == 'remove' and expected:
+            track = rng.choice(expected)
+            queue.remove(track)
+            expected.remove(track)
+
+        elif operation == 'del_slice':
+            start, stop = self.random_index(rng, length), self.random_index(rng, length)
+            del queue[start:stop]
+            del expected[start:stop]
+
+        elif operation == 'del_step':
+            start, stop, step = self.random_index(rng, length), self.random_index(rng, length), rng.choice((2, 3, -1, -2))
+            del queue[start:stop:step]
+            del expected[start:stop:step]
+
+        elif operation == 'filter':
+            kept = {track.number for track in expected if rng.random() < 0.8}
+            removed = queue.filter(lambda track: track.number in kept)
+            self.assertEqual(removed, sum(1 for track in expected if track.number not in kept))
+            expected[:] = [track for track in expected if track.number in kept]
+
+        elif operation == 'clear' and rng.random() < 0.1:
+            queue.clear()
+            expected.clear()
+
+    def test_matches_list(self):
+        for run in range(RUNS):
+            rng = random.Random(run)
+            chunk_size = rng.choice((1, 2, 3, 4, 8))
+
+            initial = [self.new_track(rng) for _ in range(rng.randint(0, 40))]
+            queue, expected = TrackQueue(initial, chunk_size=chunk_size), list(initial)
+
+            with self.subTest(seed=run, chunk_size=chunk_size):
+                for _ in range(STEPS):
+                    version = queue.version
+                    self.step(queue, expected, rng)
+                    self.check(queue, expected, rng)
+
+                    self.assertGreaterEqual(queue.version, version)
+
+    def test_version_changes_on_every_edit(self):
+        queue = TrackQueue(chunk_size=2)
+        rng = random.Random(0)
+
+        for edit in (lambda: queue.append(self.new_track(rng)), lambda: queue.insert(0, self.new_track(rng)),
+                     lambda: queue.insert_many(1, [self.new_track(rng)]), lambda: queue.pop(0), queue.clear):
+            version = queue.version
+            edit()
+            self.assertGreater(queue.version, version)
+
+
+class FairQueueFuzzTest(unittest.TestCase):
+    """
+    Random edits applied to a FairQueue and to a list of its play order. Taking tracks from the head, skipping
+    to a track and inserting at a position in front of the user tracks must leave both equal. Edits where
+    the queue picks the position must keep the tracks of every requester in order, and the turns fair.
+    """
+
+    def setUp(self):
+        self.numbers = 0
+
+    def new_track(self, rng: random.Random) -> Track:
+        self.numbers += 1
+        return Track(self.numbers, rng.choice((0, 1, 1, 2, 3)))
+
+    def check(self, queue: FairQueue, expected: list):
+        self.assertEqual(list(queue), expected)
+        self.assertEqual(list(reversed(queue)), expected[::-1])
+        self.assertEqual(len(queue), len(expected))
+        self.assertEqual(queue.user_count, sum(1 for track in expected if track.requester))
+
+        for index, track in enumerate(expected):
+            self.assertIs(queue[index], track)
+
+        # After the tracks inserted at a position, requesters take turns, then autoplay tracks follow
+        rotating = [track.requester for track in expected[len(queue._front):]]  # skipcq: PYL-W0212
+        users = [requester for requester in rotating if requester]
+
+        self.assertEqual(rotating, users + [0] * (len(rotating) - len(users)))
+
+        for position, requester in enumerate(users):
+            following = users[position + 1:]
+
+            if requester not in following:
+                continue
+
+            between = following[:following.index(requester)]
+            later = set(following[following.index(requester):]) - {requester}
+
+            self.assertEqual(len(between), len(set(between)))  # Nobody gets two turns in a row
+            self.assertEqual(set(between), later | set(between))  # Everyone still queueing gets a turn
+
+    def check_reordered(self, queue: FairQueue, expected: list, autoplay_inserted: bool = False) -> list:
+        """
+        The queue may have reordered the tracks, but not the tracks of a single requester.
+        Inserted autoplay tracks are placed among the other autoplay tracks, not after them.
+
+        :return: The new play order.
+        """
+        actual = list(queue)
+
+        self.assertCountEqual([track.number for track in actual], [track.number for track in expected])
+
+        for requester in {track.requester for track in expected} - ({0} if autoplay_inserted else set()):
+            self.assertEqual(
+                [track for track in actual if track.requester == requester],
+                [track for track in expected if track.requester == requester]
+            )
+
+        return actual
+
+    def step(self, queue: FairQueue, expected: list, rng: random.Random):
+        operation = rng.choice((
+            'append', 'extend', 'insert', 'insert', 'insert_many', 'pop_head', 'pop_head', 'skip_to', 'skip_to',
+            'pop', 'remove', 'filter'
+        ))
+        length = len(expected)
+
+        if operation in ('append', 'extend'):
+            tracks = [self.new_track(rng) for _ in range(1 if operation == 'append' else rng.randint(0, 12))]
+            queue.extend(tracks)
+            expected[:] = self.check_reordered(queue, expected + tracks)
+
+        elif operation in ('insert', 'insert_many'):
+            tracks = [self.new_track(rng) for _ in range(1 if operation == 'insert' else rng.randint(0, 6))]
+            index = rng.randint(0, length)
+
+            # In front of the user tracks, or at the head, the tracks go exactly where they were asked to
+            positional = index < max(queue.user_count, len(queue._front), 1 if length else 0)  # skipcq: PYL-W0212
+
+            if operation == 'insert':
+                queue.insert(index, tracks[0])
+            else:
+                queue.insert_many(index, tracks)
+
+            if positional:
+                expected[index:index] = tracks
+            else:
+                expected[:] = self.check_reordered(queue, expected + tracks, autoplay_inserted=True)
+
+        elif operation == 'pop_head' and expected:
+            self.assertIs(queue.pop(0), expected.pop(0))
+
+        elif operation == 'skip_to' and expected:  # What /music skip does with a target
+            target = rng.randint(1, length)
+            del queue[:target - 1]
+            del expected[:target - 1]
+
+        elif operation == 'pop' and expected:
+            index = rng.randrange(length)
+            self.assertIs(queue.pop(index), expected[index])
+            expected[:] = self.check_reordered(queue, expected[:index] + expected[index + 1:])
+
+        elif operation == 'remove' and expected:
+            track = rng.choice(expected)
+            queue.remove(track)
+            expected[:] = self.check_reordered(queue, [queued for queued in expected if queued is not track])
+
+        elif operation == 'filter':
+            kept = {track.number for track in expected if rng.random() < 0.8}
+            queue.filter(lambda track: track.number in kept)
+            expected[:] = self.check_reordered(queue, [track for track in expected if track.number in kept])
+
+        self.check(queue, expected)
+
+    def test_matches_play_order(self):
+        for run in range(RUNS):
+            rng = random.Random(run)
+
+            initial = [self.new_track(rng) for _ in range(rng.randint(0, 40))]
+            queue = FairQueue(initial)
+            expected = list(queue)
+
+            with self.subTest(seed=run):
+                for _ in range(STEPS):
+                    version = queue.version
+                    self.step(queue, expected, rng)
+
+                    self.assertGreaterEqual(queue.version, version)
+
+    def test_skip_to_plays_the_listed_track(self):
+        queue = FairQueue([Track(number, requester) for number, requester in enumerate((1, 1, 1, 2, 2, 3))])
+        listed = list(queue)
+
+        del queue[:3]
+
+        self.assertEqual(list(queue), listed[3:])
+        self.assertIs(queue.pop(0), listed[3])
+
+
+if __name__ == '__main__':
+    unittest.main()
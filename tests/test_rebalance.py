@@ -0,0 +1,44 @@
+import unittest
+
+from tests.fakes import FakeNode, FakeSelector, make_manager, make_track, request_error
+
+
+class RebalanceTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.manager = make_manager()
+
+        self.hot = FakeNode('hot', self.manager)
+        self.cold = FakeNode('cold', self.manager)
+        self.failing = FakeNode('failing', self.manager, fail_update=request_error())
+
+    def add_player(self, guild_id: int):
+        player = self.manager.new(guild_id, node=self.hot)
+        player.current = make_track(str(guild_id))  # Not connected to a channel, so still idle
+
+        return player
+
+    async def test_request_error_skips_only_that_player(self):
+        first, failing, last = (self.add_player(guild_id) for guild_id in range(1, 4))
+
+        self.manager.node_selector = FakeSelector(None, {first: self.cold, failing: self.failing, last: self.cold})
+
+        self.assertEqual(await self.manager.rebalance(), 3)
+
+        self.assertEqual(self.manager.migrated, 2)
+        self.assertIs(first.node, self.cold)
+        self.assertIs(last.node, self.cold)
+
+    async def test_playing_players_are_not_moved(self):
+        player = self.add_player(1)
+        player.channel_id = 1234
+
+        self.manager.node_selector = FakeSelector(None, {player: self.cold})
+
+        await self.manager.rebalance()
+
+        self.assertIs(player.node, self.hot)
+        self.assertEqual(self.manager.migrated, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import json
+import unittest
+
+from lava.decoder import decode_track
+from lava.snapshot import serialize_track, deserialize_track
+from lava.source import SpotifyAudioTrack
+
+# The example track of the Lavalink v4 REST API documentation
+ENCODED = (
+    'QAAAjQIAJVJpY2sgQXN0bGV5IC0gTmV2ZXIgR29ubmEgR2l2ZSBZb3UgVXAADlJpY2tBc3RsZXlWRVZPAAAAAAADPCAAC2RRdzR3OVdnWGNR'
+    'AAEAK2h0dHBzOi8vd3d3LnlvdXR1YmUuY29tL3dhdGNoP3Y9ZFF3NHc5V2dYY1EAB3lvdXR1YmUAAAAAAAAAAA=='
+)
+
+
+def round_trip(track):
+    return deserialize_track(json.loads(json.dumps(serialize_track(track))))
+
+
+class SnapshotTrackTest(unittest.TestCase):
+    def test_plain_track_stays_compact(self):
+        track = decode_track(ENCODED)
+        track.requester = 1234
+
+        self.assertEqual(serialize_track(track), [ENCODED, 1234])
+
+        restored = round_trip(track)
+
+        self.assertEqual(restored.title, 'Rick Astley - Never Gonna Give You Up')
+        self.assertEqual(restored.requester, 1234)
+
+    def test_metadata_set_by_sources_is_kept(self):
+        track = decode_track(ENCODED)
+        track.title = 'Real title'
+        track.author = 'Someone / [Bilibili](https://www.bilibili.com/video/BV1)'
+        track.artwork_url = 'https://example.com/cover.jpg'
+
+        restored = round_trip(track)
+
+        self.assertEqual(restored.title, 'Real title')
+        self.assertEqual(restored.author, 'Someone / [Bilibili](https://www.bilibili.com/video/BV1)')
+        self.assertEqual(restored.artwork_url, 'https://example.com/cover.jpg')
+        self.assertEqual(restored.identifier, 'dQw4w9WgXcQ')
+
+    def test_old_snapshots_still_load(self):
+        restored = deserialize_track([ENCODED, 1234])
+
+        self.assertEqual(restored.title, 'Rick Astley - Never Gonna Give You Up')
+
+    def test_deferred_track_keeps_its_info(self):
+        info = {
+            'identifier': 'spotify-id', 'isSeekable': True, 'author': 'Author', 'length': 1000, 'isStream': False,
+            'title': 'Title', 'uri': 'https://open.spotify.com/track/spotify-id', 'sourceName': 'spotify'
+        }
+
+        restored = round_trip(SpotifyAudioTrack(info, 1234))
+
+        self.assertIsInstance(restored, SpotifyAudioTrack)
+        self.assertEqual(restored.title, 'Title')
+        self.assertIsNone(restored.track)
+
+    def test_loaded_deferred_track_keeps_its_info(self):
+        info = {
+            'identifier': 'spotify-id', 'isSeekable': True, 'author': 'Author', 'length': 1000, 'isStream': False,
+            'title': 'Title', 'uri': 'https://open.spotify.com/track/spotify-id', 'sourceName': 'spotify'
+        }
+
+        track = SpotifyAudioTrack(info, 1234)
+        track.track = ENCODED  # The YouTube match, set by load()
+
+        restored = round_trip(track)
+
+        self.assertIsInstance(restored, SpotifyAudioTrack)
+        self.assertEqual(restored.track, ENCODED)
+        self.assertEqual(restored.requester, 1234)
+        self.assertEqual(
+            (restored.title, restored.author, restored.uri, restored.identifier),
+            ('Title', 'Author', 'https://open.spotify.com/track/spotify-id', 'spotify-id')
+        )
+
+    def test_old_deferred_snapshots_still_load(self):
+        restored = deserialize_track([None, 1234, {
+            'identifier': 'spotify-id', 'isSeekable': True, 'author': 'Author', 'length': 1000, 'isStream': False,
+            'title': 'Title', 'uri': 'https://open.spotify.com/track/spotify-id'
+        }])
+
+        self.assertIsInstance(restored, SpotifyAudioTrack)
+        self.assertEqual(restored.title, 'Title')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import sqlite3
+import unittest
+
+from tests.fakes import FakeNode, make_manager, make_track
+
+
+class SnapshotFlushTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.manager = make_manager()
+        self.state = self.manager.bot.state
+
+        self.player = self.manager.new(1, node=FakeNode('node', self.manager))
+        self.player.queue.append(make_track('a'))
+
+    async def asyncTearDown(self):
+        self.state.close()
+
+    async def test_changed_players_only(self):
+        self.assertEqual(await self.manager.flush_snapshots(), 1)
+        self.assertEqual(await self.manager.flush_snapshots(), 0)
+
+        self.player.queue.append(make_track('b'))
+
+        self.assertEqual(await self.manager.flush_snapshots(), 1)
+        self.assertEqual(len(self.state.load_player(1)['queue']), 2)
+
+    async def test_failed_write_is_retried(self):
+        write = self.state._write_players
+
+        def fail(*_):
+            raise sqlite3.OperationalError('database is locked')
+
+        self.state._write_players = fail
+
+        with self.assertRaises(sqlite3.OperationalError):
+            await self.manager.flush_snapshots()
+
+        self.state._write_players = write
+
+        self.assertEqual(await self.manager.flush_snapshots(), 1)
+        self.assertIsNotNone(self.state.load_player(1))
+
+    async def test_empty_players_deleted_with_the_saves(self):
+        await self.manager.flush_snapshots()
+
+        self.player.queue.clear()
+        other = self.manager.new(2, node=self.player.node)
+        other.queue.append(make_track('c'))
+
+        self.assertEqual(await self.manager.flush_snapshots(), 1)
+        self.assertIsNone(self.state.load_player(1))
+        self.assertIsNotNone(self.state.load_player(2))
+
+
+if __name__ == '__main__':
+    unittest.main()
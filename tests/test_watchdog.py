@@ -0,0 +1,76 @@
+"""
+Blocks the event loop from code of each subsystem, and checks the watchdog blames the right one
+and records the stalls in the histograms.
+"""
+import asyncio
+import unittest
+
+from lava.watchdog import LoopWatchdog, LOOP_STALLS, SUBSYSTEMS
+from lava.metrics import LOOP_LAG
+
+BLOCK = 0.2  # How long each blocking call takes, in seconds
+
+
+def blocker(filename: str):
+    """
+    Build a function blocking the calling thread, whose frame reports the given file,
+    as if the blocking code lived in it.
+
+    :param filename: The file the frame of the function reports.
+    :return: The function, taking how long to block in seconds.
+    """
+    namespace = {}
+    exec(compile("import time\ndef block(seconds):\n    time.sleep(seconds)\n", filename, 'exec'), namespace)
+
+    return namespace['block']
+
+
+class LoopWatchdogTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.watchdog = LoopWatchdog(asyncio.get_running_loop(), threshold=0.05, interval=0.01)
+        self.watchdog.start()
+
+    async def asyncTearDown(self):
+        self.watchdog.stop()
+
+    async def block(self, filename: str, seconds: float = BLOCK):
+        blocker(filename)(seconds)
+
+        await asyncio.sleep(0.05)  # Let the loop beat again, which records the stall
+
+    async def test_stalls_attributed_to_subsystems(self):
+        files = {
+            'lyrics': '/site-packages/syncedlyrics/__init__.py',
+            'sources': '/site-packages/yt_dlp/YoutubeDL.py',
+            'playlists': '/app/lava/playlist.py',
+            'display': '/site-packages/imageio/v2.py',
+            'storage': '/app/lava/store.py',
+            'other': '/app/somewhere/else.py'
+        }
+        self.assertEqual(set(files), {subsystem for subsystem, _ in SUBSYSTEMS} | {'other'})
+
+        before = {subsystem: LOOP_STALLS.labels(subsystem).count for subsystem in files}
+        lags = LOOP_LAG.count
+
+        for subsystem, filename in files.items():
+            await self.block(filename)
+
+        for subsystem in files:
+            with self.subTest(subsystem):
+                self.assertEqual(self.watchdog.stalls.get(subsystem), 1)
+
+                stalls = LOOP_STALLS.labels(subsystem)
+                self.assertEqual(stalls.count - before[subsystem], 1)
+                self.assertGreaterEqual(stalls.sum, BLOCK - 0.05)
+
+        self.assertGreater(LOOP_LAG.count, lags)
+
+    async def test_short_blocks_are_not_stalls(self):
+        for _ in range(5):
+            await self.block('/site-packages/yt_dlp/YoutubeDL.py', 0.01)
+
+        self.assertEqual(self.watchdog.stalls, {})
+
+
+if __name__ == '__main__':
+    unittest.main()